@@ -0,0 +1,85 @@
+"""Cold start: importing app.py and serving the first request in a fresh interpreter.
+
+    python benchmarks/bench_cold_start.py [--runs 10] [--target-ms 200]
+
+Each run is a new Python process against an already initialised scratch
+database (what a forked or respawned worker sees). It reports the median and
+worst import time, first-request time and their total. Most of that is Flask
+and SQLAlchemy importing themselves, which varies a lot between machines, so
+the floor (a process that only imports flask and flask_sqlalchemy) is measured
+too. The target applies to the app's own share, total minus floor; the script
+exits non-zero if the median misses `--target-ms`.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = (
+    "import json, sys, time\n"
+    "started = time.perf_counter()\n"
+    "sys.path.insert(0, {root!r})\n"
+    "from app import app\n"
+    "imported = time.perf_counter()\n"
+    "app.extensions['database_ready'] = True\n"
+    "status = app.test_client().get('/login').status_code\n"
+    "served = time.perf_counter()\n"
+    "print(json.dumps({{'import_ms': (imported - started) * 1000, 'first_request_ms': (served - imported) * 1000,"
+    " 'status': status}}))\n"
+)
+
+FLOOR = (
+    "import json, time\n"
+    "started = time.perf_counter()\n"
+    "import flask, flask_sqlalchemy\n"
+    "print(json.dumps({'floor_ms': (time.perf_counter() - started) * 1000}))\n"
+)
+
+SETUP = (
+    "import sys; sys.path.insert(0, {root!r})\n"
+    "from app import app\n"
+    "from services.database import init_db\n"
+    "with app.app_context():\n"
+    "    init_db()\n"
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--target-ms', type=float, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        subprocess.run([sys.executable, '-c', SETUP.format(root=ROOT)], env=env, cwd=ROOT, check=True,
+                       stdout=subprocess.DEVNULL)
+        runs = []
+        for _ in range(args.runs):
+            run = {}
+            for probe in (FLOOR, PROBE.format(root=ROOT)):
+                out = subprocess.run([sys.executable, '-c', probe], env=env, cwd=ROOT,
+                                     check=True, capture_output=True, text=True).stdout
+                run.update(json.loads(out.strip().splitlines()[-1]))
+            runs.append(run)
+
+    result = {'runs': args.runs, 'target_ms': args.target_ms}
+    for key in ('floor_ms', 'import_ms', 'first_request_ms'):
+        values = [run[key] for run in runs]
+        result[key] = {'median': round(statistics.median(values), 1), 'max': round(max(values), 1)}
+    totals = [run['import_ms'] + run['first_request_ms'] for run in runs]
+    result['total_ms'] = {'median': round(statistics.median(totals), 1), 'max': round(max(totals), 1)}
+    own = [total - run['floor_ms'] for total, run in zip(totals, runs)]
+    result['app_ms'] = {'median': round(statistics.median(own), 1), 'max': round(max(own), 1)}
+    print(json.dumps(result, indent=2))
+    if result['app_ms']['median'] > args.target_ms:
+        sys.exit(f"App cold start median {result['app_ms']['median']}ms is over the {args.target_ms}ms target")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Throughput of simultaneous submit_quiz calls under each database profile.
+
+    python benchmarks/bench_concurrent_submit.py [--threads 16] [--submissions 40] [--questions 50]
+
+Each profile runs in its own interpreter against a fresh SQLite file (the
+profile is applied when the app is imported). Every thread logs in as its own
+student and posts `--submissions` quiz attempts as fast as it can. Failed
+submissions are requests that did not redirect to the feedback page or whose
+responses never reached the database (e.g. "database is locked"). The last run
+uses the production profile with the write-behind queue (SUBMIT_WRITE_BEHIND).
+Its time stops when every attempt has been acknowledged, and the queue is
+flushed before the stored rows are counted. Submit p50/p99 is the latency a
+student sees.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILES = ('default', 'production')
+RUNS = (('default', False), ('production', False), ('production', True))  # (profile, write-behind)
+
+
+def run_profile(args):
+    sys.path.insert(0, ROOT)
+    from app import app
+    from models.models import Chapter, Question, Quiz, QuizAttempt, Subject, User, db
+    from services.database import init_db
+    from services.submission_queue import shutdown
+
+    app.config['SUBMIT_WRITE_BEHIND'] = args.write_behind
+    app.config['SUBMIT_SPOOL_DIR'] = os.path.join(os.path.dirname(app.config['SQLALCHEMY_DATABASE_URI'][len('sqlite:///'):]), 'spool')
+    with app.app_context():
+        init_db()
+        subject = Subject(name='Bench', description='Benchmark subject')
+        chapter = Chapter(name='Bench chapter', subject=subject)
+        quiz = Quiz(chapter=chapter, date_of_quiz=date.today(), time_duration=30, remarks='Bench quiz')
+        db.session.add(quiz)
+        db.session.flush()
+        db.session.add_all([
+            Question(quiz_id=quiz.id, question_statement=f'Q{i}', optionA='a', optionB='b',
+                     optionC='c', optionD='d', correct_option='ABCD'[i % 4])
+            for i in range(args.questions)
+        ])
+        users = [User(username=f'student{i}@example.com', password='x', full_name=f'Student {i}',
+                      dob=date(2000, 1, 1)) for i in range(args.threads)]
+        db.session.add_all(users)
+        db.session.commit()
+        quiz_id = quiz.id
+        user_ids = [user.id for user in users]
+        question_ids = [question_id for (question_id,) in db.session.query(Question.id).filter_by(quiz_id=quiz_id)]
+
+    answers = {f'question_{question_id}': 'A' for question_id in question_ids}
+    failures = []
+    latencies = []
+    barrier = threading.Barrier(args.threads + 1)
+
+    def student(user_id):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+        barrier.wait()
+        for _ in range(args.submissions):
+            try:
+                started = time.perf_counter()
+                response = client.post('/submit_quiz', data={'quiz_id': quiz_id, **answers})
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 302 or 'quiz_feedback' not in response.headers.get('Location', ''):
+                    failures.append(response.status_code)
+            except Exception as exc:  # The view can raise before its own try/except
+                failures.append(type(exc).__name__)
+
+    threads = [threading.Thread(target=student, args=(user_id,)) for user_id in user_ids]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    shutdown(app)  # Write-behind: store everything still spooled
+
+    latencies.sort()
+    with app.app_context():
+        stored = db.session.query(QuizAttempt).count()
+
+    attempted = args.threads * args.submissions
+    print(json.dumps({
+        'profile': os.environ['DATABASE_PROFILE'],
+        'write_behind': args.write_behind,
+        'attempted': attempted,
+        'stored': stored,
+        'failed': max(len(failures), attempted - stored),
+        'seconds': round(elapsed, 3),
+        'submissions_per_second': round(stored / elapsed, 1),
+        'submit_p50_ms': round(latencies[len(latencies) // 2] * 1000, 1),
+        'submit_p99_ms': round(latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] * 1000, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--submissions', type=int, default=40, help='Submissions per thread.')
+    parser.add_argument('--questions', type=int, default=50)
+    parser.add_argument('--profile', choices=PROFILES, help=argparse.SUPPRESS)
+    parser.add_argument('--write-behind', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile:
+        run_profile(args)
+        return
+
+    for profile, write_behind in RUNS:
+        db_dir = tempfile.mkdtemp(prefix='quiz_bench_')
+        env = dict(os.environ, DATABASE_PROFILE=profile,
+                   DATABASE_URL=f"sqlite:///{os.path.join(db_dir, 'bench.db')}?check_same_thread=False")
+        output = subprocess.run(
+            [sys.executable, __file__, '--profile', profile, '--threads', str(args.threads),
+             '--submissions', str(args.submissions), '--questions', str(args.questions)]
+            + (['--write-behind'] if write_behind else []),
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        label = f"{profile}{' +write-behind' if write_behind else ''}"
+        print(f"{label:<25} {result['submissions_per_second']:>8} submissions/s  "
+              f"{result['stored']}/{result['attempted']} stored, {result['failed']} failed "
+              f"in {result['seconds']}s  submit p50 {result['submit_p50_ms']} ms, p99 {result['submit_p99_ms']} ms")
+
+
+if __name__ == '__main__':
+    main()
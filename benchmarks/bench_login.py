@@ -0,0 +1,123 @@
+"""Login latency under a sign-in storm, with inline hashing versus the bounded hasher.
+
+    python benchmarks/bench_login.py [--users 32] [--readers 4] [--seconds 10] [--method scrypt]
+        [--hash-workers 2] [--hash-queue 8]
+
+`--users` students POST /login in a loop while `--readers` threads keep
+loading a page, all through the Flask test client. The run happens twice:
+once with PASSWORD_HASH_WORKERS = 0 (hashing inline in the request thread, as
+before) and once with the bounded executor. Prints one JSON object per mode
+with the login p50/p99 (successful logins), the number rejected as busy,
+and the page p50/p99.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(fraction * len(values)))] * 1000, 1)
+
+
+def run(create_app, database_url, args, workers):
+    from models.models import User, db
+    from services.database import init_db
+    from services.passwords import PasswordHasher
+
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        'PASSWORD_HASH_METHOD': args.method,
+        'PASSWORD_HASH_WORKERS': workers,
+        'PASSWORD_HASH_QUEUE': args.hash_queue,
+    })
+    with app.app_context():
+        init_db()
+        if not User.query.first():
+            stored = PasswordHasher(args.method, 0, 0, None).hash('secret')  # Same hash for all: setup speed only
+            db.session.add_all([
+                User(username=f'student{i}@example.com', password=stored, full_name=f'Student {i}',
+                     dob=date(2000, 1, 1))
+                for i in range(args.users)
+            ])
+            db.session.commit()
+
+    logins, pages, rejected, failed = [], [], [0], [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.seconds
+
+    def student(i):
+        client = app.test_client()
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            response = client.post('/login', data={'username': f'student{i}@example.com', 'password': 'secret'})
+            elapsed = time.perf_counter() - started
+            with lock:
+                if response.status_code == 302:
+                    logins.append(elapsed)
+                elif response.status_code == 503:
+                    rejected[0] += 1
+                else:
+                    failed[0] += 1
+            if response.status_code == 503:
+                time.sleep(0.5)  # The student waits a moment and clicks again
+
+    def reader():
+        client = app.test_client()
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            client.get('/register')
+            with lock:
+                pages.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=student, args=(i,)) for i in range(args.users)]
+    threads += [threading.Thread(target=reader) for _ in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {
+        'mode': 'executor' if workers else 'inline',
+        'hash_workers': workers,
+        'logins': len(logins),
+        'rejected_busy': rejected[0],
+        'failed': failed[0],
+        'login_p50_ms': percentile(logins, 0.50),
+        'login_p99_ms': percentile(logins, 0.99),
+        'page_requests': len(pages),
+        'page_p50_ms': percentile(pages, 0.50),
+        'page_p99_ms': percentile(pages, 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=32)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--method', default='scrypt')
+    parser.add_argument('--hash-workers', type=int, default=2)
+    parser.add_argument('--hash-queue', type=int, default=8)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='quiz_bench_')
+    database_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    sys.path.insert(0, ROOT)
+    from app import create_app
+
+    for workers in (0, args.hash_workers):
+        print(json.dumps(run(create_app, database_url, args, workers)), flush=True)
+
+
+if __name__ == '__main__':
+    main()
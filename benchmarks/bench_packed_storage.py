@@ -0,0 +1,107 @@
+"""Size of attempt responses: one user_response row per answer vs packed quiz_attempt rows.
+
+    python benchmarks/bench_packed_storage.py [--scale 0.1] [--seed 1] [--keep DIR]
+
+Generates a synthetic dataset in the old layout (synthetic_data.py --legacy),
+measures the user_response table and its index with SQLite's dbstat, then
+runs migration 3, which packs every attempt into one quiz_attempt row. After a
+VACUUM it measures the new table and index plus the whole file again. It also
+checks that the migration kept every answer: the answer count and the number
+of correct answers must match. `--scale 1` is the full 20M-answer
+dataset. It needs a few GB of disk and takes a while.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text  # noqa: E402
+
+from synthetic_data import Sizes, generate  # noqa: E402
+
+OLD = ('user_response', 'ix_user_response_user_quiz')
+NEW = ('quiz_attempt', 'ix_quiz_attempt_user_quiz')
+
+
+def object_bytes(db, names):
+    """{name: bytes} of the given tables and indexes, from dbstat."""
+    rows = db.session.connection().exec_driver_sql(
+        f"SELECT name, sum(pgsize) FROM dbstat WHERE name IN ({', '.join('?' * len(names))}) GROUP BY name",
+        tuple(names)
+    )
+    return dict(rows.all())
+
+
+def vacuum(db):
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.exec_driver_sql("VACUUM")
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")  # So the file size reflects it
+
+
+def mb(size):
+    return f"{size / 1e6:10.1f} MB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=float, default=0.1, help='Fraction of the full dataset (1 = 20M answers).')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--keep', help='Directory to leave the database in (default: a temporary one).')
+    args = parser.parse_args()
+
+    directory = args.keep or tempfile.mkdtemp(prefix='quiz_packed_')
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, 'packed.db')
+    if os.path.exists(path):
+        os.remove(path)
+
+    from app import create_app
+    from models import migrations
+    from models.models import db
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{path}"})
+    sizes = Sizes.at_scale(args.scale)
+    generate(app, sizes, seed=args.seed, legacy=True, echo=lambda line: None)
+
+    with app.app_context():
+        vacuum(db)
+        before = object_bytes(db, OLD)
+        answers, correct = db.session.execute(text("SELECT count(*), sum(is_correct) FROM user_response")).one()
+        file_before = os.path.getsize(path)
+        db.session.commit()
+
+        started = time.perf_counter()
+        migrations.upgrade()
+        migrated = time.perf_counter() - started
+
+        vacuum(db)
+        after = object_bytes(db, NEW)
+        attempts, packed, score = db.session.execute(
+            text("SELECT count(*), sum(question_count), sum(score) FROM quiz_attempt")).one()
+        file_after = os.path.getsize(path)
+        db.session.commit()
+
+    print(f"{answers:,} answers in {attempts:,} attempts (scale {args.scale}, seed {args.seed})")
+    print(f"{'':<28}{'one row per answer':>18}{'packed':>14}")
+    print(f"{'table':<28}{mb(before.get(OLD[0], 0)):>18}{mb(after.get(NEW[0], 0)):>14}")
+    print(f"{'(user_id, quiz_id) index':<28}{mb(before.get(OLD[1], 0)):>18}{mb(after.get(NEW[1], 0)):>14}")
+    old_total, new_total = sum(before.values()), sum(after.values())
+    print(f"{'table + index':<28}{mb(old_total):>18}{mb(new_total):>14}"
+          f"   {(1 - new_total / old_total) * 100:.1f}% smaller")
+    print(f"{'database file':<28}{mb(file_before):>18}{mb(file_after):>14}"
+          f"   {(1 - file_after / file_before) * 100:.1f}% smaller")
+    print(f"{'bytes per answer':<28}{old_total / answers:>18.1f}{new_total / answers:>14.1f}")
+    print(f"migration 3 took {migrated:.1f}s ({answers / migrated:,.0f} answers/s)")
+    if (packed, score) != (answers, correct):
+        raise SystemExit(f"The migration lost answers: {answers:,} ({correct:,} correct) before, "
+                         f"{packed:,} ({score:,} correct) after")
+    print(f"Database: {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Payment order latency and failure handling against the offline stub gateway.
+
+    python benchmarks/bench_payment_gateway.py [--latency 0.5] [--failure-rate 0.1] [--timeout 2]
+        [--concurrency 4] [--payers 16] [--readers 4] [--seconds 10]
+
+`--payers` threads POST /payment in a loop while `--readers` threads load the
+login page, all through the Flask test client. The stub sleeps `--latency`
+seconds per order and fails `--failure-rate` of them. Prints JSON with the
+payment outcomes (created, rejected as busy, failed or timed out), payment
+and page latency percentiles, and the achieved order rate.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(fraction * len(values)))] * 1000, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.5)
+    parser.add_argument('--failure-rate', type=float, default=0.1)
+    parser.add_argument('--timeout', type=float, default=2.0)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--payers', type=int, default=16)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='quiz_bench_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    sys.path.insert(0, ROOT)
+    from app import create_app
+    from services.database import init_db
+
+    app = create_app({
+        'PAYMENT_GATEWAY': 'stub',
+        'PAYMENT_STUB_LATENCY': args.latency,
+        'PAYMENT_STUB_FAILURE_RATE': args.failure_rate,
+        'PAYMENT_TIMEOUT': args.timeout,
+        'PAYMENT_MAX_CONCURRENCY': args.concurrency,
+    })
+    with app.app_context():
+        init_db()
+
+    outcomes = {'created': 0, 'busy': 0, 'failed': 0}
+    payment_times, page_times = [], []
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.seconds
+
+    def payer():
+        client = app.test_client()
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            response = client.post('/payment', data={'amount': '100'})
+            elapsed = time.perf_counter() - started
+            if response.status_code == 200:
+                outcome = 'created'
+            else:
+                with client.session_transaction() as sess:
+                    flashes = ' '.join(message for _, message in sess.pop('_flashes', []))
+                outcome = 'busy' if 'busy' in flashes else 'failed'
+                time.sleep(0.05)  # A user clicking again, not a hot retry loop
+            with lock:
+                outcomes[outcome] += 1
+                payment_times.append(elapsed)
+
+    def reader():
+        client = app.test_client()
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            client.get('/login')
+            with lock:
+                page_times.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=payer) for _ in range(args.payers)]
+    threads += [threading.Thread(target=reader) for _ in range(args.readers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    print(json.dumps({
+        'settings': vars(args),
+        'payments': {
+            **outcomes,
+            'orders_per_second': round(outcomes['created'] / elapsed, 2),
+            'p50_ms': percentile(payment_times, 0.50),
+            'p99_ms': percentile(payment_times, 0.99),
+            'max_ms': round(max(payment_times) * 1000, 1) if payment_times else None,
+        },
+        'pages': {
+            'requests': len(page_times),
+            'p50_ms': percentile(page_times, 0.50),
+            'p99_ms': percentile(page_times, 0.99),
+            'mean_ms': round(statistics.mean(page_times) * 1000, 1) if page_times else None,
+        },
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
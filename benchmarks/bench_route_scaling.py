@@ -0,0 +1,135 @@
+"""How each route's latency grows with the size of the data.
+
+    python benchmarks/bench_route_scaling.py [--scales 0.001 0.01 0.1] [--repeat 20] [--seed 1]
+        [--cache-dir DIR] [--output results.json]
+
+For every scale a synthetic database is generated with synthetic_data.py.
+Files are kept in --cache-dir and reused on later runs. Every route in
+controllers/main.py and controllers/auth.py is then timed in a fresh
+interpreter, so no in-process cache carries over between sizes. Admin pages
+run as the admin and student pages as user 1. Quiz 1 is always scheduled for
+today.
+
+Prints median milliseconds per route and scale. It also prints the growth
+exponent between the two largest scales: log(t2 / t1) / log(n2 / n1), where
+n is the number of user responses. Around 0 means flat, around 1 means linear
+in the data, and above 1 is super-linear; those routes are flagged.
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# (name, role, method, path, form)
+ROUTES = [
+    ('home', None, 'GET', '/', None),
+    ('auth.user_login GET', None, 'GET', '/login', None),
+    ('auth.user_login POST', None, 'POST', '/login', {'username': 'user1@example.com', 'password': 'password'}),
+    ('auth.admin_login GET', None, 'GET', '/admin_login', None),
+    ('auth.register GET', None, 'GET', '/register', None),
+    ('admin_dashboard', 'admin', 'GET', '/admin_dashboard', None),
+    ('admin_dashboard search', 'admin', 'GET', '/admin_dashboard?q=Synthetic', None),
+    ('manage_questions', 'admin', 'GET', '/manage_questions', None),
+    ('edit_question', 'admin', 'GET', '/edit_question/1', None),
+    ('view_statistics', 'admin', 'GET', '/view_statistics', None),
+    ('user_dashboard', 'user', 'GET', '/user_dashboard', None),
+    ('user_dashboard search', 'user', 'GET', '/user_dashboard?search=Synthetic', None),
+    ('instructions', 'user', 'GET', '/instructions/1', None),
+    ('attempt_quiz', 'user', 'GET', '/attempt_quiz/1', None),
+    ('submit_quiz', 'user', 'POST', '/submit_quiz', {'quiz_id': '1'}),
+    ('quiz_feedback', 'user', 'GET', '/quiz_feedback/1', None),
+    ('quiz_summary', 'user', 'GET', '/quiz_summary', None),
+    ('subscribe', 'user', 'GET', '/subscribe', None),
+]
+
+
+def measure(database, repeat):
+    """Runs in a child interpreter: time every route against `database`."""
+    from app import create_app
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{database}"})
+    clients = {None: app.test_client(), 'user': app.test_client(), 'admin': app.test_client()}
+    with clients['user'].session_transaction() as sess:
+        sess['user_id'] = 1
+    with clients['admin'].session_transaction() as sess:
+        sess['admin_logged_in'] = True
+
+    results = {}
+    for name, role, method, path, form in ROUTES:
+        client = clients[role]
+        timings = []
+        for i in range(repeat + 1):
+            started = time.perf_counter()
+            response = client.open(path, method=method, data=form)
+            elapsed = time.perf_counter() - started
+            if i:  # The first call warms caches and the connection pool
+                timings.append(elapsed)
+        results[name] = {'median_ms': round(statistics.median(timings) * 1000, 2), 'status': response.status_code}
+    return results
+
+
+def ensure_dataset(cache_dir, scale, seed):
+    from synthetic_data import Sizes
+
+    sizes = Sizes.at_scale(scale)
+    path = os.path.join(cache_dir, f"synthetic-{scale:g}-seed{seed}.db")
+    if not os.path.exists(path):
+        print(f"Generating scale {scale:g} into {path}", file=sys.stderr)
+        subprocess.run([sys.executable, os.path.join(ROOT, 'benchmarks', 'synthetic_data.py'), path,
+                        '--scale', str(scale), '--seed', str(seed)], check=True, stdout=sys.stderr, cwd=ROOT)
+    return path, sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=float, nargs='+', default=[0.001, 0.01, 0.1])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--cache-dir', default=os.path.join(tempfile.gettempdir(), 'quiz_synthetic'))
+    parser.add_argument('--output')
+    parser.add_argument('--measure', help=argparse.SUPPRESS)  # Child mode: database file to time
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.repeat)))
+        return
+
+    os.makedirs(args.cache_dir, exist_ok=True)
+    runs = []
+    for scale in sorted(args.scales):
+        path, sizes = ensure_dataset(args.cache_dir, scale, args.seed)
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), '--measure', path,
+                              '--repeat', str(args.repeat)], check=True, capture_output=True, text=True,
+                             cwd=ROOT).stdout
+        runs.append({'scale': scale, 'sizes': vars(sizes), 'routes': json.loads(out.strip().splitlines()[-1])})
+
+    header = ''.join(f"{run['sizes']['responses']:>14,}" for run in runs)
+    print(f"{'route (median ms) / responses':<32}{header}{'exponent':>10}")
+    growth = {}
+    for name, *_ in ROUTES:
+        cells = ''.join(f"{run['routes'][name]['median_ms']:>14}" for run in runs)
+        exponent = None
+        if len(runs) >= 2:
+            (a, b) = runs[-2], runs[-1]
+            ta, tb = a['routes'][name]['median_ms'], b['routes'][name]['median_ms']
+            exponent = round(math.log(tb / ta) / math.log(b['sizes']['responses'] / a['sizes']['responses']), 2)
+        growth[name] = exponent
+        flag = '  super-linear' if exponent is not None and exponent > 1.1 else ''
+        print(f"{name:<32}{cells}{exponent if exponent is not None else '-':>10}{flag}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'seed': args.seed, 'repeat': args.repeat, 'runs': runs, 'growth_exponent': growth}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
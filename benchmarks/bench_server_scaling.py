@@ -0,0 +1,115 @@
+"""Requests per second of the pre-fork launcher as the worker count grows.
+
+    python benchmarks/bench_server_scaling.py [--workers 1 2 4] [--clients 8] [--seconds 5] [--path /login]
+
+For each worker count the app is started with services/server.py on a free
+port (HTTP only) against a scratch SQLite file, then `--clients`
+client processes issue keep-alive GETs for `--seconds`. Prints one JSON line
+per worker count with throughput and the speed-up over the first run.
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVER = (
+    "import sys; sys.path.insert(0, {root!r})\n"
+    "from app import app\n"
+    "from services import server\n"
+    "server.serve(app, SERVER_WORKERS={workers}, SERVER_HTTP_PORT={port}, SERVER_HTTPS_PORT=0)\n"
+)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def client(port, path, seconds, results):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    done = errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status == 200:
+                done += 1
+            else:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port)
+    results.put((done, errors))
+
+
+def run(workers, args, database_url):
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=database_url)
+    proc = subprocess.Popen([sys.executable, '-c', SERVER.format(root=ROOT, workers=workers, port=port)],
+                            env=env, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for(port)
+        results = multiprocessing.Queue()
+        clients = [multiprocessing.Process(target=client, args=(port, args.path, args.seconds, results))
+                   for _ in range(args.clients)]
+        started = time.perf_counter()
+        for process in clients:
+            process.start()
+        totals = [results.get() for _ in clients]
+        elapsed = time.perf_counter() - started
+        for process in clients:
+            process.join()
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=60)
+    done = sum(count for count, _ in totals)
+    return {'workers': workers, 'requests': done, 'errors': sum(e for _, e in totals),
+            'requests_per_second': round(done / elapsed, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    cores = os.cpu_count() or 1
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, max(1, cores // 2), cores}))
+    parser.add_argument('--clients', type=int, default=2 * cores)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--path', default='/login')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        baseline = None
+        for workers in args.workers:
+            result = run(workers, args, database_url)
+            baseline = baseline or result['requests_per_second']
+            result['speedup'] = round(result['requests_per_second'] / baseline, 2) if baseline else None
+            print(json.dumps(result), flush=True)
+
+
+if __name__ == '__main__':
+    main()
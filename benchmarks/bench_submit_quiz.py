@@ -0,0 +1,127 @@
+"""Latency of quiz submission for 10-, 100- and 1,000-question quizzes.
+
+Runs against a throwaway SQLite database:
+
+    python benchmarks/bench_submit_quiz.py [--attempts 50]
+
+For each quiz size it reports the full POST /submit_quiz round trip through the
+Flask test client, plus the response-persistence step on its own, comparing
+one user_response row per answer (the old schema, written with a single
+executemany) against the one packed quiz_attempt row submit_quiz now writes.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+
+DB_DIR = tempfile.mkdtemp(prefix='quiz_bench_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(DB_DIR, 'bench.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text  # noqa: E402
+
+from app import app  # noqa: E402
+from models.models import Chapter, Question, Quiz, Subject, User, db  # noqa: E402
+from services.database import init_db  # noqa: E402
+from services.grading import grade, load_answer_key, save_responses  # noqa: E402
+from synthetic_data import LEGACY_USER_RESPONSE, LEGACY_USER_RESPONSE_INDEX  # noqa: E402
+
+SIZES = (10, 100, 1000)
+
+
+def seed():
+    subject = Subject(name='Bench', description='Benchmark subject')
+    chapter = Chapter(name='Bench chapter', subject=subject)
+    user = User(username='bench@example.com', password='x', full_name='Bench User', dob=date(2000, 1, 1))
+    db.session.add_all([subject, chapter, user])
+    db.session.flush()
+    db.session.execute(text(LEGACY_USER_RESPONSE))
+    db.session.execute(text(LEGACY_USER_RESPONSE_INDEX))
+
+    quiz_ids = {}
+    for size in SIZES:
+        quiz = Quiz(chapter_id=chapter.id, date_of_quiz=date.today(), time_duration=30, remarks=f'Bench quiz {size}')
+        db.session.add(quiz)
+        db.session.flush()
+        db.session.add_all([
+            Question(quiz_id=quiz.id, question_statement=f'Q{i}', optionA='a', optionB='b',
+                     optionC='c', optionD='d', correct_option='ABCD'[i % 4])
+            for i in range(size)
+        ])
+        quiz_ids[size] = quiz.id
+    db.session.commit()
+    return user.id, quiz_ids
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(samples):
+    return (f"mean {statistics.mean(samples) * 1000:8.2f} ms  "
+            f"p50 {percentile(samples, 50) * 1000:8.2f} ms  "
+            f"p95 {percentile(samples, 95) * 1000:8.2f} ms")
+
+
+def row_per_answer(user_id, quiz_id, answer_key, answers):
+    rows, _ = grade(answer_key, answers, user_id, quiz_id)
+    db.session.execute(text(
+        "INSERT INTO user_response (user_id, quiz_id, question_id, selected_answer, is_correct) "
+        "VALUES (:user_id, :quiz_id, :question_id, :selected_answer, :is_correct)"
+    ), rows)
+    db.session.commit()
+
+
+def packed_attempt(user_id, quiz_id, answer_key, answers):
+    rows, _ = grade(answer_key, answers, user_id, quiz_id)
+    save_responses(rows)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--attempts', type=int, default=50, help='Submissions per quiz size.')
+    args = parser.parse_args()
+
+    with app.app_context():
+        init_db()
+        user_id, quiz_ids = seed()
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+
+    for size in SIZES:
+        quiz_id = quiz_ids[size]
+        with app.app_context():
+            answer_key = load_answer_key(quiz_id)
+        answers = {f'question_{question_id}': 'A' for question_id, _ in answer_key}
+
+        request_times = []
+        for _ in range(args.attempts):
+            start = time.perf_counter()
+            client.post('/submit_quiz', data={'quiz_id': quiz_id, **answers})
+            request_times.append(time.perf_counter() - start)
+
+        write_times = {}
+        with app.app_context():
+            for name, write in (('row per answer', row_per_answer), ('packed', packed_attempt)):
+                samples = []
+                for _ in range(args.attempts):
+                    start = time.perf_counter()
+                    write(user_id, quiz_id, answer_key, answers)
+                    samples.append(time.perf_counter() - start)
+                write_times[name] = samples
+
+        print(f"{size:>5} questions  {'submit_quiz':<16} {summarize(request_times)}")
+        for name, samples in write_times.items():
+            print(f"{'':>5}            {name:<16} {summarize(samples)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,375 @@
+"""Exam-day load test: many virtual students going through the whole quiz flow.
+
+    python benchmarks/loadtest.py [--users 50] [--duration 60] [--ramp 10] [--target inprocess|server]
+        [--workers 2] [--quizzes 5] [--questions 20] [--think 0] [--hash-method scrypt:4096:8:1]
+        [--output benchmarks/results/loadtest-<timestamp>.json] [--compare previous.json]
+
+A fresh SQLite database is seeded with quizzes scheduled for today. Each
+virtual user (VU) registers its own account, logs in, then repeats the exam
+flow until the run ends:
+
+    user_dashboard -> instructions -> attempt_quiz -> submit_quiz -> quiz_feedback -> quiz_summary
+
+With `--target inprocess` (default) the VUs are threads using the Flask test
+client. With `--target server` the harness starts the pre-fork server
+(services/server.py, `--workers` processes) on a free port and the VUs speak
+HTTP to it. VUs start evenly spread over `--ramp` seconds.
+
+For every route the report has request count, throughput, p50/p95/p99/max
+latency, errors (5xx or unexpected status) and "database is locked" errors.
+In-process those are counted from SQLAlchemy's error hook. Against a server,
+they are submissions whose commit failed, seen through submit_quiz's flash
+message. The JSON also carries the settings and the git revision so runs
+can be compared; `--compare` prints per-route deltas against an earlier file.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ROUTES = ('register', 'login', 'user_dashboard', 'instructions', 'attempt_quiz',
+          'submit_quiz', 'quiz_feedback', 'quiz_summary')
+SUBMIT_FAILED = 'An error occurred while submitting the quiz.'
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {route: [] for route in ROUTES}
+        self.errors = dict.fromkeys(ROUTES, 0)
+        self.lock_errors = dict.fromkeys(ROUTES, 0)
+
+    def record(self, route, elapsed, ok):
+        with self.lock:
+            self.latencies[route].append(elapsed)
+            if not ok:
+                self.errors[route] += 1
+
+    def lock_error(self, route):
+        with self.lock:
+            self.lock_errors[route] += 1
+
+
+class TestClientSession:
+    """One VU's browser, backed by the Flask test client."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+        self.app = app
+
+    def request(self, method, path, form=None):
+        response = self.client.open(path, method=method, data=form)
+        return response.status_code, response.headers.get('Location'), response.get_data()
+
+    def flashes(self):
+        with self.client.session_transaction() as sess:
+            return [message for _, message in sess.get('_flashes', [])]
+
+
+class HTTPSession:
+    """One VU's browser speaking HTTP/1.1 keep-alive to a local server, with a cookie jar."""
+
+    def __init__(self, app, port):
+        self.app = app
+        self.port = port
+        self.cookies = SimpleCookie()
+        self.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+
+    def request(self, method, path, form=None):
+        headers = {}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f"{key}={morsel.value}" for key, morsel in self.cookies.items())
+        body = None
+        if form is not None:
+            body = urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        for attempt in (1, 2):
+            try:
+                self.conn.request(method, path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, OSError):
+                self.conn.close()  # Keep-alive connection dropped by the server; retry once on a new one
+                if attempt == 2:
+                    raise
+        for header in response.headers.get_all('Set-Cookie') or []:
+            self.cookies.load(header)
+        location = response.headers.get('Location')
+        if location and location.startswith('http'):
+            location = '/' + location.split('/', 3)[3]
+        return response.status, location, data
+
+    def flashes(self):
+        morsel = self.cookies.get('session')
+        if morsel is None:
+            return []
+        serializer = self.app.session_interface.get_signing_serializer(self.app)
+        try:
+            return [message for _, message in serializer.loads(morsel.value).get('_flashes', [])]
+        except Exception:
+            return []
+
+
+def virtual_user(index, make_session, quizzes, stats, args, stop, rng):
+    browser = make_session()
+
+    def call(route, method, path, form=None, expect=(200,)):
+        started = time.perf_counter()
+        try:
+            status, location, _ = browser.request(method, path, form)
+        except (http.client.HTTPException, OSError):
+            status, location = 599, None
+        stats.record(route, time.perf_counter() - started, status in expect)
+        return status, location
+
+    username = f'vu{index}-{os.getpid()}@load.test'
+    call('register', 'POST', '/register', {
+        'username': username, 'password': 'exam-day', 'full_name': f'Student {index}',
+        'qualification': 'Load test', 'dob': '2005-01-01',
+    }, expect=(302,))
+    status, _ = call('login', 'POST', '/login', {'username': username, 'password': 'exam-day'}, expect=(302,))
+    if status != 302:
+        return
+
+    while not stop.is_set():
+        quiz_id, question_ids = rng.choice(quizzes)
+        steps = (
+            ('user_dashboard', 'GET', '/user_dashboard', None, (200,)),
+            ('instructions', 'GET', f'/instructions/{quiz_id}', None, (200,)),
+            ('attempt_quiz', 'GET', f'/attempt_quiz/{quiz_id}', None, (200,)),
+        )
+        for route, method, path, form, expect in steps:
+            call(route, method, path, form, expect)
+            if args.think:
+                time.sleep(rng.uniform(0, 2 * args.think))
+
+        answers = {f'question_{question_id}': rng.choice('ABCD') for question_id in question_ids}
+        status, location = call('submit_quiz', 'POST', '/submit_quiz', {'quiz_id': quiz_id, **answers},
+                                expect=(302,))
+        if SUBMIT_FAILED in browser.flashes():
+            stats.lock_error('submit_quiz')
+        if location:
+            call('quiz_feedback', 'GET', location)
+        call('quiz_summary', 'GET', '/quiz_summary')
+
+
+def seed(app, args):
+    from sqlalchemy import insert
+
+    from models.models import Chapter, Question, Quiz, Subject, db
+    from services.database import init_db
+
+    rng = random.Random(args.seed)
+    with app.app_context():
+        init_db()
+        subject = Subject(name='Load test', description='Exam-day rush')
+        chapter = Chapter(name='Everything', subject=subject)
+        db.session.add(chapter)
+        db.session.flush()
+        quizzes = []
+        for i in range(args.quizzes):
+            quiz = Quiz(chapter_id=chapter.id, date_of_quiz=date.today(), time_duration=30, remarks=f'Load quiz {i}')
+            db.session.add(quiz)
+            db.session.flush()
+            db.session.execute(insert(Question), [
+                {'quiz_id': quiz.id, 'question_statement': f'Question {j}', 'optionA': 'a', 'optionB': 'b',
+                 'optionC': 'c', 'optionD': 'd', 'correct_option': rng.choice('ABCD')}
+                for j in range(args.questions)
+            ])
+            question_ids = [row.id for row in db.session.query(Question.id).filter_by(quiz_id=quiz.id)]
+            quizzes.append((quiz.id, question_ids))
+        db.session.commit()
+    return quizzes
+
+
+def start_server(args, env):
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    code = (
+        f"import sys; sys.path.insert(0, {ROOT!r})\n"
+        "from app import app\n"
+        "from services import server\n"
+        f"server.serve(app, SERVER_WORKERS={args.workers}, SERVER_THREADS={args.threads}, "
+        f"SERVER_HTTP_PORT={port}, SERVER_HTTPS_PORT=0)\n"
+    )
+    proc = subprocess.Popen([sys.executable, '-c', code], env=env, cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return proc, port
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError('server did not start')
+
+
+def percentile(values, fraction):
+    return round(values[min(len(values) - 1, int(fraction * len(values)))] * 1000, 1) if values else None
+
+
+def summarize(stats, elapsed):
+    routes = {}
+    for route in ROUTES:
+        values = sorted(stats.latencies[route])
+        count = len(values)
+        routes[route] = {
+            'requests': count,
+            'throughput_rps': round(count / elapsed, 2),
+            'p50_ms': percentile(values, 0.50),
+            'p95_ms': percentile(values, 0.95),
+            'p99_ms': percentile(values, 0.99),
+            'max_ms': round(values[-1] * 1000, 1) if values else None,
+            'errors': stats.errors[route],
+            'error_rate': round(stats.errors[route] / count, 4) if count else 0.0,
+            'lock_errors': stats.lock_errors[route],
+            'lock_error_rate': round(stats.lock_errors[route] / count, 4) if count else 0.0,
+        }
+    total = sum(route['requests'] for route in routes.values())
+    return {
+        'requests': total,
+        'throughput_rps': round(total / elapsed, 2),
+        'exams_completed': routes['quiz_summary']['requests'],
+        'errors': sum(route['errors'] for route in routes.values()),
+        'lock_errors': sum(route['lock_errors'] for route in routes.values()),
+        'routes': routes,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous, current):
+    print(f"\n{'route':<16}{'p95 before':>12}{'p95 now':>10}{'rps before':>12}{'rps now':>10}")
+    for route in ROUTES:
+        before, now = previous['summary']['routes'].get(route, {}), current['summary']['routes'][route]
+        print(f"{route:<16}{before.get('p95_ms') or '-':>12}{now['p95_ms'] or '-':>10}"
+              f"{before.get('throughput_rps', '-'):>12}{now['throughput_rps']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=50, help='Concurrent virtual users.')
+    parser.add_argument('--duration', type=float, default=60, help='Seconds to run after ramp-up starts.')
+    parser.add_argument('--ramp', type=float, default=10, help='Seconds over which VUs are started.')
+    parser.add_argument('--target', choices=('inprocess', 'server'), default='inprocess')
+    parser.add_argument('--workers', type=int, default=2, help='Server worker processes (--target server).')
+    parser.add_argument('--threads', type=int, default=8, help='Threads per server worker (--target server).')
+    parser.add_argument('--quizzes', type=int, default=5)
+    parser.add_argument('--questions', type=int, default=20, help='Questions per quiz.')
+    parser.add_argument('--think', type=float, default=0, help='Mean think time between page views (s).')
+    parser.add_argument('--hash-method', default='scrypt:4096:8:1',
+                        help='PASSWORD_HASH_METHOD for the run; production cost makes sign-up dominate.')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='JSON results file (default: benchmarks/results/loadtest-<time>.json).')
+    parser.add_argument('--compare', help='Earlier results file to diff against.')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='quiz_load_')
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'load.db')}",
+               PASSWORD_HASH_METHOD=args.hash_method)
+    os.environ.update(env)
+
+    from sqlalchemy import event
+
+    from app import create_app
+    from models.models import db
+
+    app = create_app()
+    quizzes = seed(app, args)
+    stats = Stats()
+
+    server = None
+    if args.target == 'server':
+        server, port = start_server(args, env)
+
+        def make_session():
+            return HTTPSession(app, port)
+    else:
+        from flask import has_request_context, request
+
+        with app.app_context():
+            @event.listens_for(db.engine, 'handle_error')
+            def count_lock_errors(context):
+                if 'database is locked' in str(context.original_exception) and has_request_context():
+                    route = (request.endpoint or '').rsplit('.', 1)[-1].replace('user_login', 'login')
+                    if route in ROUTES:
+                        stats.lock_error(route)
+
+        def make_session():
+            return TestClientSession(app)
+
+    stop = threading.Event()
+    threads = []
+    started = time.perf_counter()
+    try:
+        for i in range(args.users):
+            rng = random.Random(args.seed * 100003 + i)
+            thread = threading.Thread(target=virtual_user, daemon=True,
+                                      args=(i, make_session, quizzes, stats, args, stop, rng))
+            thread.start()
+            threads.append(thread)
+            time.sleep(args.ramp / args.users if args.users else 0)
+        remaining = args.duration - (time.perf_counter() - started)
+        if remaining > 0:
+            time.sleep(remaining)
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=60)
+        elapsed = time.perf_counter() - started
+    finally:
+        stop.set()
+        if server:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+
+    result = {
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'git_revision': git_revision(),
+        'settings': vars(args),
+        'elapsed_s': round(elapsed, 2),
+        'summary': summarize(stats, elapsed),
+    }
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results',
+                                         f"loadtest-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+
+    summary = result['summary']
+    print(f"{summary['requests']} requests in {elapsed:.1f}s ({summary['throughput_rps']} req/s), "
+          f"{summary['exams_completed']} exams, {summary['errors']} errors, {summary['lock_errors']} lock errors")
+    print(f"{'route':<16}{'req':>7}{'rps':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'err':>6}{'lock':>6}")
+    for route, row in summary['routes'].items():
+        print(f"{route:<16}{row['requests']:>7}{row['throughput_rps']:>8}{row['p50_ms'] or '-':>9}"
+              f"{row['p95_ms'] or '-':>9}{row['p99_ms'] or '-':>9}{row['errors']:>6}{row['lock_errors']:>6}")
+    print(f"Results written to {output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), result)
+
+
+if __name__ == '__main__':
+    main()
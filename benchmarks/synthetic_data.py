@@ -0,0 +1,246 @@
+"""Deterministic synthetic dataset for performance work, at any scale.
+
+    python benchmarks/synthetic_data.py DATABASE_FILE [--scale 0.01] [--seed 1]
+        [--users N] [--quizzes N] [--questions N] [--responses N] [--legacy]
+
+`--scale 1` is the full exam-season dataset: 100k users, 1k quizzes, 50k
+questions and 20M user responses (answers, about 400k attempts). Smaller
+scales shrink every table in proportion. Explicit counts override the scale.
+The same seed and sizes always give the same rows. Every user's password is
+"password".
+
+The target file must not exist yet, or must hold only the seeded admin. The
+schema comes from the app (create_all and migrations). Rows then go in
+through raw executemany batches with fsync off. The attempts index is built
+after its rows are loaded, and the derived tables (search index, quiz_stats,
+platform counters) are rebuilt at the end. Also importable: generate(app,
+sizes) is what bench_route_scaling.py uses. With `--legacy` the answers go
+into the old one-row-per-answer user_response table instead, left for
+migration 3 to pack on the next start (see bench_packed_storage.py).
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BATCH_SIZE = 50_000
+PASSWORD = 'password'
+FIRST_NAMES = ('Aarav', 'Diya', 'Ishaan', 'Meera', 'Kabir', 'Anaya', 'Vihaan', 'Sara', 'Arjun', 'Zoya')
+LAST_NAMES = ('Sharma', 'Iyer', 'Khan', 'Patel', 'Das', 'Menon', 'Gupta', 'Singh', 'Rao', 'Bose')
+QUALIFICATIONS = ('Class 10', 'Class 12', 'B.Sc', 'B.Tech', 'B.A', 'M.Sc')
+
+# The table and index quiz_attempt replaced (schema version 2)
+LEGACY_USER_RESPONSE = (
+    "CREATE TABLE user_response ("
+    "id INTEGER NOT NULL PRIMARY KEY, "
+    "user_id INTEGER NOT NULL REFERENCES user (id), "
+    "quiz_id INTEGER NOT NULL REFERENCES quiz (id) ON DELETE CASCADE, "
+    "question_id INTEGER NOT NULL REFERENCES question (id) ON DELETE CASCADE, "
+    "selected_answer VARCHAR(1) NOT NULL, "
+    "is_correct BOOLEAN NOT NULL)"
+)
+LEGACY_USER_RESPONSE_INDEX = "CREATE INDEX ix_user_response_user_quiz ON user_response (user_id, quiz_id)"
+
+
+@dataclass
+class Sizes:
+    users: int = 100_000
+    subjects: int = 20
+    chapters: int = 200
+    quizzes: int = 1_000
+    questions: int = 50_000
+    responses: int = 20_000_000
+
+    @classmethod
+    def at_scale(cls, scale, **overrides):
+        full = cls()
+        sizes = {name: max(1, round(value * scale)) for name, value in asdict(full).items()}
+        sizes.update({name: value for name, value in overrides.items() if value is not None})
+        sizes['chapters'] = max(sizes['chapters'], sizes['subjects'])
+        sizes['questions'] = max(sizes['questions'], sizes['quizzes'])
+        return cls(**sizes)
+
+
+def _password_hash(method):
+    # A fixed salt keeps the file byte-for-byte reproducible; this is test data only
+    from werkzeug.security import _hash_internal
+    salt = 'syntheticsalt000'
+    hashed, actual_method = _hash_internal(method, salt, PASSWORD)
+    return f"{actual_method}${salt}${hashed}"
+
+
+def _insert(cursor, table, columns, rows):
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            cursor.executemany(sql, batch)
+            count += len(batch)
+            batch.clear()
+    if batch:
+        cursor.executemany(sql, batch)
+        count += len(batch)
+    return count
+
+
+def generate(app, sizes, seed=1, echo=print, legacy=False):
+    """Fill the app's (empty) database with `sizes` rows. Returns {table: rows inserted}.
+
+    `legacy` stores the answers as user_response rows and marks the schema as
+    version 2, so migration 3 packs them on the next init_db()/db-upgrade.
+    """
+    from models.models import User, db
+    from services.attempts import pack_attempt
+    from services.database import init_db
+    from services.platform_stats import recompute_platform_stats
+    from services.score_stats import rebuild_quiz_stats
+    from services.search import rebuild_search_index
+
+    rng = random.Random(seed)
+    today = date.today()
+    counts = {}
+    with app.app_context():
+        init_db()
+        if User.query.first():
+            raise SystemExit('The database already has users; generate into a new file.')
+        password = _password_hash(app.config.get('PASSWORD_HASH_METHOD', 'scrypt'))
+
+        raw = db.engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            cursor.execute("PRAGMA synchronous = OFF")
+            started = time.perf_counter()
+
+            def step(table, columns, rows):
+                counts[table] = _insert(cursor, table, columns, rows)
+                raw.commit()
+                echo(f"{table:<14}{counts[table]:>12,} rows  {time.perf_counter() - started:8.1f}s")
+
+            step('user', ('id', 'username', 'password', 'full_name', 'qualification', 'dob'), (
+                (i, f'user{i}@example.com', password,
+                 f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}', rng.choice(QUALIFICATIONS),
+                 (date(1995, 1, 1) + timedelta(days=rng.randrange(4000))).isoformat())
+                for i in range(1, sizes.users + 1)
+            ))
+            step('subject', ('id', 'name', 'description'), (
+                (i, f'Subject {i}', f'Synthetic subject number {i}') for i in range(1, sizes.subjects + 1)
+            ))
+            step('chapter', ('id', 'name', 'subject_id'), (
+                (i, f'Chapter {i}', (i - 1) % sizes.subjects + 1) for i in range(1, sizes.chapters + 1)
+            ))
+            # Quizzes over the past year, with a handful scheduled for today
+            quiz_dates = [None] + [today - timedelta(days=0 if i % 50 == 1 else rng.randrange(365))
+                                   for i in range(1, sizes.quizzes + 1)]
+            step('quiz', ('id', 'chapter_id', 'date_of_quiz', 'time_duration', 'remarks'), (
+                (i, (i - 1) % sizes.chapters + 1, quiz_dates[i].isoformat(),
+                 rng.choice((15, 30, 45, 60)), f'Synthetic quiz {i}')
+                for i in range(1, sizes.quizzes + 1)
+            ))
+
+            # Questions split evenly across quizzes; keep each quiz's answer key for the responses
+            answer_keys = [[] for _ in range(sizes.quizzes + 1)]
+
+            def questions():
+                for i in range(1, sizes.questions + 1):
+                    quiz_id = (i - 1) % sizes.quizzes + 1
+                    correct = 'ABCD'[rng.getrandbits(2)]
+                    answer_keys[quiz_id].append((i, correct))
+                    yield (i, quiz_id, f'Synthetic question {i}?', f'Option A{i}', f'Option B{i}',
+                           f'Option C{i}', f'Option D{i}', correct)
+            step('question', ('id', 'quiz_id', 'question_statement', 'optionA', 'optionB', 'optionC',
+                              'optionD', 'correct_option'), questions())
+
+            # Attempts: a random student takes a random quiz and answers every question, right
+            # with that student's own probability. Best score per (user, quiz) feeds quiz_score.
+            skill = [0.0] + [0.3 + 0.65 * rng.random() for _ in range(sizes.users)]
+            best = {}
+
+            def attempts():
+                produced = 0
+                while produced < sizes.responses:
+                    user_id = rng.randrange(1, sizes.users + 1)
+                    quiz_id = rng.randrange(1, sizes.quizzes + 1)
+                    submitted_at = datetime.combine(quiz_dates[quiz_id], datetime.min.time()) + timedelta(
+                        minutes=rng.randrange(1440))
+                    responses = []
+                    for question_id, correct in answer_keys[quiz_id][:sizes.responses - produced]:
+                        if rng.random() < skill[user_id]:
+                            selected = correct
+                        else:
+                            selected = 'ABCD'[rng.getrandbits(2)]  # A guess, sometimes lucky
+                        responses.append((question_id, selected, int(selected == correct)))
+                    produced += len(responses)
+                    score = sum(is_correct for _, _, is_correct in responses)
+                    if score > best.get((user_id, quiz_id), -1):
+                        best[(user_id, quiz_id)] = score
+                    yield user_id, quiz_id, submitted_at, responses
+
+            if legacy:
+                cursor.execute(LEGACY_USER_RESPONSE)
+                step('user_response', ('user_id', 'quiz_id', 'question_id', 'selected_answer', 'is_correct'), (
+                    (user_id, quiz_id, question_id, selected, is_correct)
+                    for user_id, quiz_id, _, responses in attempts()
+                    for question_id, selected, is_correct in responses
+                ))
+                cursor.execute(LEGACY_USER_RESPONSE_INDEX)
+                cursor.execute("PRAGMA user_version = 2")
+            else:
+                columns = ('user_id', 'quiz_id', 'submitted_at', 'question_count', 'score',
+                           'question_ids', 'answers', 'correct')
+                cursor.execute("DROP INDEX IF EXISTS ix_quiz_attempt_user_quiz")
+                step('quiz_attempt', columns, (
+                    tuple(row[column] for column in columns)
+                    for row in (pack_attempt(user_id, quiz_id, responses, submitted_at.isoformat(sep=' '))
+                                for user_id, quiz_id, submitted_at, responses in attempts())
+                ))
+                cursor.execute("CREATE INDEX IF NOT EXISTS ix_quiz_attempt_user_quiz ON quiz_attempt (user_id, quiz_id)")
+            raw.commit()
+
+            base_time = datetime.combine(today, datetime.min.time()) - timedelta(days=365)
+            step('quiz_score', ('user_id', 'quiz_id', 'score', 'total_questions', 'percentage', 'timestamp'), (
+                (user_id, quiz_id, score, len(answer_keys[quiz_id]),
+                 score / len(answer_keys[quiz_id]) * 100 if answer_keys[quiz_id] else 0,
+                 (base_time + timedelta(minutes=rng.randrange(525_600))).isoformat(sep=' '))
+                for (user_id, quiz_id), score in sorted(best.items())
+            ))
+            step('feedback', ('content',), ((f'Synthetic feedback {i}',) for i in range(1, 101)))
+        finally:
+            raw.close()
+
+        started = time.perf_counter()
+        rebuild_search_index()
+        rebuild_quiz_stats()
+        recompute_platform_stats()
+        echo(f"derived tables rebuilt in {time.perf_counter() - started:.1f}s")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('database', help='SQLite file to create.')
+    parser.add_argument('--scale', type=float, default=0.01, help='Fraction of the full dataset (1 = 20M responses).')
+    parser.add_argument('--seed', type=int, default=1)
+    for name in ('users', 'subjects', 'chapters', 'quizzes', 'questions', 'responses'):
+        parser.add_argument(f'--{name}', type=int)
+    parser.add_argument('--legacy', action='store_true', help='Write one user_response row per answer (schema 2).')
+    args = parser.parse_args()
+
+    sizes = Sizes.at_scale(args.scale, users=args.users, subjects=args.subjects, chapters=args.chapters,
+                           quizzes=args.quizzes, questions=args.questions, responses=args.responses)
+    sys.path.insert(0, ROOT)
+    from app import create_app
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.abspath(args.database)}"})
+    print(f"Generating {asdict(sizes)} with seed {args.seed}")
+    generate(app, sizes, seed=args.seed, legacy=args.legacy)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,16 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 from sqlalchemy import text
 from models.models import db, Admin, User, Feedback
-from werkzeug.security import check_password_hash, generate_password_hash
 from datetime import date, datetime
+from services import platform_stats
+from services.passwords import PasswordHasherBusy, hash_password, verify_password
+from services.pagination import invalidate_count
 
 auth_bp = Blueprint('auth', __name__)
 
+# Shown when the password hashing queue is full (see services/passwords.py)
+BUSY_MESSAGE = "Lots of people are signing in right now. Please try again in a few seconds."
+
 # Admin Login Route
 @auth_bp.route('/admin_login', methods=['GET', 'POST'])
 def admin_login():
@@ -14,9 +19,15 @@ def admin_login():
         password = request.form['password']
 
         admin = Admin.query.filter_by(username=username).first()
-        if admin and check_password_hash(admin.password, password):
+        try:
+            verified = admin is not None and verify_password(admin, password)
+        except PasswordHasherBusy:
+            flash(BUSY_MESSAGE, 'warning')
+            return render_template('login.html', role='admin'), 503
+        if verified:
+            db.session.commit()  # Keeps a hash upgraded to the current cost, if any
             session['admin_logged_in'] = True
-            return redirect(url_for('admin_dashboard'))
+            return redirect(url_for('main.admin_dashboard'))
         else:
             flash('Invalid credentials', 'danger')
 
@@ -33,7 +44,7 @@ def vulnerable_login():
 
         if result:
             session['user_id'] = result[0]  # Assuming first column is id
-            return redirect(url_for('user_dashboard'))
+            return redirect(url_for('main.user_dashboard'))
         else:
             flash('Invalid credentials', 'danger')
             return render_template('login.html', role='vulnerable_user')
@@ -82,9 +93,15 @@ def register():
 
         # Create and save the new user
         user = User(username=username, full_name=full_name, qualification=qualification, dob=dob)
-        user.set_password(password)  # Hash password
+        try:
+            user.password = hash_password(password)
+        except PasswordHasherBusy:
+            flash(BUSY_MESSAGE, 'warning')
+            return render_template('register.html'), 503
         db.session.add(user)
+        platform_stats.bump(total_users=1, na_count=1)  # A new user has no scores yet
         db.session.commit()
+        invalidate_count(User)
         flash("Registration successful! Please log in.", "success")
         return redirect(url_for('auth.user_login'))
     
@@ -98,9 +115,15 @@ def user_login():
         password = request.form['password']
 
         user = User.query.filter_by(username=username).first()
-        if user and user.check_password(password):
+        try:
+            verified = user is not None and verify_password(user, password)
+        except PasswordHasherBusy:
+            flash(BUSY_MESSAGE, 'warning')
+            return render_template('login.html', role='user'), 503
+        if verified:
+            db.session.commit()  # Keeps a hash upgraded to the current cost, if any
             session['user_id'] = user.id
-            return redirect(url_for('user_dashboard'))
+            return redirect(url_for('main.user_dashboard'))
         else:
             flash('Invalid credentials', 'danger')
 
@@ -110,7 +133,7 @@ def user_login():
 @auth_bp.route('/logout')
 def logout():
     session.clear()
-    return redirect(url_for('home'))
+    return redirect(url_for('main.home'))
 
 # Feedback Route
 @auth_bp.route('/')
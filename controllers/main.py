@@ -0,0 +1,801 @@
+import os
+from flask import Blueprint, abort, current_app, flash, render_template, request, send_from_directory, session, redirect, url_for
+from models.models import Chapter, Question, Quiz, QuizStats, Subject, User, db
+from datetime import date, datetime
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import text
+from sqlalchemy.orm import Bundle, joinedload
+from services import payments
+from services.pagination import cached_count, invalidate_count, keyset_paginate
+from services.query_budget import query_budget
+from services.search import TITLE, match_subquery
+from services.question_import import import_upload
+from services.grading import grade, save_best_score, save_responses
+from services import platform_stats
+from services.platform_stats import get_platform_stats
+from services.quiz_cache import quiz_cache
+from services import archive
+from services import attempts
+from services import autosave
+from services import catalog_cache
+from services import metrics
+from services import profiler
+from services import sql_stats
+from services import submission_queue
+
+main_bp = Blueprint('main', __name__)
+
+# Index Homepage
+@main_bp.route('/')
+def home():
+    flash("Welcome to Quiz Master!", "success")  
+    return render_template("index.html")  
+
+### ADMIN ROUTES ###
+
+@main_bp.route('/admin_dashboard', methods=['GET', 'POST'])
+@query_budget(10)
+def admin_dashboard():
+    if 'admin_logged_in' not in session:
+        return redirect(url_for('auth.admin_login'))
+
+    if request.method == 'POST':
+        action = request.form.get('action')
+
+        # --- Subject CRUD ---
+        if action == 'create_subject':
+            name = request.form.get('name')
+            description = request.form.get('description')
+
+            if name:
+                existing_subject = Subject.query.filter_by(name=name).first()
+                if existing_subject:
+                    flash('Subject already exists!', 'warning') 
+                else:
+                    try:
+                        new_subject = Subject(name=name, description=description)
+                        db.session.add(new_subject)
+                        platform_stats.bump(total_subjects=1)
+                        catalog_cache.bump_version()
+                        db.session.commit()
+                        invalidate_count(Subject)
+                        flash('Subject added successfully!', 'success')
+                    except IntegrityError:
+                        db.session.rollback()
+                        flash('An error occurred while adding the subject. Please try again.', 'danger')
+
+        elif action == 'edit_subject':
+            subject_id = request.form.get('id')
+            name = request.form.get('name')
+            description = request.form.get('description')
+            subject = Subject.query.get(subject_id)
+            if subject:
+                subject.name = name
+                subject.description = description
+                catalog_cache.bump_version()
+                db.session.commit()
+                flash('Subject updated successfully!', 'success')
+
+        elif action == 'delete_subject':
+            subject_id = request.form.get('id')
+            subject = Subject.query.get(subject_id)
+            if subject:
+                db.session.delete(subject)
+                platform_stats.mark_stale()
+                catalog_cache.bump_version()
+                db.session.commit()
+                quiz_cache.invalidate()
+                invalidate_count(Subject, Chapter, Quiz, Question)
+                flash('Subject and its related chapters were deleted successfully!', 'danger')
+
+        elif action == 'create_chapter':
+            subject_id = request.form.get('subject_id')
+            name = request.form.get('name')
+
+            if subject_id and name:
+                existing_chapter = Chapter.query.filter_by(subject_id=subject_id, name=name).first()
+                if existing_chapter:
+                    flash('Chapter already exists for this subject!', 'warning') 
+                else:
+                    try:
+                        new_chapter = Chapter(subject_id=subject_id, name=name)
+                        db.session.add(new_chapter)
+                        catalog_cache.bump_version()
+                        db.session.commit()
+                        invalidate_count(Chapter)
+                        flash('Chapter added successfully!', 'success')
+                    except IntegrityError:
+                        db.session.rollback()
+                        flash('An error occurred while adding the chapter. Please try again.', 'danger')
+
+        elif action == 'edit_chapter':
+            chapter_id = request.form.get('id')
+            chapter = Chapter.query.get(chapter_id)
+            if chapter:
+                chapter.name = request.form.get('name')
+                catalog_cache.bump_version()
+                db.session.commit()
+                flash('Chapter updated successfully!', 'success')
+
+        elif action == 'delete_chapter':
+            chapter_id = request.form.get('id')
+            chapter = Chapter.query.get(chapter_id)
+            if chapter:
+                db.session.delete(chapter)
+                platform_stats.mark_stale()
+                catalog_cache.bump_version()
+                db.session.commit()
+                quiz_cache.invalidate()
+                invalidate_count(Chapter, Quiz, Question)
+                flash('Chapter and its related quizzes were deleted successfully!', 'danger')
+
+        elif action == 'create_quiz':
+            chapter_id = request.form.get('chapter_id')
+            date_of_quiz_str = request.form.get('date_of_quiz')
+            time_duration = request.form.get('time_duration')
+            remarks = request.form.get('remarks')
+
+            # Validate remarks (Required)
+            if not remarks.strip():
+                flash('Remarks are required.', 'danger')
+                return redirect(request.referrer)
+
+            # Convert and validate quiz date
+            date_of_quiz = datetime.strptime(date_of_quiz_str, '%Y-%m-%d').date()
+            if date_of_quiz < date.today():
+                flash('Quiz date cannot be in the past.', 'danger')
+
+            # Convert time_duration to integer
+            try:
+                time_duration = int(time_duration)
+                if time_duration <= 0:
+                    flash('Time duration must be a positive number.', 'danger')
+                    return redirect(request.referrer)
+            except ValueError:
+                flash('Invalid time duration. Please enter a number.', 'danger')
+                return redirect(request.referrer)
+
+            # Save quiz if all validations pass
+            new_quiz = Quiz(
+                chapter_id=chapter_id,
+                date_of_quiz=date_of_quiz,
+                time_duration=time_duration,
+                remarks=remarks
+            )
+            db.session.add(new_quiz)
+            platform_stats.bump(total_quizzes=1)
+            catalog_cache.bump_version()
+            db.session.commit()
+            invalidate_count(Quiz)
+            flash('Quiz added successfully!', 'success')
+            return redirect(request.referrer)
+
+        elif action == 'edit_quiz':
+            quiz_id = request.form.get('id')
+            quiz = Quiz.query.get(quiz_id)
+            
+            if quiz:
+                date_of_quiz_str = request.form.get('date_of_quiz')  # Get date as string
+                quiz.time_duration = request.form.get('time_duration')
+                quiz.remarks = request.form.get('remarks')
+
+                if date_of_quiz_str:
+                    try:
+                        # Convert string to date
+                        date_of_quiz = datetime.strptime(date_of_quiz_str, '%Y-%m-%d').date()
+                        today = datetime.today().date()
+
+                        # Validation: Ensure selected date is today or in the future
+                        if date_of_quiz < today:
+                            flash('Quiz date cannot be in the past. Please select today or a future date.', 'danger')
+                            return redirect(url_for('main.admin_dashboard'))  # Prevent commit if date is invalid
+
+                        # If valid, update quiz object
+                        quiz.date_of_quiz = date_of_quiz
+                    except ValueError:
+                        flash('Invalid date format. Please use YYYY-MM-DD.', 'danger')
+                        return redirect(url_for('main.admin_dashboard'))
+
+                catalog_cache.bump_version()
+                db.session.commit()
+                flash('Quiz updated successfully!', 'success')
+            else:
+                flash('Quiz not found!', 'danger')
+        elif action == 'delete_quiz':
+            quiz_id = request.form.get('id')
+            quiz = Quiz.query.get(quiz_id)
+            if quiz:
+                db.session.delete(quiz)
+                platform_stats.mark_stale()
+                catalog_cache.bump_version()
+                db.session.commit()
+                quiz_cache.invalidate(quiz.id)
+                invalidate_count(Quiz, Question)
+                flash('Quiz and its related questions, scores, and responses were deleted successfully!', 'danger')
+
+        # --- Question CRUD ---
+        elif action == 'create_question':
+            quiz_id = request.form.get('quiz_id')
+            question_statement = request.form.get('question_statement')
+            option_a = request.form.get('option_a')
+            option_b = request.form.get('option_b')
+            option_c = request.form.get('option_c')
+            option_d = request.form.get('option_d')
+            correct_option = request.form.get('correct_option')
+
+            new_question = Question(quiz_id=quiz_id, question_statement=question_statement, optionA=option_a, optionB=option_b, optionC=option_c, optionD=option_d, correct_option=correct_option)
+            
+            db.session.add(new_question)
+            db.session.commit()
+            quiz_cache.invalidate(new_question.quiz_id)
+            invalidate_count(Question)
+            flash('Question added successfully!', 'success')
+
+        return redirect(url_for('main.admin_dashboard'))
+
+    # Admin Search functionality
+    search_query = request.args.get('search_query', '').strip()
+
+    # Each section is keyset-paginated on its own cursor (users_after, subjects_after, ...)
+    if search_query:
+        # Prefix matches from the FTS5 index (username/full name/qualification,
+        # subject name, chapter or its subject's name, quiz title or its chapter's name)
+        user_hits = match_subquery(User, search_query)
+        users_query = User.query.join(user_hits, User.id == user_hits.c.ref_id)
+
+        subject_hits = match_subquery(Subject, search_query)
+        subjects_query = Subject.query.join(subject_hits, Subject.id == subject_hits.c.ref_id)
+
+        chapter_hits = match_subquery(Chapter, search_query)
+        chapters_query = Chapter.query.join(chapter_hits, Chapter.id == chapter_hits.c.ref_id).options(joinedload(Chapter.subject))
+
+        quiz_hits = match_subquery(Quiz, search_query)
+        quizzes_query = Quiz.query.join(quiz_hits, Quiz.id == quiz_hits.c.ref_id).options(joinedload(Quiz.chapter))
+
+        users = keyset_paginate(users_query, User.id, 'users')
+        subjects = keyset_paginate(subjects_query, Subject.id, 'subjects')
+        chapters = keyset_paginate(chapters_query, Chapter.id, 'chapters')
+        quizzes = keyset_paginate(quizzes_query, Quiz.id, 'quizzes')
+
+        # Hide sections without results
+        show_users = bool(users.items)
+        show_subjects = bool(subjects.items)
+        show_chapters = bool(chapters.items)
+        show_quizzes = bool(quizzes.items)
+
+    else:
+        users = keyset_paginate(User.query, User.id, 'users', total=cached_count(User))
+        subjects = keyset_paginate(Subject.query, Subject.id, 'subjects', total=cached_count(Subject))
+        chapters_query = Chapter.query.options(joinedload(Chapter.subject))
+        quizzes_query = Quiz.query.options(joinedload(Quiz.chapter))
+
+        chapters = keyset_paginate(chapters_query, Chapter.id, 'chapters', total=cached_count(Chapter))
+        quizzes = keyset_paginate(quizzes_query, Quiz.id, 'quizzes', total=cached_count(Quiz))
+
+        # Show all sections when no search is performed
+        show_users = show_subjects = show_quizzes = show_chapters = True
+
+    # The "Add Chapter"/"Add Quiz" dropdowns need every option, not just the current page
+    subject_options = db.session.query(Subject.id, Subject.name).order_by(Subject.name).all()
+    chapter_options = db.session.query(Chapter.id, Chapter.name).order_by(Chapter.name).all()
+
+    return render_template('admin_dashboard.html', users=users, subjects=subjects, chapters=chapters, quizzes=quizzes, subject_options=subject_options, chapter_options=chapter_options, search_query=search_query, show_users=show_users, show_subjects=show_subjects, show_chapters = show_chapters, show_quizzes=show_quizzes
+    )
+
+@main_bp.route('/manage_questions', methods=['GET', 'POST'])
+@query_budget(4)
+def manage_questions():
+    if 'admin_logged_in' not in session:
+        return redirect(url_for('auth.admin_login'))
+    
+    if request.method == 'POST':
+        action = request.form.get('action')
+
+        if action == 'create_question':
+            quiz_id = request.form.get('quiz_id')
+            question_text = request.form.get('question_text')
+            optionA = request.form.get('optionA')
+            optionB = request.form.get('optionB')
+            optionC = request.form.get('optionC')
+            optionD = request.form.get('optionD')
+            correct_option = request.form.get('correct_option')
+
+            new_question = Question(
+                quiz_id=quiz_id,
+                question_statement=question_text,
+                optionA=optionA,
+                optionB=optionB,
+                optionC=optionC,
+                optionD=optionD,
+                correct_option=correct_option
+            )
+
+
+            db.session.add(new_question)
+            db.session.commit()
+            quiz_cache.invalidate(new_question.quiz_id)
+            invalidate_count(Question)
+            flash('Question added successfully!', 'success')
+
+        elif action == 'delete_question':
+            question_id = request.form.get('question_id')
+            question = Question.query.get(question_id)
+            if question:
+                db.session.delete(question)
+                db.session.commit()
+                quiz_cache.invalidate(question.quiz_id)
+                invalidate_count(Question)
+                flash('Question deleted successfully!', 'danger')
+
+    # The dropdown shows "quiz (chapter - subject)", so load both parents in the same SELECT
+    quizzes = Quiz.query.options(joinedload(Quiz.chapter).joinedload(Chapter.subject)).all()
+    questions = keyset_paginate(Question.query, Question.id, 'questions', total=cached_count(Question))
+    return render_template('manage_questions.html', quizzes=quizzes, questions=questions)
+
+@main_bp.route('/import_questions', methods=['POST'])
+def import_questions():
+    if 'admin_logged_in' not in session:
+        return redirect(url_for('auth.admin_login'))
+
+    question_file = request.files.get('question_file')
+    if not question_file or not question_file.filename:
+        flash('Please choose a CSV or JSON file to import.', 'warning')
+        return redirect(url_for('main.manage_questions'))
+
+    report = import_upload(question_file)
+    quiz_cache.invalidate()
+    invalidate_count(Question)
+
+    if report.inserted:
+        flash(f'Imported {report.inserted} questions.', 'success')
+    for row_number, message in report.errors[:5]:
+        flash(f'Row {row_number}: {message}', 'danger')
+    if report.failed > 5:
+        flash(f'{report.failed} rows were rejected in total.', 'warning')
+    return redirect(url_for('main.manage_questions'))
+
+@main_bp.route('/edit_question/<int:question_id>', methods=['GET', 'POST'])
+def edit_question(question_id):
+    question = Question.query.get_or_404(question_id) 
+
+    if request.method == 'POST':
+        question.question_statement = request.form.get('question_text')
+        question.optionA = request.form.get('optionA')
+        question.optionB = request.form.get('optionB')
+        question.optionC = request.form.get('optionC')
+        question.optionD = request.form.get('optionD')
+        question.correct_option = request.form.get('correct_option')
+
+        db.session.commit()
+        quiz_cache.invalidate(question.quiz_id)
+        flash('Question updated successfully!', 'info')
+        return redirect(url_for('main.manage_questions')) 
+
+    return render_template('edit_question.html', question=question)  # Return response in GET method
+
+@main_bp.route('/view_statistics', methods=['GET'])
+@query_budget(3)
+def view_statistics():
+    if 'admin_logged_in' not in session:
+        return redirect(url_for('auth.admin_login'))
+
+    """Fetch summary statistics and pass them to the template."""
+    # Totals and Pass, Fail, and NA Counts are maintained counters, cached in-process
+    stats = get_platform_stats()
+
+    return render_template(
+        'view_statistics.html',
+        total_users=stats['total_users'],
+        total_quizzes=stats['total_quizzes'],
+        total_subjects=stats['total_subjects'],
+        pass_count=stats['pass_count'],
+        fail_count=stats['fail_count'],
+        na_count=stats['na_count']
+    )
+
+@main_bp.route('/admin/perf')
+def admin_perf():
+    if 'admin_logged_in' not in session:
+        return redirect(url_for('auth.admin_login'))
+
+    # Rolling SQL summaries per endpoint, for the worker process that serves this page
+    return render_template('admin_perf.html', summaries=sql_stats.endpoint_summaries(), pid=os.getpid(),
+                           slow_ms=current_app.config['SQL_SLOW_QUERY_MS'])
+
+@main_bp.route('/admin/profiles')
+def admin_profiles():
+    if 'admin_logged_in' not in session:
+        return redirect(url_for('auth.admin_login'))
+
+    # Request profiles from every worker; add ?_profile=1 to any page to take one
+    return render_template('admin_profiles.html', profiles=profiler.list_profiles(current_app.config['PROFILE_DIR']),
+                           keep=current_app.config['PROFILE_KEEP'], sample_rate=current_app.config['PROFILE_SAMPLE_RATE'])
+
+@main_bp.route('/admin/profiles/<name>')
+def download_profile(name):
+    if 'admin_logged_in' not in session:
+        return redirect(url_for('auth.admin_login'))
+
+    if not any(profile['name'] == name for profile in profiler.list_profiles(current_app.config['PROFILE_DIR'])):
+        abort(404)
+    return send_from_directory(current_app.config['PROFILE_DIR'], name, as_attachment=True)
+
+### USER ROUTES ###
+
+@main_bp.route('/user_dashboard')
+@query_budget(5)
+def user_dashboard():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))  
+
+    user = User.query.get(session['user_id'])  # Fetch the logged-in user
+    if not user:
+        return redirect(url_for('login')) # User must exist in database
+    
+    current_date = datetime.today().date()
+
+    # Search Functionality - User
+    search_query = request.args.get('search_query', '').strip()
+
+    # Perform search if query is present
+    if search_query:
+        # Ranked prefix matches on each entity's own name/title, best match first
+        subject_hits = match_subquery(Subject, search_query, columns=TITLE)
+        chapter_hits = match_subquery(Chapter, search_query, columns=TITLE)
+        quiz_hits = match_subquery(Quiz, search_query, columns=TITLE)
+
+        subjects = Subject.query.join(subject_hits, Subject.id == subject_hits.c.ref_id).order_by(subject_hits.c.rank).all()
+        chapters = Chapter.query.join(chapter_hits, Chapter.id == chapter_hits.c.ref_id).order_by(chapter_hits.c.rank).all()
+        quizzes = (
+            Quiz.query.join(quiz_hits, Quiz.id == quiz_hits.c.ref_id)
+            .options(joinedload(Quiz.chapter).joinedload(Chapter.subject))
+            .order_by(quiz_hits.c.rank)
+            .all()
+        )
+        catalog = catalog_cache.catalog_rows(subjects, chapters, quizzes)
+        catalog_html = None
+    else:
+        # The full catalog is the same for every student: rendered once per catalog version and day
+        catalog = None
+        catalog_html = catalog_cache.cached_catalog_html(current_date)
+
+    return render_template('user_dashboard.html', user=user, catalog=catalog, catalog_html=catalog_html, current_date=current_date, search_query=search_query)
+
+@main_bp.route('/inject_xss')
+def inject_xss():
+    user = User.query.filter_by(email="your@email.com").first()  # Find a specific user
+    if user:
+        # Inject malicious script payload into user's name
+        user.name = '<script>setTimeout(function(){ if(confirm("Subscribe now?")) { window.location.href="/hacked"; } }, 3000);</script>'
+        db.session.commit()  # Save to the DB
+        return "Injected XSS into user!"
+    return "User not found"
+
+@main_bp.route('/hacked')
+def hacked():
+    return "<h1 style='color:red;'>Your device has been compromised.</h1><p>This is a demo of a XSS attack.</p>"
+
+# @main_bp.route('/instructions/<int:quiz_id>', methods=['GET', 'POST'])
+# def instructions(quiz_id):
+#     quiz = Quiz.query.get_or_404(quiz_id)
+#     if not quiz:
+#         return "Quiz not found", 404
+
+#     questions = []
+#     if request.method == 'POST':
+#         user_input = request.form.get('start_input', '')
+
+#         # ✅ UNSAFE SQL QUERY (for SQL Injection demo)
+#         query = f"SELECT * FROM question WHERE quiz_id = {user_input};"
+#         result = db.session.execute(query)
+
+#         questions = result.fetchall()
+
+#     return render_template('instructions.html', quiz=quiz, questions=questions)
+
+@main_bp.route('/instructions/<int:quiz_id>', methods=['GET', 'POST'])
+def instructions(quiz_id):
+    quiz = Quiz.query.get_or_404(quiz_id)
+
+    questions = []
+    if request.method == 'POST':
+        user_input = request.form.get('start_input', '').strip()
+
+        if user_input.lower() == 'start':
+            # ✅ If user types "start", redirect to quiz page
+            return redirect(url_for('main.attempt_quiz', quiz_id=quiz_id))
+        else:
+            try:
+                # ✅ Else, treat user_input as raw SQL injection
+                query = f"SELECT * FROM question WHERE quiz_id = {user_input};"
+                result = db.session.execute(text(query))
+                questions = result.fetchall()
+            except Exception as e:
+                print("SQL Injection Error:", e)
+                questions = []  # To avoid crashing page
+
+    return render_template('instructions.html', quiz=quiz, questions=questions)
+
+@main_bp.route('/attempt_quiz/<int:quiz_id>', methods=['GET', 'POST'])
+def attempt_quiz(quiz_id):
+    quiz = Quiz.query.get_or_404(quiz_id)
+    questions = quiz_cache.questions(quiz.id)
+    user_id = session.get('user_id')  # Ensure the user is logged in
+
+    current_date = datetime.today().date()
+
+    # Ensure the quiz is available only on the scheduled date
+    if quiz.date_of_quiz != current_date:
+        flash("This quiz is only available on the assigned date!", "error")
+        return redirect(url_for('main.user_dashboard'))
+
+    correct_count = 0
+    if request.method == 'POST':
+        user_id = session.get('user_id')
+        if not user_id:
+            flash('You need to log in to attempt the quiz.', 'error')
+            return redirect(url_for('login'))
+
+        feedback = []
+        for question in questions:
+            selected_answer = request.form.get(f'question_{question.id}', None)  # Default to None if  - X
+            is_correct = selected_answer == question.correct_option
+            
+            if is_correct:
+                correct_count += 1
+
+            feedback.append({
+                "question": question.question_statement,
+                "selected": selected_answer if selected_answer else "No Answer",
+                "correct": question.correct_option,
+                "is_correct": is_correct
+            })
+
+        # Store every response in one INSERT ('X' if unanswered)
+        responses, _ = grade(quiz_cache.answer_key(quiz.id), request.form, user_id, quiz_id)
+        save_responses(responses)
+        db.session.commit()
+        flash('Quiz submitted successfully!', 'success')
+        return render_template('quiz_feedback.html', quiz=quiz, feedback=feedback, correct_count=correct_count, total=len(questions))
+
+    return render_template('attempt_quiz.html', quiz=quiz, questions=questions)
+
+@main_bp.route('/attempt_quiz/<int:quiz_id>/answers', methods=['GET', 'POST'])
+@query_budget(2)  # The answer key when quiz_cache is cold, then the drafts
+def autosave_answers(quiz_id):
+    if 'user_id' not in session:
+        return {'error': 'Please log in to attempt the quiz.'}, 401
+    user_id = session['user_id']
+    answer_key = quiz_cache.answer_key(quiz_id)
+    if not answer_key:
+        return {'error': 'Quiz not found.'}, 404
+
+    # GET restores the page after a reload; POST takes {"answers": {"<question_id>": "A", ...}}
+    if request.method == 'GET':
+        return {'answers': {str(question_id): answer for question_id, answer in autosave.staged_answers(user_id, quiz_id).items()}}
+
+    answers = autosave.clean_answers(answer_key, (request.get_json(silent=True) or {}).get('answers'))
+    autosave.stage(user_id, quiz_id, answers)
+    return {'saved': len(answers)}
+
+@main_bp.route('/submit_quiz', methods=['POST'])
+def submit_quiz():
+    if 'user_id' not in session:
+        flash("Please log in to submit the quiz.", "error")
+        return redirect(url_for('login'))
+
+    user_id = session['user_id']  # Get user ID from session
+    quiz_id = request.form.get('quiz_id')
+
+    if not quiz_id:
+        flash("Quiz ID missing!", "error")
+        return redirect(url_for('dashboard'))
+
+    quiz = Quiz.query.get(quiz_id)
+    if not quiz:
+        flash("Quiz not found!", "error")
+        return redirect(url_for('dashboard'))
+    if archive.quiz_archived(quiz.id):
+        flash("This quiz has been archived and no longer accepts submissions.", "error")
+        return redirect(url_for('main.user_dashboard'))
+
+    # Grade submitted answers against the answer key and store them in one INSERT
+    answer_key = quiz_cache.answer_key(quiz.id)
+    total_questions = len(answer_key)
+
+    # Answers autosaved during the attempt, overridden by whatever the form carries
+    answers = {f'question_{question_id}': answer for question_id, answer in autosave.staged_answers(user_id, quiz.id).items()}
+    answers.update(request.form.items())
+    responses, score = grade(answer_key, answers, user_id, quiz.id)
+
+    # Calculate the percentage
+    percentage = (score / total_questions) * 100 if total_questions > 0 else 0
+
+    # Write-behind mode: acknowledge once the attempt is spooled; a background writer stores it
+    if current_app.config['SUBMIT_WRITE_BEHIND'] and submission_queue.enqueue(
+            user_id, quiz.id, responses, score, total_questions, percentage):
+        autosave.forget(user_id, quiz.id)  # The writer deletes the stored drafts with the attempt
+        metrics.count_submission()
+        flash("Your answers have been submitted.", "success")
+        return redirect(url_for('main.quiz_feedback', quiz_id=quiz_id, score=score, total_questions=total_questions, percentage=percentage))
+
+    save_responses(responses)
+    autosave.discard([(user_id, quiz.id)])
+
+    # Keep only the best score per user and quiz (one UPSERT); quiz_score triggers
+    # update the class aggregates and platform counters in the same transaction
+    if save_best_score(user_id, quiz.id, score, total_questions, percentage):
+        flash("Congratulations! Your best score has been recorded.", "success")
+    else:
+        flash("Your previous best score remains unchanged.", "info")
+
+    try:
+        db.session.commit()
+        metrics.count_submission()
+    except Exception as e:
+        db.session.rollback()
+        print("Error saving responses:", e)
+        flash("An error occurred while submitting the quiz.", "error")
+    finally:
+        db.session.close()
+
+    return redirect(url_for('main.quiz_feedback', quiz_id=quiz_id, score=score, total_questions=total_questions, percentage=percentage))
+
+@main_bp.route('/quiz_feedback/<int:quiz_id>')
+def quiz_feedback(quiz_id):
+    if 'user_id' not in session:
+        flash("Please log in to view quiz feedback.", "error")
+        return redirect(url_for('login'))
+
+    user_id = session['user_id']
+    quiz = Quiz.query.get_or_404(quiz_id)
+
+    # Fetch all questions related to this quiz
+    questions = quiz_cache.questions(quiz_id)
+    if not questions:
+        flash("No questions found for this quiz.", "error")
+        return redirect(url_for('main.user_dashboard'))
+
+    # Fetch the user's latest attempt, which may still be waiting in the write-behind queue
+    pending = submission_queue.pending_attempt(user_id, quiz_id)
+    latest = attempts.latest_attempt(user_id, quiz_id)
+    if pending and (latest is None or latest.submitted_at is None or pending.submitted_at > latest.submitted_at):
+        responses = pending.responses
+    else:
+        responses = latest.responses if latest else []
+
+    # Convert responses into a dictionary for quick lookup
+    response_dict = {resp.question_id: resp for resp in responses}
+
+    # Fetch the current quiz attempt score from request arguments
+    current_score = request.args.get('score', type=int) or 0
+    total_questions = request.args.get('total_questions', type=int) or 1  # Prevent division by zero
+    percentage = request.args.get('percentage', type=float) or 0.0
+
+    feedback = []
+
+    # Mapping function to get option value from its key (A/B/C/D)
+    def get_option_value(question, option_key):
+        return getattr(question, f'option{option_key}', "Invalid Option")
+
+    for question in questions:
+        user_response = response_dict.get(question.id)
+        selected_option_key = user_response.selected_answer if user_response else "No Answer"
+        correct_option_key = question.correct_option  #'A', 'B', 'C', or 'D'
+
+        selected_answer = get_option_value(question, selected_option_key) if user_response else "No Answer"
+        correct_answer = get_option_value(question, correct_option_key)
+        is_correct = user_response.is_correct if user_response else False
+
+        feedback.append({
+            "question": question.question_statement,
+            "selected": selected_answer,
+            "correct": correct_answer,
+            "is_correct": is_correct
+        })
+
+    return render_template(
+        "quiz_feedback.html",
+        quiz_id=quiz_id,
+        feedback=feedback,
+        correct_count=current_score,  # Display current score
+        total=total_questions,
+        percentage=round(percentage, 2)
+    )
+
+@main_bp.route('/quiz_summary')
+@query_budget(2)
+def quiz_summary():
+    if 'user_id' not in session:
+        flash("Please log in to view your quiz summary.", "error")
+        return redirect(url_for('login'))
+
+    user_id = session['user_id']
+
+    # This user's best scores, including any moved to the archive database
+    scores = archive.user_scores(user_id)
+
+    # Fetch past quiz attempts with subject, chapter, avg_score, and top_score.
+    # Class average and top score come from the per-quiz aggregates (a primary-key join)
+    past_attempts = (
+        db.session.query(
+            Bundle('quiz_score', scores.c.score, scores.c.total_questions, scores.c.percentage, scores.c.timestamp),
+            Quiz,
+            Chapter,
+            Subject,
+            db.func.coalesce(QuizStats.score_sum * 1.0 / QuizStats.attempt_count, 0).label("avg_score"),
+            db.func.coalesce(QuizStats.max_score, 0).label("top_score")
+        )
+        .select_from(scores)
+        .join(Quiz, scores.c.quiz_id == Quiz.id)
+        .join(Chapter, Quiz.chapter_id == Chapter.id)
+        .join(Subject, Chapter.subject_id == Subject.id)
+        .outerjoin(QuizStats, QuizStats.quiz_id == scores.c.quiz_id)
+        .order_by(scores.c.timestamp.desc())
+        .all()
+    )
+
+    # Compute both user's total score and class average score: the class side sums the
+    # per-quiz aggregates, the user side only touches this user's scores
+    subject_scores_query = (
+        db.session.query(
+            Subject.name.label('subject_name'),
+            db.func.sum(scores.c.score).label('user_total_score'),
+            db.func.sum(scores.c.total_questions).label('user_total_possible_score'),
+            (db.func.sum(QuizStats.score_sum) * 1.0 / db.func.sum(QuizStats.attempt_count)).label('class_avg_score')  # Compute class average score
+        )
+        .select_from(QuizStats)
+        .join(Quiz, QuizStats.quiz_id == Quiz.id)
+        .join(Chapter, Quiz.chapter_id == Chapter.id)
+        .join(Subject, Chapter.subject_id == Subject.id)
+        .outerjoin(scores, scores.c.quiz_id == QuizStats.quiz_id)
+        .filter(QuizStats.attempt_count > 0)
+        .group_by(Subject.name)
+        .all()
+    )
+
+    # Compute pass/fail for user
+    subject_scores = []
+    for subject_name, user_total_score, user_total_possible_score, class_avg_score in subject_scores_query:
+        # Ensure None values are converted to 0
+        user_total_possible_score = user_total_possible_score or 0
+        user_total_score = user_total_score or 0 
+
+       # Compute user percentage only if the user has attempted the quiz
+        if user_total_possible_score > 0:
+            user_percentage = (user_total_score / user_total_possible_score) * 100
+            pass_fail = "Pass" if user_percentage >= 40 else "Fail"
+        else:
+            pass_fail = "N/A"  # Indicates user has never attempted a quiz in this subject
+
+        subject_scores.append((subject_name, user_total_score, user_total_possible_score, class_avg_score, pass_fail))
+
+    # Calculate overall pass/fail status
+    total_attempts = len(past_attempts)
+    passed_attempts = sum(1 for attempt in past_attempts if attempt[0].total_questions > 0 and (attempt[0].score / attempt[0].total_questions) * 100 >= 40)
+    overall_pass_status = "N/A" if total_attempts == 0 else ("Pass" if passed_attempts / total_attempts >= 0.5 else "Fail")
+
+    return render_template(
+        'quiz_summary.html',
+        past_attempts=past_attempts,
+        subject_scores=subject_scores,
+        overall_pass_status=overall_pass_status
+    )
+
+@main_bp.route('/subscribe')
+def subscribe():
+    return render_template('payment_index.html')
+        
+@main_bp.route('/payment', methods=['POST'])
+def payment():
+    amount = int(request.form['amount']) * 100  # Razorpay works in paise (1 INR = 100 paise)
+
+    # Runs on the bounded payments executor with a hard deadline (see services/payments.py)
+    try:
+        payment_order = payments.create_order(amount, currency='INR')
+    except payments.PaymentGatewayError as e:
+        flash(f"Could not start the payment: {e}", "error")
+        return redirect(url_for('main.subscribe'))
+
+    payment_order_id = payment_order['id']
+    return render_template('payment.html', payment_order_id=payment_order_id, amount=amount)
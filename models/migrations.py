@@ -0,0 +1,264 @@
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import insert, text
+
+from models.models import ArchivedUser, QuizAttempt, db
+from services.attempts import pack_attempt
+
+# Versioned schema migrations for existing quiz_master.db files.
+#
+# db.create_all() only creates missing tables; it never changes a table that
+# already exists. Each migration below brings an older database up to the
+# current models. The applied version is kept in SQLite's PRAGMA user_version.
+# Migrations also run right after create_all() on a brand-new database, so
+# every step has to be idempotent (IF NOT EXISTS, column checks, ...).
+MIGRATIONS = []
+
+
+def migration(version, description):
+    def decorator(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda item: item[0])
+        return fn
+    return decorator
+
+
+def _has_table(conn, name):
+    return conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                        {'name': name}).first() is not None
+
+
+@migration(1, 'Indexes for the hot lookup paths')
+def _add_hot_path_indexes(conn):
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_question_quiz_id ON question (quiz_id)"))
+    if _has_table(conn, 'user_response'):  # Replaced by quiz_attempt in migration 3
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_user_response_user_quiz ON user_response (user_id, quiz_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_quiz_score_user_quiz ON quiz_score (user_id, quiz_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_quiz_date_of_quiz ON quiz (date_of_quiz)"))
+
+
+# Percentage bucket (0-9) of a quiz_score row, matching QuizStats.histogram
+_BUCKET = "min(CAST({row}.percentage / 10 AS INTEGER), 9)"
+
+
+def _histogram_add(row, delta):
+    bucket = _BUCKET.format(row=row)
+    path = f"'$[' || {bucket} || ']'"
+    return f"histogram = json_set(histogram, {path}, json_extract(histogram, {path}) + {delta})"
+
+
+@migration(2, 'One best score per user and quiz, with aggregates kept by triggers')
+def _unique_best_score(conn):
+    # Keep the best (then latest) row of any duplicated (user_id, quiz_id) pair
+    conn.execute(text("""
+        DELETE FROM quiz_score WHERE id NOT IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY user_id, quiz_id ORDER BY score DESC, timestamp DESC, id DESC
+                ) AS rn
+                FROM quiz_score
+            ) WHERE rn = 1
+        )
+    """))
+    conn.execute(text("DROP INDEX IF EXISTS ix_quiz_score_user_quiz"))
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ux_quiz_score_user_quiz ON quiz_score (user_id, quiz_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_quiz_score_quiz_id ON quiz_score (quiz_id)"))
+
+    # Aggregates may include removed duplicates: quiz_stats is rebuilt at startup
+    # when empty, platform_stat is recomputed on its next read when stale
+    conn.execute(text("DELETE FROM quiz_stats"))
+    conn.execute(text("INSERT OR REPLACE INTO platform_stat (name, value) VALUES ('stale', 1)"))
+
+    # From here on every quiz_score write, including the submit_quiz UPSERT,
+    # updates quiz_stats and the pass/fail/NA counters in the same statement
+    empty_histogram = '[' + ','.join(['0'] * 10) + ']'
+    conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_quiz_score_insert AFTER INSERT ON quiz_score
+        BEGIN
+            INSERT OR IGNORE INTO quiz_stats (quiz_id, attempt_count, score_sum, max_score, histogram)
+            VALUES (NEW.quiz_id, 0, 0, 0, '{empty_histogram}');
+            UPDATE quiz_stats SET
+                attempt_count = attempt_count + 1,
+                score_sum = score_sum + NEW.score,
+                max_score = max(max_score, NEW.score),
+                {_histogram_add('NEW', 1)}
+            WHERE quiz_id = NEW.quiz_id;
+
+            UPDATE platform_stat SET value = value + 1
+            WHERE name = CASE WHEN NEW.percentage >= 40 THEN 'pass_count' ELSE 'fail_count' END;
+            UPDATE platform_stat SET value = value - 1
+            WHERE name = 'na_count' AND NOT EXISTS
+                (SELECT 1 FROM quiz_score WHERE user_id = NEW.user_id AND id != NEW.id);
+        END
+    """))
+    conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_quiz_score_update AFTER UPDATE OF score, percentage ON quiz_score
+        BEGIN
+            UPDATE quiz_stats SET
+                score_sum = score_sum + NEW.score - OLD.score,
+                max_score = max(max_score, NEW.score),
+                {_histogram_add('OLD', -1)}
+            WHERE quiz_id = NEW.quiz_id;
+            UPDATE quiz_stats SET {_histogram_add('NEW', 1)} WHERE quiz_id = NEW.quiz_id;
+
+            UPDATE platform_stat SET value = value - 1
+            WHERE name = CASE WHEN OLD.percentage >= 40 THEN 'pass_count' ELSE 'fail_count' END;
+            UPDATE platform_stat SET value = value + 1
+            WHERE name = CASE WHEN NEW.percentage >= 40 THEN 'pass_count' ELSE 'fail_count' END;
+        END
+    """))
+    conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_quiz_score_delete AFTER DELETE ON quiz_score
+        BEGIN
+            UPDATE quiz_stats SET
+                attempt_count = attempt_count - 1,
+                score_sum = score_sum - OLD.score,
+                max_score = (SELECT coalesce(max(score), 0) FROM quiz_score WHERE quiz_id = OLD.quiz_id),
+                {_histogram_add('OLD', -1)}
+            WHERE quiz_id = OLD.quiz_id;
+
+            UPDATE platform_stat SET value = value - 1
+            WHERE name = CASE WHEN OLD.percentage >= 40 THEN 'pass_count' ELSE 'fail_count' END;
+            UPDATE platform_stat SET value = value + 1
+            WHERE name = 'na_count' AND NOT EXISTS (SELECT 1 FROM quiz_score WHERE user_id = OLD.user_id);
+        END
+    """))
+
+
+PACK_BATCH_SIZE = 5000
+
+
+def legacy_attempts(rows):
+    """Group user_response rows (user_id, quiz_id, question_id, selected_answer, is_correct), ordered by
+    (user_id, quiz_id, id), into attempts. One attempt answers each question once, so a repeated
+    question_id starts the next attempt. Yields (user_id, quiz_id, [(question_id, answer, is_correct)])."""
+    key, responses, seen = None, [], set()
+    for user_id, quiz_id, question_id, selected, is_correct in rows:
+        if (user_id, quiz_id) != key or question_id in seen:
+            if responses:
+                yield key[0], key[1], responses
+            key, responses, seen = (user_id, quiz_id), [], set()
+        responses.append((question_id, selected, is_correct))
+        seen.add(question_id)
+    if responses:
+        yield key[0], key[1], responses
+
+
+@migration(3, 'Pack user_response rows into one quiz_attempt row per attempt')
+def _pack_user_responses(conn):
+    QuizAttempt.__table__.create(conn, checkfirst=True)
+    if not _has_table(conn, 'user_response'):
+        return
+
+    # Streams the old rows in index order and inserts the packed attempts in batches
+    rows = conn.execute(text(
+        "SELECT user_id, quiz_id, question_id, selected_answer, is_correct "
+        "FROM user_response ORDER BY user_id, quiz_id, id"
+    ))
+    batch = []
+    for user_id, quiz_id, responses in legacy_attempts(rows):
+        batch.append(pack_attempt(user_id, quiz_id, responses))
+        if len(batch) >= PACK_BATCH_SIZE:
+            conn.execute(insert(QuizAttempt.__table__), batch)
+            batch.clear()
+    if batch:
+        conn.execute(insert(QuizAttempt.__table__), batch)
+    conn.execute(text("DROP TABLE user_response"))
+
+
+@migration(4, 'quiz_score triggers that leave archived scores counted')
+def _archive_aware_score_triggers(conn):
+    ArchivedUser.__table__.create(conn, checkfirst=True)
+
+    # A user with archived scores is not NA, even with no quiz_score row left
+    conn.execute(text("DROP TRIGGER IF EXISTS trg_quiz_score_insert"))
+    empty_histogram = '[' + ','.join(['0'] * 10) + ']'
+    conn.execute(text(f"""
+        CREATE TRIGGER trg_quiz_score_insert AFTER INSERT ON quiz_score
+        BEGIN
+            INSERT OR IGNORE INTO quiz_stats (quiz_id, attempt_count, score_sum, max_score, histogram)
+            VALUES (NEW.quiz_id, 0, 0, 0, '{empty_histogram}');
+            UPDATE quiz_stats SET
+                attempt_count = attempt_count + 1,
+                score_sum = score_sum + NEW.score,
+                max_score = max(max_score, NEW.score),
+                {_histogram_add('NEW', 1)}
+            WHERE quiz_id = NEW.quiz_id;
+
+            UPDATE platform_stat SET value = value + 1
+            WHERE name = CASE WHEN NEW.percentage >= 40 THEN 'pass_count' ELSE 'fail_count' END;
+            UPDATE platform_stat SET value = value - 1
+            WHERE name = 'na_count'
+                AND NOT EXISTS (SELECT 1 FROM quiz_score WHERE user_id = NEW.user_id AND id != NEW.id)
+                AND NOT EXISTS (SELECT 1 FROM archived_user WHERE user_id = NEW.user_id);
+        END
+    """))
+
+    # Rows moved to the archive keep counting: archive-history deletes them while the
+    # 'archiving' platform_stat row exists (inside its own transaction only)
+    conn.execute(text("DROP TRIGGER IF EXISTS trg_quiz_score_delete"))
+    conn.execute(text(f"""
+        CREATE TRIGGER trg_quiz_score_delete AFTER DELETE ON quiz_score
+        WHEN NOT EXISTS (SELECT 1 FROM platform_stat WHERE name = 'archiving')
+        BEGIN
+            UPDATE quiz_stats SET
+                attempt_count = attempt_count - 1,
+                score_sum = score_sum - OLD.score,
+                max_score = (SELECT coalesce(max(score), 0) FROM quiz_score WHERE quiz_id = OLD.quiz_id),
+                {_histogram_add('OLD', -1)}
+            WHERE quiz_id = OLD.quiz_id;
+
+            UPDATE platform_stat SET value = value - 1
+            WHERE name = CASE WHEN OLD.percentage >= 40 THEN 'pass_count' ELSE 'fail_count' END;
+            UPDATE platform_stat SET value = value + 1
+            WHERE name = 'na_count'
+                AND NOT EXISTS (SELECT 1 FROM quiz_score WHERE user_id = OLD.user_id)
+                AND NOT EXISTS (SELECT 1 FROM archived_user WHERE user_id = OLD.user_id);
+        END
+    """))
+
+
+def current_version(conn):
+    return conn.execute(text("PRAGMA user_version")).scalar()
+
+
+def latest_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def upgrade(echo=None):
+    """Apply every pending migration, each in its own transaction. Returns the new version."""
+    with db.engine.connect() as conn:
+        version = current_version(conn)
+        conn.rollback()  # End the autobegun read so each step gets its own transaction
+        for target, description, step in MIGRATIONS:
+            if target <= version:
+                continue
+            with conn.begin():
+                step(conn)
+                conn.execute(text(f"PRAGMA user_version = {int(target)}"))
+            version = target
+            if echo:
+                echo(f"Applied migration {target}: {description}")
+    return version
+
+
+@click.command('db-upgrade')
+@with_appcontext
+def db_upgrade_command():
+    """Upgrade the database schema to the latest version."""
+    version = upgrade(echo=click.echo)
+    click.echo(f"Database is at schema version {version}.")
+
+
+@click.command('db-version')
+@with_appcontext
+def db_version_command():
+    """Show the current and latest schema versions."""
+    with db.engine.connect() as conn:
+        click.echo(f"Current schema version: {current_version(conn)} (latest: {latest_version()})")
+
+
+def init_app(app):
+    app.cli.add_command(db_upgrade_command)
+    app.cli.add_command(db_version_command)
@@ -1,14 +1,9 @@
-from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 from sqlalchemy import Column, Integer, String, Date
 from datetime import datetime
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///quiz_master.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-db = SQLAlchemy(app)
+db = SQLAlchemy()  # Bound to the app in create_app() (see services/database.py)
 
 # Admin Model - (Pre-created, no registration)
 class Admin(db.Model):
@@ -59,7 +54,10 @@ class Quiz(db.Model):
     
     questions = db.relationship('Question', backref='quiz', lazy=True, cascade="all, delete-orphan")
     quiz_scores = db.relationship('QuizScore', backref='quiz', cascade="all, delete-orphan")
-    user_responses = db.relationship('UserResponse', backref='quiz', cascade="all, delete-orphan")
+    attempts = db.relationship('QuizAttempt', backref='quiz', cascade="all, delete-orphan")
+    stats = db.relationship('QuizStats', backref='quiz', uselist=False, cascade="all, delete-orphan")
+
+    __table_args__ = (db.Index('ix_quiz_date_of_quiz', 'date_of_quiz'),)
 
 # Question Model
 class Question(db.Model):
@@ -72,18 +70,24 @@ class Question(db.Model):
     optionD = db.Column(db.String(255), nullable=False)
     correct_option = db.Column(db.String(1), nullable=False)
 
-# User Response
-class UserResponse(db.Model):
+    __table_args__ = (db.Index('ix_question_quiz_id', 'quiz_id'),)
+
+# Quiz Attempt - one row per submitted attempt, with the answers packed into bytes (see services/attempts.py)
+class QuizAttempt(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id', ondelete="CASCADE"), nullable=False)
-    question_id = db.Column(db.Integer, db.ForeignKey('question.id', ondelete='CASCADE'), nullable=False)
-    selected_answer = db.Column(db.String(1), nullable=False)
-    is_correct = db.Column(db.Boolean, nullable=False)  # Indicates if the answer is correct
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id', ondelete='CASCADE'), nullable=False)
+    submitted_at = db.Column(db.DateTime)  # NULL for attempts migrated from user_response
+    question_count = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Integer, nullable=False)
+    question_ids = db.Column(db.LargeBinary, nullable=False)  # varint deltas
+    answers = db.Column(db.LargeBinary, nullable=False)  # 4 bits per question
+    correct = db.Column(db.LargeBinary, nullable=False)  # 1 bit per question
+
+    user = db.relationship('User', backref=db.backref('attempts', lazy=True))
+
+    __table_args__ = (db.Index('ix_quiz_attempt_user_quiz', 'user_id', 'quiz_id'),)
 
-    user = db.relationship('User', backref=db.backref('responses', lazy=True))
-    question = db.relationship('Question', backref=db.backref('responses', lazy=True, cascade="all, delete-orphan"))
-    
 # Quiz Score Model
 class QuizScore(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -94,13 +98,48 @@ class QuizScore(db.Model):
     percentage = db.Column(db.Float, nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # One row per (user, quiz) holding the best score; see models/migrations.py for
+    # the triggers that keep QuizStats and PlatformStat in step with it
+    __table_args__ = (
+        db.Index('ux_quiz_score_user_quiz', 'user_id', 'quiz_id', unique=True),
+        db.Index('ix_quiz_score_quiz_id', 'quiz_id'),
+    )
+
+# Per-quiz aggregates over QuizScore (one best score per user), kept current by quiz_score triggers
+HISTOGRAM_BUCKETS = 10  # 0-9%, 10-19%, ..., 90-100%
+
+class QuizStats(db.Model):
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id', ondelete='CASCADE'), primary_key=True)
+    attempt_count = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Integer, nullable=False, default=0)
+    max_score = db.Column(db.Integer, nullable=False, default=0)
+    histogram = db.Column(db.Text, nullable=False, default='[' + ','.join(['0'] * HISTOGRAM_BUCKETS) + ']')  # JSON list of counts per bucket
+
+# Platform-wide counters for view_statistics (total_users, pass_count, ...), updated as data changes
+class PlatformStat(db.Model):
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+# Users with scores in the archive database (see services/archive.py), so the
+# quiz_score triggers do not count them as never having attempted a quiz
+class ArchivedUser(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+
+# Answers autosaved while an attempt is in progress, until it is submitted (see services/autosave.py)
+class AnswerDraft(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id', ondelete='CASCADE'), primary_key=True)
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id', ondelete='CASCADE'), primary_key=True)
+    selected_answer = db.Column(db.String(1), nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# Spool segments of the write-behind submission queue already written to the
+# database, so a segment replayed after a crash is never applied twice (see services/submission_queue.py)
+class SpoolSegment(db.Model):
+    name = db.Column(db.String(100), primary_key=True)
+    applied_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
 # Feedback Model
 class Feedback(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.Text, nullable=False)
-    
-# Create Tables
-if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
-        print("Database and tables created successfully!")
\ No newline at end of file
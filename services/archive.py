@@ -0,0 +1,291 @@
+from datetime import date, timedelta
+import os
+import sqlite3
+import time
+from urllib.request import pathname2url
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import Column, DateTime, Float, Integer, LargeBinary, MetaData, Table, bindparam, event, exists, select, text, union_all
+
+from models.models import QuizAttempt, QuizScore, db
+
+# Hot/cold split of attempt history.
+#
+# Attempts and best scores of quizzes held more than ARCHIVE_AFTER_DAYS ago
+# are moved out of quiz_master.db into a second SQLite file. By default it is
+# quiz_master_archive.db, next to the main one. Every pooled connection
+# attaches that file read-only as `archive`. The routes that show history read
+# through the helpers below: quiz_feedback falls back to an archived attempt,
+# and quiz_summary reads live and archived scores as one subquery.
+# view_statistics needs nothing, because the counters and quiz_stats keep
+# counting archived scores (see migration 4). An archived quiz is closed:
+# submit_quiz turns submissions to it away (quiz_archived).
+#
+# `flask archive-history` moves ARCHIVE_BATCH_SIZE rows at a time, in two
+# short transactions per batch:
+#   1. copy the rows into the archive (INSERT OR IGNORE / keep the best score)
+#   2. delete the copied rows from the main database
+# The main write lock is only held for the delete. A run that stops anywhere
+# can simply be started again. Rows left in both files in the meantime are
+# read from the main file only.
+ARCHIVE_DEFAULTS = {
+    'ARCHIVE_DATABASE': None,  # defaults to <main database>_archive.db
+    'ARCHIVE_AFTER_DAYS': 365,  # archive quizzes held longer ago than this
+    'ARCHIVE_BATCH_SIZE': 500,  # rows per transaction
+    'ARCHIVE_PAUSE': 0.05,  # seconds between batches, so requests get the write lock
+}
+SCHEMA = 'archive'
+ARCHIVING = 'archiving'  # platform_stat row that exists only inside an archival delete
+
+ARCHIVE_DDL = (
+    "CREATE TABLE IF NOT EXISTS quiz_attempt ("
+    "id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, quiz_id INTEGER NOT NULL, submitted_at DATETIME, "
+    "question_count INTEGER NOT NULL, score INTEGER NOT NULL, "
+    "question_ids BLOB NOT NULL, answers BLOB NOT NULL, correct BLOB NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_quiz_attempt_user_quiz ON quiz_attempt (user_id, quiz_id)",
+    "CREATE TABLE IF NOT EXISTS quiz_score ("
+    "user_id INTEGER NOT NULL, quiz_id INTEGER NOT NULL, score INTEGER NOT NULL, "
+    "total_questions INTEGER NOT NULL, percentage FLOAT NOT NULL, timestamp DATETIME)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_quiz_score_user_quiz ON quiz_score (user_id, quiz_id)",
+    "CREATE INDEX IF NOT EXISTS ix_quiz_score_quiz_id ON quiz_score (quiz_id)",
+)
+
+_metadata = MetaData(schema=SCHEMA)
+archived_attempts = Table(
+    'quiz_attempt', _metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer),
+    Column('quiz_id', Integer),
+    Column('submitted_at', DateTime),
+    Column('question_count', Integer),
+    Column('score', Integer),
+    Column('question_ids', LargeBinary),
+    Column('answers', LargeBinary),
+    Column('correct', LargeBinary),
+)
+archived_scores = Table(
+    'quiz_score', _metadata,
+    Column('user_id', Integer),
+    Column('quiz_id', Integer),
+    Column('score', Integer),
+    Column('total_questions', Integer),
+    Column('percentage', Float),
+    Column('timestamp', DateTime),
+)
+
+_ids = bindparam('ids', expanding=True)
+
+
+def archive_path(app):
+    """The archive file, or None when the main database is not a file (e.g. in-memory)."""
+    if app.config['ARCHIVE_DATABASE']:
+        return os.path.abspath(app.config['ARCHIVE_DATABASE'])
+    with app.app_context():
+        database = db.engine.url.database
+    if not database or database == ':memory:' or database.startswith('file:'):
+        return None
+    root, _ = os.path.splitext(os.path.abspath(database))
+    return f"{root}_archive.db"
+
+
+def create_archive(path):
+    """Create the archive file and its tables (idempotent)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    connection = sqlite3.connect(path, timeout=30)
+    try:
+        for statement in ARCHIVE_DDL:
+            connection.execute(statement)
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def _attach_read_only(path):
+    def on_connect(dbapi_connection, connection_record):
+        if not os.path.exists(path):
+            create_archive(path)
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"ATTACH DATABASE ? AS {SCHEMA}", (f"file:{pathname2url(path)}?mode=ro",))
+        cursor.close()
+    return on_connect
+
+
+def enabled():
+    return current_app.extensions.get('archive') is not None
+
+
+# Reads
+
+def user_scores(user_id):
+    """Subquery of a user's best scores, live and archived (a live row wins)."""
+    live = select(QuizScore.user_id, QuizScore.quiz_id, QuizScore.score, QuizScore.total_questions,
+                  QuizScore.percentage, QuizScore.timestamp).where(QuizScore.user_id == user_id)
+    if not enabled():
+        return live.subquery('scores')
+    archived = select(archived_scores).where(
+        archived_scores.c.user_id == user_id,
+        ~exists().where(QuizScore.user_id == archived_scores.c.user_id, QuizScore.quiz_id == archived_scores.c.quiz_id),
+    )
+    return union_all(live, archived).subquery('scores')
+
+
+def latest_archived_attempt(user_id, quiz_id):
+    """The user's most recent archived attempt at a quiz (a row with QuizAttempt's columns), or None."""
+    if not enabled():
+        return None
+    return db.session.execute(
+        select(archived_attempts)
+        .where(archived_attempts.c.user_id == user_id, archived_attempts.c.quiz_id == quiz_id)
+        .order_by(archived_attempts.c.id.desc())
+        .limit(1)
+    ).first()
+
+
+def quiz_attempts(quiz_id, *columns):
+    """Select of `columns` (names) over every attempt at a quiz, live and archived."""
+    live = select(*(getattr(QuizAttempt, name) for name in columns)).where(QuizAttempt.quiz_id == quiz_id)
+    if not enabled():
+        return live
+    archived = select(*(archived_attempts.c[name] for name in columns)).where(
+        archived_attempts.c.quiz_id == quiz_id,
+        ~exists().where(QuizAttempt.id == archived_attempts.c.id),
+    )
+    return union_all(live, archived)
+
+
+def quiz_archived(quiz_id):
+    """True once any best score of the quiz has moved to the archive.
+
+    Such a quiz takes no more submissions. A new live quiz_score would be
+    counted by the triggers next to the archived one for the same user.
+    """
+    if not enabled():
+        return False
+    return db.session.execute(
+        select(exists().where(archived_scores.c.quiz_id == quiz_id))
+    ).scalar()
+
+
+def score_sources():
+    """FROM-clause sources of best scores for the aggregate rebuilds: quiz_score, then archived rows.
+
+    Unlike the per-user reads these do not skip rows present in both files;
+    those only exist between an interrupted run and the next one.
+    """
+    if not enabled():
+        return ["main.quiz_score"]
+    # +quiz_id: a plain scan filtered against quiz beats walking the quiz_id index
+    return ["main.quiz_score", "(SELECT * FROM archive.quiz_score WHERE +quiz_id IN (SELECT id FROM main.quiz))"]
+
+
+# Archival
+
+COPY_SQL = {
+    'quiz_attempt': text(
+        "INSERT OR IGNORE INTO archive.quiz_attempt SELECT id, user_id, quiz_id, submitted_at, question_count, "
+        "score, question_ids, answers, correct FROM main.quiz_attempt WHERE id IN :ids"
+    ).bindparams(_ids),
+    # Keeps the better score if the archive already has one for the (user, quiz)
+    'quiz_score': text(
+        "INSERT INTO archive.quiz_score (user_id, quiz_id, score, total_questions, percentage, timestamp) "
+        "SELECT user_id, quiz_id, score, total_questions, percentage, timestamp FROM main.quiz_score "
+        "WHERE id IN :ids ON CONFLICT (user_id, quiz_id) DO UPDATE SET score = excluded.score, "
+        "total_questions = excluded.total_questions, percentage = excluded.percentage, "
+        "timestamp = excluded.timestamp WHERE excluded.score > score"
+    ).bindparams(_ids),
+}
+# Only rows the archive really holds are deleted
+DELETE_SQL = {
+    'quiz_attempt': text(
+        "DELETE FROM main.quiz_attempt WHERE id IN :ids AND id IN (SELECT id FROM archive.quiz_attempt)"
+    ).bindparams(_ids),
+    'quiz_score': text(
+        "DELETE FROM main.quiz_score WHERE id IN :ids AND EXISTS (SELECT 1 FROM archive.quiz_score a "
+        "WHERE a.user_id = quiz_score.user_id AND a.quiz_id = quiz_score.quiz_id)"
+    ).bindparams(_ids),
+}
+
+
+def _archive_table(conn, table, cutoff, batch_size, pause, echo):
+    moved = after = 0
+    while True:
+        ids = conn.execute(text(
+            f"SELECT id FROM main.{table} WHERE id > :after "
+            "AND quiz_id IN (SELECT id FROM main.quiz WHERE date_of_quiz < :cutoff) ORDER BY id LIMIT :limit"
+        ), {'after': after, 'cutoff': cutoff, 'limit': batch_size}).scalars().all()
+        if not ids:
+            return moved
+
+        conn.execute(COPY_SQL[table], {'ids': ids})
+        conn.commit()
+
+        if table == 'quiz_score':
+            # The quiz_score delete trigger skips aggregates and counters while this row exists,
+            # and archived_user keeps users whose scores all moved from counting as NA
+            conn.execute(text("INSERT OR REPLACE INTO platform_stat (name, value) VALUES (:name, 1)"),
+                         {'name': ARCHIVING})
+            conn.execute(text(
+                "INSERT OR IGNORE INTO archived_user (user_id) SELECT DISTINCT user_id FROM main.quiz_score WHERE id IN :ids"
+            ).bindparams(_ids), {'ids': ids})
+        deleted = conn.execute(DELETE_SQL[table], {'ids': ids}).rowcount
+        if table == 'quiz_score':
+            conn.execute(text("DELETE FROM platform_stat WHERE name = :name"), {'name': ARCHIVING})
+        conn.commit()
+
+        moved += deleted
+        after = ids[-1]
+        if echo:
+            echo(f"{table}: {moved} rows archived")
+        if pause:
+            time.sleep(pause)
+
+
+def archive_history(app, days=None, batch_size=None, echo=None):
+    """Move attempts and scores of quizzes older than `days` into the archive. Returns {table: rows moved}."""
+    path = app.extensions.get('archive')
+    if path is None:
+        raise click.ClickException('Archiving needs a file-based SQLite database.')
+    days = app.config['ARCHIVE_AFTER_DAYS'] if days is None else days
+    batch_size = batch_size or app.config['ARCHIVE_BATCH_SIZE']
+    cutoff = (date.today() - timedelta(days=days)).isoformat()
+
+    conn = db.engine.connect()
+    try:
+        # This connection alone gets the archive writable; it is discarded afterwards
+        conn.exec_driver_sql(f"DETACH DATABASE {SCHEMA}")
+        conn.exec_driver_sql(f"ATTACH DATABASE ? AS {SCHEMA}", (path,))
+        moved = {table: _archive_table(conn, table, cutoff, batch_size, app.config['ARCHIVE_PAUSE'], echo)
+                 for table in ('quiz_attempt', 'quiz_score')}
+
+        # Rows of quizzes deleted since they were archived
+        for table in ('quiz_attempt', 'quiz_score'):
+            conn.execute(text(f"DELETE FROM archive.{table} WHERE quiz_id NOT IN (SELECT id FROM main.quiz)"))
+        conn.commit()
+    finally:
+        conn.invalidate()
+        conn.close()
+    return moved
+
+
+@click.command('archive-history')
+@click.option('--days', type=int, help='Archive quizzes held more than this many days ago (default: ARCHIVE_AFTER_DAYS).')
+@click.option('--batch-size', type=int, help='Rows moved per transaction (default: ARCHIVE_BATCH_SIZE).')
+@with_appcontext
+def archive_history_command(days, batch_size):
+    """Move old attempts and scores into the read-only archive database."""
+    moved = archive_history(current_app._get_current_object(), days=days, batch_size=batch_size, echo=click.echo)
+    click.echo(f"Archived {moved['quiz_attempt']} attempts and {moved['quiz_score']} scores.")
+
+
+def init_app(app):
+    """Attach the archive to every connection. Call after database.init_app (it needs the engine)."""
+    for name, default in ARCHIVE_DEFAULTS.items():
+        app.config.setdefault(name, default)
+    path = archive_path(app)
+    app.extensions['archive'] = path
+    if path is not None:
+        with app.app_context():
+            event.listen(db.engine, 'connect', _attach_read_only(path))
+    app.cli.add_command(archive_history_command)
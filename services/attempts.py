@@ -0,0 +1,151 @@
+from collections import namedtuple
+
+from sqlalchemy import insert
+
+from models.models import QuizAttempt, db
+from services import archive
+
+# Packed storage for submitted attempts: one quiz_attempt row per attempt
+# instead of one user_response row per question.
+#
+#   question_ids  the attempt's question ids in order, as zigzag-encoded
+#                 varint deltas (1 byte each for consecutive ids)
+#   answers       4 bits per question: 0 = unanswered ('X'), 1-4 = A-D
+#   correct       1 bit per question, little-endian (bit i = question i)
+#
+# A 100-question attempt takes about 170 bytes in one row and one index
+# entry, instead of 100 rows and 100 index entries.
+ANSWER_CODES = {'X': 0, 'A': 1, 'B': 2, 'C': 3, 'D': 4}
+ANSWER_LETTERS = {code: letter for letter, code in ANSWER_CODES.items()}
+
+Response = namedtuple('Response', ['question_id', 'selected_answer', 'is_correct'])
+Attempt = namedtuple('Attempt', ['id', 'user_id', 'quiz_id', 'submitted_at', 'score', 'responses'])
+
+
+def pack_ids(ids):
+    out = bytearray()
+    previous = 0
+    for value in ids:
+        delta = value - previous
+        previous = value
+        delta = (delta << 1) ^ (delta >> 63)  # zigzag: small negatives stay small
+        while delta >= 0x80:
+            out.append((delta & 0x7F) | 0x80)
+            delta >>= 7
+        out.append(delta)
+    return bytes(out)
+
+
+def unpack_ids(data):
+    ids = []
+    previous = shift = delta = 0
+    for byte in data:
+        delta |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        previous += (delta >> 1) ^ -(delta & 1)
+        ids.append(previous)
+        shift = delta = 0
+    return ids
+
+
+def pack_answers(letters):
+    codes = [ANSWER_CODES.get(letter, 0) for letter in letters]
+    if len(codes) % 2:
+        codes.append(0)
+    return bytes(codes[i] | (codes[i + 1] << 4) for i in range(0, len(codes), 2))
+
+
+def unpack_answers(data, count):
+    letters = []
+    for byte in data:
+        letters.append(ANSWER_LETTERS.get(byte & 0x0F, 'X'))
+        letters.append(ANSWER_LETTERS.get(byte >> 4, 'X'))
+    return letters[:count]
+
+
+def pack_bits(flags):
+    value = 0
+    for i, flag in enumerate(flags):
+        if flag:
+            value |= 1 << i
+    return value.to_bytes((len(flags) + 7) // 8, 'little')
+
+
+def unpack_bits(data, count):
+    value = int.from_bytes(data, 'little')
+    return [bool(value >> i & 1) for i in range(count)]
+
+
+def pack_attempt(user_id, quiz_id, responses, submitted_at=None):
+    """A quiz_attempt row (dict, ready for an executemany INSERT) from (question_id, answer, is_correct) triples."""
+    responses = list(responses)
+    correct = [bool(is_correct) for _, _, is_correct in responses]
+    return {
+        'user_id': user_id,
+        'quiz_id': quiz_id,
+        'submitted_at': submitted_at,
+        'question_count': len(responses),
+        'score': sum(correct),
+        'question_ids': pack_ids([question_id for question_id, _, _ in responses]),
+        'answers': pack_answers([selected for _, selected, _ in responses]),
+        'correct': pack_bits(correct),
+    }
+
+
+def save_attempts(rows):
+    """Insert packed attempts with a single executemany statement."""
+    if rows:
+        db.session.execute(insert(QuizAttempt), rows)
+
+
+def unpack_attempt(row):
+    count = row.question_count
+    responses = [
+        Response(question_id, selected, is_correct)
+        for question_id, selected, is_correct in zip(
+            unpack_ids(row.question_ids), unpack_answers(row.answers, count), unpack_bits(row.correct, count)
+        )
+    ]
+    return Attempt(row.id, row.user_id, row.quiz_id, row.submitted_at, row.score, responses)
+
+
+def latest_attempt(user_id, quiz_id):
+    """The user's most recent attempt at a quiz, unpacked, or None. Looks in the archive when there is no live one."""
+    row = (
+        QuizAttempt.query
+        .filter(QuizAttempt.user_id == user_id, QuizAttempt.quiz_id == quiz_id)
+        .order_by(QuizAttempt.id.desc())
+        .first()
+    )
+    if row is None:
+        row = archive.latest_archived_attempt(user_id, quiz_id)
+    return unpack_attempt(row) if row else None
+
+
+def latest_responses(user_id, quiz_id):
+    """[Response(question_id, selected_answer, is_correct)] of the latest attempt; [] if none."""
+    attempt = latest_attempt(user_id, quiz_id)
+    return attempt.responses if attempt else []
+
+
+def question_stats(quiz_id):
+    """{question_id: {'answered': n, 'correct': n}} over every attempt at a quiz, archived ones included.
+
+    Only the packed columns are read, and correctness comes straight from the
+    bitmaps, so this scans one row per attempt.
+    """
+    stats = {}
+    rows = db.session.execute(
+        archive.quiz_attempts(quiz_id, 'question_ids', 'answers', 'correct'),
+        execution_options={'yield_per': 1000},
+    )
+    for question_ids, answers, correct in rows:
+        bits = int.from_bytes(correct, 'little')
+        for i, question_id in enumerate(unpack_ids(question_ids)):
+            entry = stats.setdefault(question_id, {'answered': 0, 'correct': 0})
+            if (answers[i >> 1] >> ((i & 1) * 4)) & 0x0F:
+                entry['answered'] += 1
+            entry['correct'] += bits >> i & 1
+    return stats
@@ -0,0 +1,247 @@
+import atexit
+from datetime import datetime, timedelta
+import logging
+import os
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import and_, delete, func, or_, select, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models.models import AnswerDraft, QuizAttempt, db
+
+logger = logging.getLogger(__name__)
+
+# Answers saved while a quiz is in progress.
+#
+# attempt_quiz.html posts each answer as the student picks it. A request only
+# updates this process's in-memory buffer: {(user_id, quiz_id): {question_id:
+# (answer, staged_at)}}. A student who changes an answer five times before the
+# next flush therefore costs one row. Every AUTOSAVE_FLUSH_INTERVAL seconds a
+# writer thread stores all changed answers in one transaction, as an
+# executemany UPSERT into answer_draft with updated_at = staged_at. At
+# submission the staged answers (answer_draft plus this process's unflushed
+# ones) are merged under whatever the form carries, and the drafts are deleted
+# with the attempt.
+#
+# Another worker may still hold answers of that attempt in its buffer and flush
+# them after the delete. A draft therefore only counts while it is newer than
+# the user's last submitted attempt at the quiz: older ones are skipped at
+# flush time and ignored when read. Drafts of abandoned attempts are purged
+# once they are AUTOSAVE_DRAFT_TTL old.
+AUTOSAVE_DEFAULTS = {
+    'AUTOSAVE_FLUSH_INTERVAL': 1.0,  # seconds
+    'AUTOSAVE_MAX_ATTEMPTS': 10000,  # buffered attempts before a request flushes inline
+    'AUTOSAVE_DRAFT_TTL': 24 * 3600,  # seconds; older drafts are ignored and purged
+    'AUTOSAVE_PURGE_INTERVAL': 600,  # seconds between purges of expired drafts
+}
+OPTIONS = frozenset('ABCD')
+
+
+class AutosaveBuffer:
+    """Latest unsaved answer per question, per attempt, for one process."""
+
+    def __init__(self, app):
+        self.app = app
+        self.pid = os.getpid()
+        self.interval = app.config['AUTOSAVE_FLUSH_INTERVAL']
+        self.max_attempts = app.config['AUTOSAVE_MAX_ATTEMPTS']
+        self.ttl = timedelta(seconds=app.config['AUTOSAVE_DRAFT_TTL'])
+        self.purge_interval = app.config['AUTOSAVE_PURGE_INTERVAL']
+        self._purged_at = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._dirty = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='autosave-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def stage(self, user_id, quiz_id, answers):
+        """Record {question_id: answer}; later answers to the same question replace earlier ones."""
+        now = datetime.utcnow()
+        with self._lock:
+            self._dirty.setdefault((user_id, quiz_id), {}).update(
+                (question_id, (answer, now)) for question_id, answer in answers.items())
+            full = len(self._dirty) > self.max_attempts
+        if full:
+            self.flush()
+
+    def unsaved(self, user_id, quiz_id):
+        """{question_id: (answer, staged_at)} not flushed yet."""
+        with self._lock:
+            return dict(self._dirty.get((user_id, quiz_id), ()))
+
+    def forget(self, user_id, quiz_id):
+        with self._lock:
+            self._dirty.pop((user_id, quiz_id), None)
+
+    def flush(self):
+        """Write every buffered answer in one transaction. Returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                dirty, self._dirty = self._dirty, {}
+            if not dirty:
+                return 0
+            stmt = sqlite_insert(AnswerDraft)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[AnswerDraft.user_id, AnswerDraft.quiz_id, AnswerDraft.question_id],
+                set_={'selected_answer': stmt.excluded.selected_answer, 'updated_at': stmt.excluded.updated_at},
+                where=AnswerDraft.updated_at <= stmt.excluded.updated_at,  # Another worker may have stored a newer one
+            )
+            with self.app.app_context():
+                try:
+                    submitted = last_submissions(dirty)
+                    rows = [
+                        {'user_id': user_id, 'quiz_id': quiz_id, 'question_id': question_id,
+                         'selected_answer': answer, 'updated_at': staged_at}
+                        for (user_id, quiz_id), answers in dirty.items()
+                        for question_id, (answer, staged_at) in answers.items()
+                        if staged_at > submitted.get((user_id, quiz_id), datetime.min)
+                    ]
+                    if rows:
+                        db.session.execute(stmt, rows)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    with self._lock:
+                        # Put them back under anything staged since
+                        for key, answers in dirty.items():
+                            self._dirty[key] = {**answers, **self._dirty.get(key, {})}
+                    raise
+            return len(rows)
+
+    def purge(self):
+        """Delete drafts older than AUTOSAVE_DRAFT_TTL, left by attempts that were never submitted."""
+        with self.app.app_context():
+            try:
+                deleted = db.session.execute(
+                    delete(AnswerDraft).where(AnswerDraft.updated_at < datetime.utcnow() - self.ttl)).rowcount
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+        self._purged_at = time.monotonic()
+        return deleted
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+                if self._purged_at is None or time.monotonic() - self._purged_at >= self.purge_interval:
+                    self.purge()
+            except Exception:
+                logger.exception("autosave flush failed; will retry")
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("autosave flush failed at shutdown; unsaved answers are lost")
+
+    def close(self):
+        if self.pid != os.getpid() or self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+
+
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    """This process's buffer, started on first use."""
+    buffer = current_app.extensions.get('autosave')
+    if buffer is None or buffer.pid != os.getpid():
+        with _buffer_lock:
+            buffer = current_app.extensions.get('autosave')
+            if buffer is None or buffer.pid != os.getpid():
+                buffer = current_app.extensions['autosave'] = AutosaveBuffer(current_app._get_current_object())
+    return buffer
+
+
+def clean_answers(answer_key, answers):
+    """{question_id: answer} for the quiz's own questions and valid options only."""
+    question_ids = {question_id for question_id, _ in answer_key}
+    cleaned = {}
+    for question_id, answer in (answers or {}).items():
+        try:
+            question_id = int(question_id)
+        except (TypeError, ValueError):
+            continue
+        if question_id in question_ids and answer in OPTIONS:
+            cleaned[question_id] = answer
+    return cleaned
+
+
+def stage(user_id, quiz_id, answers):
+    get_buffer().stage(user_id, quiz_id, answers)
+
+
+def last_submissions(attempts):
+    """{(user_id, quiz_id): submitted_at of the latest stored attempt} for the given attempts that have one."""
+    rows = db.session.execute(
+        select(QuizAttempt.user_id, QuizAttempt.quiz_id, func.max(QuizAttempt.submitted_at))
+        .where(tuple_(QuizAttempt.user_id, QuizAttempt.quiz_id).in_(list(attempts)))
+        .group_by(QuizAttempt.user_id, QuizAttempt.quiz_id)
+    )
+    return {(user_id, quiz_id): submitted_at for user_id, quiz_id, submitted_at in rows if submitted_at is not None}
+
+
+def staged_answers(user_id, quiz_id):
+    """{question_id: answer} saved so far for an attempt, including this process's unflushed ones.
+
+    One query: the user's last submission at the quiz, outer-joined to the
+    drafts staged after it and within AUTOSAVE_DRAFT_TTL.
+    """
+    last = (
+        select(func.max(QuizAttempt.submitted_at).label('submitted_at'))
+        .where(QuizAttempt.user_id == user_id, QuizAttempt.quiz_id == quiz_id)
+        .subquery()
+    )
+    expired = datetime.utcnow() - timedelta(seconds=current_app.config['AUTOSAVE_DRAFT_TTL'])
+    rows = db.session.execute(
+        select(last.c.submitted_at, AnswerDraft.question_id, AnswerDraft.selected_answer)
+        .select_from(last.outerjoin(AnswerDraft, and_(
+            AnswerDraft.user_id == user_id,
+            AnswerDraft.quiz_id == quiz_id,
+            AnswerDraft.updated_at > expired,
+            or_(last.c.submitted_at.is_(None), AnswerDraft.updated_at > last.c.submitted_at),
+        )))
+    ).all()
+    submitted = rows[0].submitted_at or datetime.min
+    answers = {question_id: answer for _, question_id, answer in rows if question_id is not None}
+    buffer = current_app.extensions.get('autosave')
+    if buffer is not None and buffer.pid == os.getpid():
+        answers.update((question_id, answer)
+                       for question_id, (answer, staged_at) in buffer.unsaved(user_id, quiz_id).items()
+                       if staged_at > submitted)
+    return answers
+
+
+def forget(user_id, quiz_id):
+    """Drop this process's unflushed answers for an attempt that has just been submitted."""
+    buffer = current_app.extensions.get('autosave')
+    if buffer is not None and buffer.pid == os.getpid():
+        buffer.forget(user_id, quiz_id)
+
+
+def discard(attempts):
+    """Drop the drafts of submitted attempts [(user_id, quiz_id), ...], inside the caller's transaction."""
+    attempts = list(attempts)
+    if not attempts:
+        return
+    for user_id, quiz_id in attempts:
+        forget(user_id, quiz_id)
+    db.session.execute(delete(AnswerDraft).where(tuple_(AnswerDraft.user_id, AnswerDraft.quiz_id).in_(attempts)))
+
+
+def shutdown(app):
+    """Flush and stop this process's buffer, if it has one."""
+    buffer = app.extensions.get('autosave')
+    if buffer is not None:
+        buffer.close()
+
+
+def init_app(app):
+    for name, default in AUTOSAVE_DEFAULTS.items():
+        app.config.setdefault(name, default)
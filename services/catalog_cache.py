@@ -0,0 +1,93 @@
+from collections import namedtuple
+import threading
+
+from flask import render_template
+from markupsafe import Markup
+from sqlalchemy import text
+
+from models.models import Chapter, PlatformStat, Quiz, Subject, db
+
+# The subject/chapter/quiz catalog on user_dashboard, rendered once and shared.
+#
+# Every student sees the same catalog, and it only changes when an admin edits
+# it. So the rows and the rendered fragment are cached per process under the
+# catalog version, a counter in platform_stat. The admin CRUD actions bump it
+# in the same transaction as their change. Each dashboard view reads the
+# version, one primary-key lookup, so an edit made in any worker shows up on
+# the next page load everywhere. The fragment is also keyed by the day, because
+# "Start Quiz" is only offered on the quiz's date.
+VERSION = 'catalog_version'
+
+SubjectRow = namedtuple('SubjectRow', ['id', 'name'])
+ChapterRow = namedtuple('ChapterRow', ['id', 'name'])
+QuizRow = namedtuple('QuizRow', ['id', 'remarks', 'subject_name', 'chapter_name', 'time_duration', 'date_of_quiz'])
+Catalog = namedtuple('Catalog', ['subjects', 'chapters', 'quizzes'])
+
+_cache = {'key': None, 'catalog': None, 'html': None}
+_lock = threading.Lock()
+
+
+def bump_version():
+    """Mark the catalog changed, inside the caller's transaction (call before commit)."""
+    db.session.execute(
+        text("INSERT INTO platform_stat (name, value) VALUES (:name, 1) "
+             "ON CONFLICT (name) DO UPDATE SET value = value + 1"),
+        {'name': VERSION}
+    )
+    invalidate()
+
+
+def invalidate():
+    with _lock:
+        _cache['key'] = None
+
+
+def current_version():
+    return db.session.query(PlatformStat.value).filter(PlatformStat.name == VERSION).scalar() or 0
+
+
+def catalog_rows(subjects, chapters, quizzes):
+    """Plain rows from ORM objects, for the search results."""
+    return Catalog(
+        tuple(SubjectRow(subject.id, subject.name) for subject in subjects),
+        tuple(ChapterRow(chapter.id, chapter.name) for chapter in chapters),
+        tuple(QuizRow(quiz.id, quiz.remarks, quiz.chapter and quiz.chapter.subject and quiz.chapter.subject.name,
+                      quiz.chapter and quiz.chapter.name, quiz.time_duration, quiz.date_of_quiz) for quiz in quizzes),
+    )
+
+
+def load_catalog():
+    """The full catalog in three column-only queries."""
+    subjects = db.session.query(Subject.id, Subject.name).order_by(Subject.id).all()
+    chapters = db.session.query(Chapter.id, Chapter.name).order_by(Chapter.id).all()
+    quizzes = (
+        db.session.query(Quiz.id, Quiz.remarks, Subject.name, Chapter.name, Quiz.time_duration, Quiz.date_of_quiz)
+        .outerjoin(Chapter, Quiz.chapter_id == Chapter.id)
+        .outerjoin(Subject, Chapter.subject_id == Subject.id)
+        .order_by(Quiz.id)
+        .all()
+    )
+    return Catalog(
+        tuple(SubjectRow(*row) for row in subjects),
+        tuple(ChapterRow(*row) for row in chapters),
+        tuple(QuizRow(*row) for row in quizzes),
+    )
+
+
+def render_catalog(catalog, current_date):
+    return Markup(render_template('user_dashboard_catalog.html', catalog=catalog, current_date=current_date))
+
+
+def cached_catalog_html(current_date):
+    """Rendered catalog for `current_date`, rebuilt only when the version or the day changed."""
+    key = (current_version(), current_date)
+    with _lock:
+        if _cache['key'] == key:
+            return _cache['html']
+
+    # Load and render outside the lock; concurrent misses just do the work twice
+    catalog = load_catalog()
+    html = render_catalog(catalog, current_date)
+    with _lock:
+        _cache.update(key=key, catalog=catalog, html=html)
+    return html
@@ -0,0 +1,122 @@
+import threading
+
+import click
+from flask import current_app, g
+from flask.cli import with_appcontext
+from sqlalchemy import event
+
+from models import migrations
+from models.models import Admin, db
+from services.passwords import hash_password
+from services.platform_stats import ensure_platform_stats
+from services.score_stats import ensure_quiz_stats
+from services.search import ensure_search_index
+
+# Named SQLite tuning profiles. `pragmas` run on every new DB-API connection;
+# `engine` becomes SQLALCHEMY_ENGINE_OPTIONS (pool settings).
+DATABASE_PROFILES = {
+    # SQLite's own defaults: rollback journal, no busy wait
+    'default': {
+        'pragmas': {},
+        'engine': {},
+    },
+    # Concurrent readers alongside one writer, waiting on locks instead of failing
+    'production': {
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',  # Durable across app crashes; WAL makes it safe against corruption
+            'busy_timeout': 5000,  # ms to wait for the write lock before "database is locked"
+            'mmap_size': 256 * 1024 * 1024,
+            'cache_size': -64 * 1024,  # negative = KiB, i.e. 64 MiB of page cache per connection
+            'temp_store': 'MEMORY',
+        },
+        'engine': {
+            'pool_size': 10,
+            'max_overflow': 20,
+            'pool_timeout': 30,
+            'pool_recycle': 3600,
+        },
+    },
+}
+DEFAULT_PROFILE = 'production'
+
+
+def get_profile(app):
+    """The active profile, with any SQLITE_PRAGMAS / SQLALCHEMY_ENGINE_OPTIONS overrides applied."""
+    name = app.config.get('DATABASE_PROFILE', DEFAULT_PROFILE)
+    if name not in DATABASE_PROFILES:
+        raise ValueError(f"Unknown DATABASE_PROFILE {name!r}; choose from {', '.join(DATABASE_PROFILES)}")
+    profile = DATABASE_PROFILES[name]
+    pragmas = {**profile['pragmas'], **app.config.get('SQLITE_PRAGMAS', {})}
+    engine = {**profile['engine'], **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})}
+    return pragmas, engine
+
+
+def _apply_pragmas(pragmas):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+    return on_connect
+
+
+def seed_admin():
+    """Create the built-in admin account on an empty database."""
+    if not Admin.query.first():
+        db.session.add(Admin(username="quizmaster", password=hash_password("admin123")))
+        db.session.commit()
+        print("Admin user created successfully!")
+
+
+def init_db():
+    """Create tables, apply migrations, backfill derived tables and seed the admin.
+
+    Safe to repeat; run it once per deployment (`flask init-db`, or before the
+    server forks) instead of at import time.
+    """
+    db.create_all()
+    migrations.upgrade()  # Bring existing databases up to the current schema
+    ensure_search_index()
+    ensure_quiz_stats()
+    ensure_platform_stats()
+    seed_admin()
+    current_app.extensions['database_ready'] = True
+
+
+_init_lock = threading.Lock()
+
+
+def _init_db_on_first_request():
+    if not current_app.extensions.get('database_ready'):
+        with _init_lock:
+            if not current_app.extensions.get('database_ready'):
+                init_db()
+                g.pop('query_count', None)  # Setup statements don't count against the view's query budget
+
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create or upgrade the schema and seed the admin account."""
+    init_db()
+    click.echo('Database is ready.')
+
+
+def init_app(app):
+    """Initialise Flask-SQLAlchemy with the configured profile (use instead of db.init_app)."""
+    pragmas, engine_options = get_profile(app)
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+    if uri.startswith('sqlite') and ':memory:' in uri:
+        engine_options = {}  # In-memory databases use a single static connection, not a pool
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+    db.init_app(app)
+
+    if pragmas:
+        with app.app_context():
+            event.listen(db.engine, 'connect', _apply_pragmas(pragmas))
+
+    app.cli.add_command(init_db_command)
+    if app.config.get('AUTO_INIT_DB', True):
+        # Nothing ran init_db for this process (e.g. `flask run`): do it before the first request
+        app.before_request(_init_db_on_first_request)
@@ -0,0 +1,78 @@
+from datetime import datetime
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models.models import Question, QuizScore, db
+from services.attempts import pack_attempt, save_attempts
+
+UNANSWERED = 'X'
+
+
+def load_answer_key(quiz_id):
+    """[(question_id, correct_option), ...] for a quiz, without building Question objects."""
+    return (
+        db.session.query(Question.id, Question.correct_option)
+        .filter(Question.quiz_id == quiz_id)
+        .order_by(Question.id)
+        .all()
+    )
+
+
+def grade(answer_key, answers, user_id, quiz_id):
+    """Grade submitted form answers against an answer key in a single pass.
+
+    Returns one dict per question (user_id, quiz_id, question_id,
+    selected_answer, is_correct) and the number of correct answers.
+    """
+    rows = [
+        {
+            'user_id': user_id,
+            'quiz_id': quiz_id,
+            'question_id': question_id,
+            'selected_answer': selected,
+            'is_correct': selected == correct_option,
+        }
+        for question_id, correct_option in answer_key
+        for selected in (answers.get(f'question_{question_id}', UNANSWERED),)
+    ]
+    score = sum(row['is_correct'] for row in rows)
+    return rows, score
+
+
+def save_responses(rows):
+    """Store the responses of one attempt, as returned by grade(), packed into a single quiz_attempt row."""
+    if rows:
+        save_attempts([pack_attempt(
+            rows[0]['user_id'], rows[0]['quiz_id'],
+            ((row['question_id'], row['selected_answer'], row['is_correct']) for row in rows),
+            submitted_at=datetime.utcnow(),
+        )])
+
+
+def save_best_score(user_id, quiz_id, score, total_questions, percentage, timestamp=None):
+    """Record an attempt's score if it beats the user's best for the quiz, in one statement.
+
+    INSERT ... ON CONFLICT (user_id, quiz_id) DO UPDATE ... WHERE the new score
+    is higher, so concurrent double submissions can neither race nor create a
+    second row. Returns True when the stored best score changed. `timestamp`
+    defaults to now.
+    """
+    stmt = sqlite_insert(QuizScore).values(
+        user_id=user_id,
+        quiz_id=quiz_id,
+        score=score,
+        total_questions=total_questions,
+        percentage=percentage,
+        timestamp=timestamp or datetime.utcnow(),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[QuizScore.user_id, QuizScore.quiz_id],
+        set_={
+            'score': stmt.excluded.score,
+            'total_questions': stmt.excluded.total_questions,
+            'percentage': stmt.excluded.percentage,
+            'timestamp': stmt.excluded.timestamp,
+        },
+        where=stmt.excluded.score > QuizScore.score,
+    ).returning(QuizScore.id)
+    return db.session.execute(stmt).first() is not None
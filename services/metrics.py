@@ -0,0 +1,366 @@
+import glob
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+
+from flask import Response, current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import Pool
+
+from services.quiz_cache import quiz_cache
+
+# Text-format (Prometheus exposition) metrics at /metrics, summed across workers.
+#
+# Every process owns one file, METRICS_DIR/metrics-<pid>.mmap, and is the only
+# writer of it. An update is a short in-process lock around an 8-byte
+# read-modify-write in the mapping: no cross-process locking and no syscalls.
+# A scrape reads every file in the directory and adds the values up. Counters
+# and histograms keep the totals of workers that have exited, so a respawn
+# never makes them go backwards. Gauges only count workers that are still alive.
+# All workers share one directory: METRICS_DIR, by default <instance path>/metrics.
+# serve() empties it of the last run's files before forking.
+METRICS_DEFAULTS = {
+    'METRICS_ENABLED': True,
+    'METRICS_DIR': None,  # defaults to <instance path>/metrics
+    'METRICS_BUCKETS': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),  # seconds
+}
+
+# name -> (type, help)
+METRICS = {
+    'quiz_http_requests_total': ('counter', 'Requests handled, by endpoint, method and status.'),
+    'quiz_http_request_duration_seconds': ('histogram', 'Request latency by endpoint.'),
+    'quiz_http_requests_in_flight': ('gauge', 'Requests being handled right now.'),
+    'quiz_db_pool_checked_out': ('gauge', 'Database connections checked out of the pool.'),
+    'quiz_db_pool_capacity': ('gauge', 'Connections the pools may hold (pool_size + max_overflow per worker).'),
+    'quiz_sqlite_locked_total': ('counter', 'Statements that failed with "database is locked" after busy_timeout.'),
+    'quiz_submissions_total': ('counter', 'Quiz submissions accepted.'),
+    'quiz_submissions_last_minute': ('gauge', 'Quiz submissions accepted in the last 60 seconds.'),
+    'quiz_cache_hits_total': ('counter', 'Quiz content cache hits.'),
+    'quiz_cache_misses_total': ('counter', 'Quiz content cache misses.'),
+    'quiz_cache_entries': ('gauge', 'Quizzes held in the content cache.'),
+    'quiz_worker_processes': ('gauge', 'Worker processes reporting metrics.'),
+}
+
+_HEADER = struct.Struct('<I4x')  # bytes used, padded to 8
+_LENGTH = struct.Struct('<I')
+_VALUE = struct.Struct('<d')
+_INITIAL_SIZE = 64 * 1024
+_SUBMISSION_SLOTS = 60  # one per second
+_CACHE_SYNC_SECONDS = 1.0
+
+
+class MmapValues:
+    """Float values by key in one memory-mapped file.
+
+    Layout: an 8-byte header holding the bytes in use, then entries of
+    [key length: u32][key, padded to 8 bytes][value: f64]. Entries are only ever
+    appended, and the header is updated after the entry is complete, so a reader
+    never sees a half-written one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'w+b')
+        self._file.truncate(_INITIAL_SIZE)
+        self._map = mmap.mmap(self._file.fileno(), _INITIAL_SIZE)
+        self._used = _HEADER.size
+        _HEADER.pack_into(self._map, 0, self._used)
+        self._positions = {}
+
+    def _position(self, key):
+        position = self._positions.get(key)
+        if position is None:
+            encoded = key.encode()
+            padded = (_LENGTH.size + len(encoded) + 7) // 8 * 8
+            needed = self._used + padded + _VALUE.size
+            if needed > len(self._map):
+                size = len(self._map)
+                while size < needed:
+                    size *= 2
+                self._file.truncate(size)
+                self._map.resize(size)
+            _LENGTH.pack_into(self._map, self._used, len(encoded))
+            self._map[self._used + _LENGTH.size:self._used + _LENGTH.size + len(encoded)] = encoded
+            position = self._used + padded
+            _VALUE.pack_into(self._map, position, 0.0)
+            self._used = needed
+            _HEADER.pack_into(self._map, 0, self._used)
+            self._positions[key] = position
+        return position
+
+    def get(self, key):
+        return _VALUE.unpack_from(self._map, self._position(key))[0]
+
+    def set(self, key, value):
+        _VALUE.pack_into(self._map, self._position(key), value)
+
+    def add(self, key, amount=1.0):
+        position = self._position(key)
+        _VALUE.pack_into(self._map, position, _VALUE.unpack_from(self._map, position)[0] + amount)
+
+
+def read_values(path):
+    """{key: value} from a metrics file written by any process."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    values = {}
+    if len(data) < _HEADER.size:
+        return values
+    used = min(_HEADER.unpack_from(data, 0)[0], len(data))
+    offset = _HEADER.size
+    while offset + _LENGTH.size <= used:
+        length = _LENGTH.unpack_from(data, offset)[0]
+        padded = (_LENGTH.size + length + 7) // 8 * 8
+        if offset + padded + _VALUE.size > used:
+            break
+        key = data[offset + _LENGTH.size:offset + _LENGTH.size + length].decode()
+        values[key] = _VALUE.unpack_from(data, offset + padded)[0]
+        offset += padded + _VALUE.size
+    return values
+
+
+class ProcessMetrics:
+    """This process's metrics file and the lock its threads share."""
+
+    def __init__(self, directory, buckets):
+        self.pid = os.getpid()
+        self.values = MmapValues(os.path.join(directory, f'metrics-{self.pid}.mmap'))
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.cache_synced = 0.0
+
+    def inc(self, key, amount=1.0):
+        with self.lock:
+            self.values.add(key, amount)
+
+    def set(self, key, value):
+        with self.lock:
+            self.values.set(key, value)
+
+    def observe(self, name, labels, seconds):
+        # Buckets are stored cumulative, so a scrape only has to add files together
+        with self.lock:
+            for bound in self.buckets:
+                # Adding 0 still creates the bucket, so every series has the full set
+                self.values.add(f'{name}_bucket{{{labels},le="{bound:g}"}}', 1.0 if seconds <= bound else 0.0)
+            self.values.add(f'{name}_bucket{{{labels},le="+Inf"}}')
+            self.values.add(f'{name}_sum{{{labels}}}', seconds)
+            self.values.add(f'{name}_count{{{labels}}}')
+
+    def count_submission(self, now):
+        second = int(now)
+        slot = second % _SUBMISSION_SLOTS
+        with self.lock:
+            self.values.add('quiz_submissions_total')
+            if self.values.get(f'_submissions_second_{slot}') != second:
+                self.values.set(f'_submissions_second_{slot}', second)
+                self.values.set(f'_submissions_count_{slot}', 0)
+            self.values.add(f'_submissions_count_{slot}')
+
+
+_process = None
+_process_lock = threading.Lock()
+
+
+def metrics_dir(app):
+    """The shared metrics directory, created on first use."""
+    directory = app.config['METRICS_DIR'] or os.path.join(app.instance_path, 'metrics')
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def prepare(app):
+    """Pick the directory and drop files of an earlier run. serve() calls this before forking."""
+    directory = metrics_dir(app)
+    for path in glob.glob(os.path.join(directory, 'metrics-*.mmap')):
+        os.remove(path)
+
+
+def get_process_metrics(app=None):
+    """This process's ProcessMetrics, opened again after a fork."""
+    global _process
+    process = _process
+    if process is None or process.pid != os.getpid():
+        app = app or current_app
+        with _process_lock:
+            if _process is None or _process.pid != os.getpid():
+                _process = ProcessMetrics(metrics_dir(app), app.config['METRICS_BUCKETS'])
+                _set_pool_capacity(app, _process)
+            process = _process
+    return process
+
+
+def _set_pool_capacity(app, process):
+    from services.database import get_profile
+    _, engine = get_profile(app)
+    process.set('quiz_db_pool_capacity', engine.get('pool_size', 5) + engine.get('max_overflow', 10))
+
+
+def count_submission():
+    """Record one accepted quiz submission."""
+    if current_app.config['METRICS_ENABLED']:
+        get_process_metrics().count_submission(time.time())
+
+
+def _label(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _start_request():
+    if not current_app.config['METRICS_ENABLED']:
+        return
+    g.metrics_started = time.perf_counter()
+    get_process_metrics().inc('quiz_http_requests_in_flight')
+
+
+def _record(status):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return
+    process = get_process_metrics()
+    elapsed = time.perf_counter() - started
+    endpoint = _label(request.endpoint or 'unmatched')  # Raw paths would make a series per URL
+    process.inc(f'quiz_http_requests_total{{endpoint="{endpoint}",method="{_label(request.method)}",status="{status}"}}')
+    process.observe('quiz_http_request_duration_seconds', f'endpoint="{endpoint}"', elapsed)
+    process.inc('quiz_http_requests_in_flight', -1)
+
+    now = time.monotonic()
+    if now - process.cache_synced >= _CACHE_SYNC_SECONDS:
+        process.cache_synced = now
+        stats = quiz_cache.stats()
+        process.set('quiz_cache_hits_total', stats['hits'])
+        process.set('quiz_cache_misses_total', stats['misses'])
+        process.set('quiz_cache_entries', stats['size'])
+
+
+def _finish_request(response):
+    _record(response.status_code)
+    return response
+
+
+def _teardown_request(error):
+    if error is not None:
+        _record(500)  # after_request does not run when the view raised
+
+
+def _pool_checkout(dbapi_connection, connection_record, connection_proxy):
+    if _process is not None and _process.pid == os.getpid():
+        connection_record.info['metrics_pid'] = _process.pid
+        _process.inc('quiz_db_pool_checked_out')
+
+
+def _pool_checkin(dbapi_connection, connection_record):
+    # Only connections counted on checkout, so the gauge never goes negative
+    if connection_record is not None and connection_record.info.pop('metrics_pid', None) == os.getpid():
+        _process.inc('quiz_db_pool_checked_out', -1)
+
+
+def _handle_error(context):
+    error = context.original_exception
+    if isinstance(context.sqlalchemy_exception, OperationalError) and 'locked' in str(error):
+        if _process is not None and _process.pid == os.getpid():
+            _process.inc('quiz_sqlite_locked_total')
+
+
+def pid_alive(pid):
+    """Whether a process with this pid exists (signal 0 checks without sending anything)."""
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+_SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)')
+
+
+def collect(directory):
+    """Samples summed across every worker's file: {sample key: value}."""
+    totals = {}
+    now = int(time.time())
+    live = 0
+    for path in glob.glob(os.path.join(directory, 'metrics-*.mmap')):
+        pid = int(os.path.basename(path)[len('metrics-'):-len('.mmap')])
+        alive = pid_alive(pid)
+        live += alive
+        try:
+            values = read_values(path)
+        except OSError:
+            continue  # Removed between glob and open
+        for key, value in values.items():
+            if key.startswith('_submissions_count_'):
+                second = values.get('_submissions_second_' + key[len('_submissions_count_'):], 0)
+                if now - second < _SUBMISSION_SLOTS:
+                    totals['quiz_submissions_last_minute'] = totals.get('quiz_submissions_last_minute', 0) + value
+                continue
+            if key.startswith('_'):
+                continue
+            if METRICS.get(_SAMPLE.match(key).group(1), ('counter',))[0] == 'gauge' and not alive:
+                continue  # A dead worker's in-flight requests and connections are gone
+            totals[key] = totals.get(key, 0) + value
+    totals['quiz_worker_processes'] = live
+    totals.setdefault('quiz_submissions_last_minute', 0)
+    return totals
+
+
+def render(totals):
+    """Prometheus text exposition format, version 0.0.4."""
+    families = {}
+    for key, value in totals.items():
+        sample = _SAMPLE.match(key).group(1)
+        family = sample
+        for suffix in ('_bucket', '_sum', '_count'):
+            if sample.endswith(suffix) and sample[:-len(suffix)] in METRICS:
+                family = sample[:-len(suffix)]
+        families.setdefault(family, []).append((key, value))
+
+    lines = []
+    for family in sorted(families):
+        kind, description = METRICS.get(family, ('untyped', ''))
+        lines.append(f'# HELP {family} {description}')
+        lines.append(f'# TYPE {family} {kind}')
+        for key, value in sorted(families[family], key=lambda item: _sort_key(item[0])):
+            lines.append(f'{key} {_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def _sort_key(key):
+    # Keep histogram buckets in ascending `le` order
+    match = re.search(r'le="([^"]+)"', key)
+    bound = math.inf if match and match.group(1) == '+Inf' else float(match.group(1)) if match else 0
+    return re.sub(r',?le="[^"]+"', '', key), bound
+
+
+def _number(value):
+    return str(int(value)) if value == int(value) else repr(value)
+
+
+def metrics_view():
+    if not current_app.config['METRICS_ENABLED']:
+        return Response('Metrics are disabled.\n', status=404, mimetype='text/plain')
+    get_process_metrics()  # So a fresh worker reports itself
+    body = render(collect(metrics_dir(current_app)))
+    return Response(body, mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+def init_app(app):
+    for name, default in METRICS_DEFAULTS.items():
+        app.config.setdefault(name, default)
+    if not event.contains(Pool, 'checkout', _pool_checkout):
+        event.listen(Pool, 'checkout', _pool_checkout)
+        event.listen(Pool, 'checkin', _pool_checkin)
+        event.listen(Engine, 'handle_error', _handle_error)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
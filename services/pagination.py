@@ -0,0 +1,112 @@
+from dataclasses import dataclass
+import time
+
+from flask import current_app, request, url_for
+from sqlalchemy.sql import func
+
+from models.models import db
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 200
+COUNT_CACHE_TTL = 60  # seconds
+
+# Table name -> (row count, expiry on the monotonic clock)
+_count_cache = {}
+
+
+@dataclass
+class Page:
+    """One keyset page of a listing section (users, subjects, ...)."""
+    items: list
+    prefix: str
+    per_page: int
+    first_key: object = None
+    last_key: object = None
+    has_next: bool = False
+    has_prev: bool = False
+    total: int = None
+
+
+def _int_arg(name):
+    value = request.args.get(name, type=int)
+    return value if value is not None and value >= 0 else None
+
+
+def page_args(prefix):
+    """Read `<prefix>_after`, `<prefix>_before` and `<prefix>_per_page` from the query string."""
+    default_size = current_app.config.get('ADMIN_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    per_page = _int_arg(f'{prefix}_per_page') or default_size
+    per_page = max(1, min(per_page, MAX_PAGE_SIZE))
+    return _int_arg(f'{prefix}_after'), _int_arg(f'{prefix}_before'), per_page
+
+
+def keyset_paginate(query, column, prefix, total=None):
+    """Return one page of `query` ordered by the unique `column`.
+
+    Instead of OFFSET (which makes SQLite walk every skipped row) the cursor is
+    the key of the last row already shown, so each page costs one index range
+    scan no matter how deep the admin has paged.
+    """
+    after, before, per_page = page_args(prefix)
+
+    if before is not None:
+        rows = query.filter(column < before).order_by(column.desc()).limit(per_page + 1).all()
+        has_prev = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_next = True
+    else:
+        if after is not None:
+            query = query.filter(column > after)
+        rows = query.order_by(column.asc()).limit(per_page + 1).all()
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_prev = after is not None
+
+    page = Page(items=rows, prefix=prefix, per_page=per_page, has_next=has_next, has_prev=has_prev, total=total)
+    if rows:
+        page.first_key = getattr(rows[0], column.key)
+        page.last_key = getattr(rows[-1], column.key)
+    else:
+        # Paged past the end; still allow stepping back
+        page.has_prev = after is not None
+        page.has_next = before is not None
+        page.first_key = page.last_key = after if after is not None else before
+    return page
+
+
+def page_url(page, direction):
+    """URL for the next/previous page of one section, keeping every other section's cursor."""
+    args = request.args.to_dict()
+    args.pop(f'{page.prefix}_after', None)
+    args.pop(f'{page.prefix}_before', None)
+    if direction == 'next':
+        args[f'{page.prefix}_after'] = page.last_key
+    elif direction == 'prev':
+        args[f'{page.prefix}_before'] = page.first_key
+    args[f'{page.prefix}_per_page'] = page.per_page
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+
+def cached_count(model, ttl=None):
+    """Row count for `model`, recomputed at most once per TTL per process."""
+    key = model.__tablename__
+    now = time.monotonic()
+    hit = _count_cache.get(key)
+    if hit and hit[1] > now:
+        return hit[0]
+
+    if ttl is None:
+        ttl = current_app.config.get('COUNT_CACHE_TTL', COUNT_CACHE_TTL)
+    value = db.session.query(func.count(model.id)).scalar()
+    _count_cache[key] = (value, now + ttl)
+    return value
+
+
+def invalidate_count(*models):
+    """Drop cached counts after rows of `models` are created or deleted."""
+    for model in models:
+        _count_cache.pop(model.__tablename__, None)
+
+
+def init_app(app):
+    app.add_template_global(page_url)
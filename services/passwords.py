@@ -0,0 +1,126 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from flask import current_app
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+# Password hashing off the request threads.
+#
+# scrypt is deliberately slow; when a whole class logs in at exam start, inline
+# hashing would occupy every server thread. Hashes instead run on a small
+# per-process executor (PASSWORD_HASH_WORKERS threads) with at most
+# PASSWORD_HASH_QUEUE waiting. Beyond that, or after PASSWORD_HASH_TIMEOUT,
+# the login is turned away at once with PasswordHasherBusy so quiz pages keep
+# their threads. PASSWORD_HASH_WORKERS = 0 hashes inline in the request thread.
+PASSWORD_DEFAULTS = {
+    'PASSWORD_HASH_METHOD': 'scrypt',  # werkzeug method string, e.g. 'scrypt:16384:8:1' or 'pbkdf2:sha256:600000'
+    'PASSWORD_HASH_WORKERS': 2,
+    'PASSWORD_HASH_QUEUE': 8,
+    'PASSWORD_HASH_TIMEOUT': 5.0,  # seconds a login waits for its hash
+}
+
+
+class PasswordHasherBusy(Exception):
+    """Too many hashes queued (or the queue too slow); try again shortly."""
+
+
+def method_prefix(method):
+    """Fully parameterised form of a werkzeug method, as it appears before the first '$' of a hash."""
+    name, *params = method.split(':')
+    if name == 'scrypt':
+        n, r, p = (params + [None] * 3)[:3]
+        return f"scrypt:{n or 2 ** 15}:{r or 8}:{p or 1}"
+    if name == 'pbkdf2':
+        hash_name, iterations = (params + [None] * 2)[:2]
+        return f"pbkdf2:{hash_name or 'sha256'}:{iterations or DEFAULT_PBKDF2_ITERATIONS}"
+    return method
+
+
+class PasswordHasher:
+    def __init__(self, method, workers, max_queue, timeout):
+        self.pid = os.getpid()  # A forked child gets a fresh hasher: the executor's threads don't survive fork
+        self.method = method
+        self.prefix = method_prefix(method)
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix='passwords') if workers else None
+        self.capacity = workers + max_queue
+        self.pending = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        config = {**PASSWORD_DEFAULTS, **config}
+        return cls(config['PASSWORD_HASH_METHOD'], config['PASSWORD_HASH_WORKERS'],
+                   config['PASSWORD_HASH_QUEUE'], config['PASSWORD_HASH_TIMEOUT'])
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, stored, password):
+        return self._run(check_password_hash, stored, password)
+
+    def needs_rehash(self, stored):
+        """True for hashes made with a different method or cost than the configured one."""
+        return stored.split('$', 1)[0] != self.prefix
+
+    def _run(self, fn, *args):
+        if self.executor is None:
+            return fn(*args)
+        with self._lock:
+            if self.pending >= self.capacity:
+                self.rejected += 1
+                raise PasswordHasherBusy('too many sign-ins at once')
+            self.pending += 1
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(self._finished)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()  # Frees the queue slot if it never started
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHasherBusy('sign-in queue is too slow') from None
+
+    def _finished(self, future):
+        with self._lock:
+            self.pending -= 1
+
+
+_hasher_lock = threading.Lock()
+
+
+def get_hasher():
+    """This process's PasswordHasher, created on first use (and again after a fork)."""
+    hasher = current_app.extensions.get('passwords')
+    if hasher is None or hasher.pid != os.getpid():
+        with _hasher_lock:
+            hasher = current_app.extensions.get('passwords')
+            if hasher is None or hasher.pid != os.getpid():
+                hasher = PasswordHasher.from_config(current_app.config)
+                current_app.extensions['passwords'] = hasher
+    return hasher
+
+
+def hash_password(password):
+    return get_hasher().hash(password)
+
+
+def verify_password(account, password):
+    """Check `password` against account.password, upgrading an outdated hash in place.
+
+    The caller commits the session to keep the upgraded hash. Raises
+    PasswordHasherBusy when overloaded; a rehash that can't get a slot is
+    simply left for the next login.
+    """
+    hasher = get_hasher()
+    if not hasher.verify(account.password, password):
+        return False
+    if hasher.needs_rehash(account.password):
+        try:
+            account.password = hasher.hash(password)
+        except PasswordHasherBusy:
+            pass
+    return True
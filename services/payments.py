@@ -0,0 +1,155 @@
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from flask import current_app
+
+# Payment order creation behind a small gateway interface.
+#
+# Calls run on a per-process executor with at most PAYMENT_MAX_CONCURRENCY in
+# flight. A request that would exceed that is rejected at once instead of
+# queueing, and a caller never waits longer than PAYMENT_TIMEOUT. A slow
+# gateway can therefore hold up a few payment requests, but never every
+# server thread.
+PAYMENT_DEFAULTS = {
+    'PAYMENT_GATEWAY': 'razorpay',  # or 'stub' for offline runs and benchmarks
+    'PAYMENT_TIMEOUT': 10.0,  # seconds a request waits for an order, end to end
+    'PAYMENT_CONNECT_TIMEOUT': 3.0,
+    'PAYMENT_MAX_CONCURRENCY': 4,  # gateway calls in flight per process; also the connection pool size
+    'PAYMENT_STUB_LATENCY': 0.2,  # seconds the stub takes per order
+    'PAYMENT_STUB_FAILURE_RATE': 0.0,  # share of stub orders that fail
+}
+
+
+class PaymentGatewayError(Exception):
+    """The gateway failed, timed out or refused the order."""
+
+
+class PaymentGatewayBusy(PaymentGatewayError):
+    """Too many orders already in flight; rejected without calling the gateway."""
+
+
+class PaymentGateway:
+    """Creates payment orders. Subclasses implement _create_order()."""
+
+    def create_order(self, amount, currency='INR'):
+        """Return the gateway's order dict (with at least 'id') or raise PaymentGatewayError."""
+        return self._create_order({'amount': amount, 'currency': currency, 'payment_capture': '1'})
+
+    def _create_order(self, data):
+        raise NotImplementedError
+
+
+class RazorpayGateway(PaymentGateway):
+    """Razorpay orders over one keep-alive session with a bounded connection pool."""
+
+    def __init__(self, key_id, secret_key, timeout, connect_timeout, pool_size):
+        import razorpay  # Pulls in requests and urllib3; only the payment routes need them
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0))
+        self.client = razorpay.Client(session=session, auth=(key_id, secret_key))
+        self.timeout = (connect_timeout, timeout)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config['RP_KEY_ID'], config['RP_SECRET_KEY'], config['PAYMENT_TIMEOUT'],
+                   config['PAYMENT_CONNECT_TIMEOUT'], config['PAYMENT_MAX_CONCURRENCY'])
+
+    def _create_order(self, data):
+        try:
+            return self.client.order.create(data, timeout=self.timeout)
+        except Exception as e:  # razorpay.errors.* and requests exceptions alike
+            raise PaymentGatewayError(str(e) or type(e).__name__) from e
+
+
+class StubGateway(PaymentGateway):
+    """In-process stand-in with configurable latency and failure rate; never touches the network."""
+
+    def __init__(self, latency=0.2, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config['PAYMENT_STUB_LATENCY'], config['PAYMENT_STUB_FAILURE_RATE'])
+
+    def _create_order(self, data):
+        time.sleep(self.latency)
+        with self._lock:
+            failed = self._random.random() < self.failure_rate
+        if failed:
+            raise PaymentGatewayError('stub gateway failure')
+        return {'id': f"order_stub_{uuid.uuid4().hex[:14]}", 'entity': 'order', 'status': 'created', **data}
+
+
+GATEWAYS = {
+    'razorpay': RazorpayGateway,
+    'stub': StubGateway,
+}
+
+
+class PaymentService:
+    """Runs a gateway's calls on a bounded executor with a hard deadline per request."""
+
+    def __init__(self, gateway, max_concurrency, timeout):
+        self.gateway = gateway
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_concurrency, thread_name_prefix='payments')
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+
+    def submit_order(self, amount, currency='INR'):
+        """Start creating an order in the background; returns a Future. Raises PaymentGatewayBusy when full."""
+        if not self.slots.acquire(blocking=False):
+            raise PaymentGatewayBusy('payment gateway is busy, please try again shortly')
+        try:
+            future = self.executor.submit(self.gateway.create_order, amount, currency)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def create_order(self, amount, currency='INR'):
+        """Create an order, waiting at most `timeout` seconds."""
+        future = self.submit_order(amount, currency)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # The call keeps its slot until the gateway's own timeouts end it
+            raise PaymentGatewayError(f"payment gateway did not answer within {self.timeout:g}s") from None
+
+
+def build_service(config):
+    config = {**PAYMENT_DEFAULTS, **config}
+    name = config['PAYMENT_GATEWAY']
+    if name not in GATEWAYS:
+        raise ValueError(f"Unknown PAYMENT_GATEWAY {name!r}; choose from {', '.join(GATEWAYS)}")
+    gateway = GATEWAYS[name].from_config(config)
+    return PaymentService(gateway, config['PAYMENT_MAX_CONCURRENCY'], config['PAYMENT_TIMEOUT'])
+
+
+_service_lock = threading.Lock()
+
+
+def get_service():
+    """The app's PaymentService, built (and the gateway library imported) on the first payment."""
+    service = current_app.extensions.get('payments')
+    if service is None:
+        with _service_lock:
+            service = current_app.extensions.get('payments')
+            if service is None:
+                service = build_service(current_app.config)
+                current_app.extensions['payments'] = service
+    return service
+
+
+def create_order(amount, currency='INR'):
+    return get_service().create_order(amount, currency)
@@ -0,0 +1,110 @@
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import text
+
+from models.models import PlatformStat, db
+from services import archive
+
+COUNTERS = ('total_users', 'total_quizzes', 'total_subjects', 'pass_count', 'fail_count', 'na_count')
+STALE = 'stale'  # Set to 1 when a cascading delete makes incremental updates impractical
+PASS_PERCENTAGE = 40
+STATS_CACHE_TTL = 30  # seconds
+
+# Per-process copy of the counters: (dict, expiry on the monotonic clock)
+_cache = {'stats': None, 'expires': 0.0}
+
+
+def recompute_sql():
+    """One statement, so SQLite reads the counts and writes them under the same lock.
+
+    Scores are counted in quiz_score and in the archive, one source at a time
+    (a UNION ALL subquery is several times slower to scan).
+    """
+    sources = archive.score_sources()
+
+    def scores(condition):
+        return ' + '.join(f"(SELECT count(*) FROM {source} WHERE {condition})" for source in sources)
+
+    no_scores = ' AND '.join(
+        f"NOT EXISTS (SELECT 1 FROM {source} AS scores WHERE scores.user_id = user.id)" for source in sources
+    )
+    return f"""
+        INSERT OR REPLACE INTO platform_stat (name, value)
+        SELECT 'total_users', count(*) FROM user
+        UNION ALL SELECT 'total_quizzes', count(*) FROM quiz
+        UNION ALL SELECT 'total_subjects', count(*) FROM subject
+        UNION ALL SELECT 'pass_count', {scores(f"percentage >= {PASS_PERCENTAGE}")}
+        UNION ALL SELECT 'fail_count', {scores(f"percentage < {PASS_PERCENTAGE}")}
+        UNION ALL SELECT 'na_count', count(*) FROM user WHERE {no_scores}
+        UNION ALL SELECT '{STALE}', 0
+    """
+
+
+def invalidate_cache():
+    _cache['stats'] = None
+
+
+# pass_count, fail_count and na_count follow quiz_score through triggers
+# (models/migrations.py); totals are bumped by the code that creates rows.
+
+def bump(**deltas):
+    """Apply counter deltas inside the caller's transaction, e.g. bump(total_users=1, na_count=1)."""
+    for name, delta in deltas.items():
+        if delta:
+            db.session.execute(
+                text("UPDATE platform_stat SET value = value + :delta WHERE name = :name"),
+                {'delta': delta, 'name': name}
+            )
+    invalidate_cache()
+
+
+def mark_stale():
+    """Ask the next reader to recompute from scratch (after cascading deletes)."""
+    db.session.execute(
+        text("INSERT OR REPLACE INTO platform_stat (name, value) VALUES (:name, 1)"), {'name': STALE}
+    )
+    invalidate_cache()
+
+
+def recompute_platform_stats():
+    """Reconcile every counter against the base tables."""
+    db.session.execute(text(recompute_sql()))
+    db.session.commit()
+    invalidate_cache()
+
+
+def get_platform_stats():
+    """Counters for the statistics page, served from the process cache while fresh."""
+    now = time.monotonic()
+    if _cache['stats'] is not None and _cache['expires'] > now:
+        return _cache['stats']
+
+    stats = dict(db.session.query(PlatformStat.name, PlatformStat.value).all())
+    if stats.get(STALE, 1) or any(name not in stats for name in COUNTERS):
+        recompute_platform_stats()
+        stats = dict(db.session.query(PlatformStat.name, PlatformStat.value).all())
+
+    stats = {name: stats[name] for name in COUNTERS}
+    _cache['stats'] = stats
+    _cache['expires'] = now + current_app.config.get('STATS_CACHE_TTL', STATS_CACHE_TTL)
+    return stats
+
+
+def ensure_platform_stats():
+    if not PlatformStat.query.first():
+        recompute_platform_stats()
+
+
+@click.command('recompute-stats')
+@with_appcontext
+def recompute_stats_command():
+    """Recompute the platform statistics counters from scratch."""
+    recompute_platform_stats()
+    click.echo('Platform statistics recomputed.')
+
+
+def init_app(app):
+    app.cli.add_command(recompute_stats_command)
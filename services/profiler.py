@@ -0,0 +1,177 @@
+import cProfile
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import current_app, g, request, session
+
+# Opt-in profiles of single requests.
+#
+# A request is profiled when a logged-in admin adds ?_profile=1 (or sends
+# "X-Profile: 1"), or at random with probability PROFILE_SAMPLE_RATE. The
+# profile runs from the first before_request hook to teardown. That covers the
+# view, template rendering and the SQLAlchemy/sqlite3 calls. The result is
+# written to PROFILE_DIR:
+#   PROFILE_FORMAT = 'pstats'     cProfile output, for pstats / snakeviz
+#   PROFILE_FORMAT = 'collapsed'  stacks sampled every PROFILE_INTERVAL seconds (in practice no
+#                                 finer than the 5 ms GIL switch interval), one
+#                                 "frame;frame;frame count" line each (flamegraph.pl, speedscope)
+# Only the newest PROFILE_KEEP files are kept; /admin/profiles lists them. With
+# the rate at 0, a request that is not profiled costs one dict lookup.
+PROFILE_DEFAULTS = {
+    'PROFILE_DIR': os.path.join(tempfile.gettempdir(), 'quiz_profiles'),
+    'PROFILE_SAMPLE_RATE': 0.0,
+    'PROFILE_FORMAT': 'pstats',
+    'PROFILE_INTERVAL': 0.002,  # seconds between stack samples ('collapsed')
+    'PROFILE_KEEP': 50,
+}
+PROFILE_PARAM = '_profile'
+PROFILE_HEADER = 'X-Profile'
+EXTENSIONS = {'pstats': '.prof', 'collapsed': '.collapsed'}
+
+# cProfile can only run one profile per thread, and a second collapsed sampler
+# would only slow the first request down, so profiles never overlap within a process
+_active = threading.Lock()
+_FILENAME = re.compile(r'^(\d{8}-\d{6}-\d{6})_([\w.]+)_(\d+)ms_(\d+)(\.prof|\.collapsed)$')
+
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer and counts identical stacks."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _wanted():
+    config = current_app.config
+    if (request.args.get(PROFILE_PARAM) or request.headers.get(PROFILE_HEADER)) and session.get('admin_logged_in'):
+        return True
+    rate = config['PROFILE_SAMPLE_RATE']
+    return rate > 0 and random.random() < rate
+
+
+def _start_profile():
+    if not _wanted() or not _active.acquire(blocking=False):
+        return
+    if current_app.config['PROFILE_FORMAT'] == 'collapsed':
+        profiler = StackSampler(threading.get_ident(), current_app.config['PROFILE_INTERVAL'])
+        profiler.start()
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    g.profile = (profiler, time.perf_counter())
+
+
+def _finish_profile(response):
+    if 'profile' in g:
+        response.headers['X-Profile-File'] = _stop_profile()
+    return response
+
+
+def _teardown_profile(error):
+    if 'profile' in g:  # The view raised, so _finish_profile never ran
+        _stop_profile()
+
+
+def _stop_profile():
+    profiler, started = g.pop('profile')
+    try:
+        if isinstance(profiler, StackSampler):
+            profiler.stop()
+        else:
+            profiler.disable()
+        elapsed_ms = round((time.perf_counter() - started) * 1000)
+        config = current_app.config
+        directory = config['PROFILE_DIR']
+        os.makedirs(directory, exist_ok=True)
+        endpoint = re.sub(r'[^\w.]', '-', request.endpoint or 'unmatched')
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        extension = EXTENSIONS['collapsed' if isinstance(profiler, StackSampler) else 'pstats']
+        name = f"{stamp}_{endpoint}_{elapsed_ms}ms_{os.getpid()}{extension}"
+        if isinstance(profiler, StackSampler):
+            profiler.write(os.path.join(directory, name))
+        else:
+            profiler.dump_stats(os.path.join(directory, name))
+        _apply_retention(directory, config['PROFILE_KEEP'])
+        return name
+    finally:
+        _active.release()
+
+
+def _apply_retention(directory, keep):
+    profiles = sorted(list_profiles(directory), key=lambda profile: profile['name'], reverse=True)
+    for profile in profiles[keep:]:
+        try:
+            os.remove(os.path.join(directory, profile['name']))
+        except FileNotFoundError:
+            pass  # Another worker removed it first
+
+
+def list_profiles(directory):
+    """Profiles in `directory`, newest first."""
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in os.listdir(directory):
+        match = _FILENAME.match(name)
+        if not match:
+            continue
+        stamp, endpoint, elapsed_ms, pid, extension = match.groups()
+        try:
+            size = os.path.getsize(os.path.join(directory, name))
+        except FileNotFoundError:
+            continue
+        profiles.append({
+            'name': name,
+            'taken_at': datetime.strptime(stamp, '%Y%m%d-%H%M%S-%f'),
+            'endpoint': endpoint,
+            'elapsed_ms': int(elapsed_ms),
+            'pid': int(pid),
+            'format': 'collapsed' if extension == '.collapsed' else 'pstats',
+            'size': size,
+        })
+    return sorted(profiles, key=lambda profile: profile['name'], reverse=True)
+
+
+def init_app(app):
+    for name, default in PROFILE_DEFAULTS.items():
+        app.config.setdefault(name, default)
+    if app.config['PROFILE_FORMAT'] not in EXTENSIONS:
+        raise ValueError(f"Unknown PROFILE_FORMAT {app.config['PROFILE_FORMAT']!r}; choose from {', '.join(EXTENSIONS)}")
+    # Registered first so the profile also covers the other before_request hooks
+    app.before_request_funcs.setdefault(None, []).insert(0, _start_profile)
+    app.after_request(_finish_profile)
+    app.teardown_request(_teardown_profile)
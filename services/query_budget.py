@@ -0,0 +1,55 @@
+import logging
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised (when enforcement is on) if a view runs more SQL statements than it declared."""
+
+
+def query_budget(max_queries, methods=('GET',)):
+    """Declare the most SQL statements one request to this view may run.
+
+    Only requests with one of `methods` are checked; by default that is the
+    page render, not POST actions whose cascades vary with the data touched.
+    Put it under the route decorator so the budget is attached to the registered view:
+
+        @main_bp.route('/user_dashboard')
+        @query_budget(5)
+        def user_dashboard(): ...
+    """
+    def decorator(view):
+        view.query_budget = max_queries
+        view.query_budget_methods = methods
+        return view
+    return decorator
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+
+def _check_budget(response):
+    view = current_app.view_functions.get(request.endpoint)
+    budget = getattr(view, 'query_budget', None)
+    used = g.get('query_count', 0)
+    if budget is None or used <= budget or request.method not in view.query_budget_methods:
+        return response
+
+    message = f"{request.endpoint} ran {used} queries, budget is {budget}"
+    if current_app.config.get('QUERY_BUDGET_ENFORCE', current_app.testing):
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+    return response
+
+
+def init_app(app):
+    # Listening on the Engine class covers whichever engine Flask-SQLAlchemy builds
+    if not event.contains(Engine, 'before_cursor_execute', _count_statement):
+        event.listen(Engine, 'before_cursor_execute', _count_statement)
+    app.after_request(_check_budget)
@@ -0,0 +1,62 @@
+from datetime import date
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select, text
+
+from models.models import Question, Quiz, QuizAttempt, QuizScore, db
+
+
+def hot_queries():
+    """(name, statement) for the lookups the request handlers run on every hit."""
+    return [
+        ('quiz_feedback: latest attempt by user and quiz',
+         select(QuizAttempt).where(QuizAttempt.user_id == 1, QuizAttempt.quiz_id == 1)
+         .order_by(QuizAttempt.id.desc()).limit(1)),
+        ('submit_quiz: best score by user and quiz',
+         select(QuizScore).where(QuizScore.user_id == 1, QuizScore.quiz_id == 1)),
+        ('quiz_summary: scores by user',
+         select(QuizScore).where(QuizScore.user_id == 1)),
+        ('attempt_quiz: questions by quiz',
+         select(Question.id, Question.correct_option).where(Question.quiz_id == 1)),
+        ('quizzes by date',
+         select(Quiz).where(Quiz.date_of_quiz == date.today())),
+    ]
+
+
+def explain(statement):
+    """SQLite's EXPLAIN QUERY PLAN detail lines for a SQLAlchemy statement."""
+    compiled = statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True})
+    rows = db.session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).fetchall()
+    return [row[-1] for row in rows]
+
+
+def uses_index(plan):
+    # A bare "SCAN <table>" is a full table scan; SEARCH ... USING (COVERING) INDEX is what we want
+    return all(not line.startswith('SCAN') or 'INDEX' in line for line in plan)
+
+
+def check_query_plans():
+    """Return [(name, plan)] for every hot query that would scan a whole table."""
+    failures = []
+    for name, statement in hot_queries():
+        plan = explain(statement)
+        if not uses_index(plan):
+            failures.append((name, plan))
+    return failures
+
+
+@click.command('check-query-plans')
+@with_appcontext
+def check_query_plans_command():
+    """Fail if any hot query's EXPLAIN QUERY PLAN shows a full table scan."""
+    failures = check_query_plans()
+    for name, plan in failures:
+        click.echo(f"FULL SCAN  {name}: {'; '.join(plan)}", err=True)
+    if failures:
+        raise SystemExit(1)
+    click.echo(f"All {len(hot_queries())} hot queries use an index.")
+
+
+def init_app(app):
+    app.cli.add_command(check_query_plans_command)
@@ -0,0 +1,201 @@
+import csv
+import io
+import json
+import re
+from dataclasses import dataclass, field
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from models.models import Question, Quiz, db
+
+DEFAULT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+VALID_OPTIONS = {'A', 'B', 'C', 'D'}
+MAX_OBJECT_SIZE = 1024 * 1024  # Larger undecodable JSON means the file is malformed
+_SEPARATORS = re.compile(r'[\s,\[\]]*')
+
+# Accepted input headers/keys -> Question column. Both the manage_questions form
+# names and the admin_dashboard form names work.
+FIELD_ALIASES = {
+    'quiz_id': 'quiz_id',
+    'question_statement': 'question_statement',
+    'question_text': 'question_statement',
+    'optionA': 'optionA', 'option_a': 'optionA',
+    'optionB': 'optionB', 'option_b': 'optionB',
+    'optionC': 'optionC', 'option_c': 'optionC',
+    'optionD': 'optionD', 'option_d': 'optionD',
+    'correct_option': 'correct_option',
+}
+REQUIRED_FIELDS = ('quiz_id', 'question_statement', 'optionA', 'optionB', 'optionC', 'optionD', 'correct_option')
+TEXT_FIELDS = ('question_statement', 'optionA', 'optionB', 'optionC', 'optionD', 'correct_option')
+OPTION_FIELDS = ('optionA', 'optionB', 'optionC', 'optionD')
+MAX_OPTION_LENGTH = 255  # Question.optionA-D are String(255)
+
+
+@dataclass
+class ImportReport:
+    inserted: int = 0
+    failed: int = 0
+    # (row number, message); capped at MAX_REPORTED_ERRORS so a bad file can't exhaust memory
+    errors: list = field(default_factory=list)
+
+    def add_error(self, row_number, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row_number, message))
+
+
+def iter_csv(stream):
+    """Yield (row number, dict) from a CSV text stream with a header row."""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def iter_json(stream, chunk_size=64 * 1024):
+    """Yield (row number, dict) from a JSON array or JSON Lines text stream without loading it whole."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    row_number = 0
+    eof = False
+    while True:
+        # Skip array brackets, separators and whitespace between objects
+        pos = _SEPARATORS.match(buffer, pos).end()
+        if pos < len(buffer):
+            try:
+                obj, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Either the object spans the chunk boundary or the file is malformed
+                if eof or len(buffer) - pos > MAX_OBJECT_SIZE:
+                    yield row_number + 1, None
+                    return
+            else:
+                pos = end
+                row_number += 1
+                yield row_number, obj
+                continue
+        elif eof:
+            return
+
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+
+def _validate(raw, quiz_ids):
+    """Return (question values, None) or (None, error message) for one input row."""
+    if raw is None:
+        return None, 'Malformed JSON; import stopped here'
+    if not isinstance(raw, dict):
+        return None, 'Row is not an object'
+
+    values = {}
+    for key, value in raw.items():
+        column = FIELD_ALIASES.get(key)
+        if column:
+            values[column] = value.strip() if isinstance(value, str) else value
+
+    missing = [name for name in REQUIRED_FIELDS if values.get(name) in (None, '')]
+    if missing:
+        return None, f"Missing {', '.join(missing)}"
+
+    # JSON rows can carry numbers, lists or objects where the columns expect text
+    not_text = [name for name in TEXT_FIELDS if not isinstance(values[name], str)]
+    if not_text:
+        return None, f"{', '.join(not_text)} must be text"
+    too_long = [name for name in OPTION_FIELDS if len(values[name]) > MAX_OPTION_LENGTH]
+    if too_long:
+        return None, f"{', '.join(too_long)} longer than {MAX_OPTION_LENGTH} characters"
+
+    try:
+        values['quiz_id'] = int(values['quiz_id'])
+    except (TypeError, ValueError):
+        return None, f"Invalid quiz_id {values['quiz_id']!r}"
+    if values['quiz_id'] not in quiz_ids:
+        return None, f"Quiz {values['quiz_id']} does not exist"
+
+    values['correct_option'] = values['correct_option'].upper()
+    if values['correct_option'] not in VALID_OPTIONS:
+        return None, f"correct_option must be one of A, B, C, D (got {values['correct_option']!r})"
+
+    return values, None
+
+
+def import_questions(stream, fmt, batch_size=DEFAULT_BATCH_SIZE):
+    """Validate and insert questions from a CSV/JSON text stream.
+
+    Rows are inserted with one executemany INSERT per batch and each batch is
+    committed on its own, so memory stays bounded by `batch_size` and a bad
+    row only ends up in the report instead of aborting the import. If the
+    database still rejects a batch, it is retried row by row (one savepoint
+    each) so only the offending rows are reported.
+    """
+    rows = iter_csv(stream) if fmt == 'csv' else iter_json(stream)
+    quiz_ids = {quiz_id for (quiz_id,) in db.session.query(Quiz.id)}
+    report = ImportReport()
+    batch = []  # (row number, values)
+
+    def flush():
+        try:
+            db.session.execute(insert(Question), [values for _, values in batch])
+            db.session.commit()
+            report.inserted += len(batch)
+        except SQLAlchemyError:
+            db.session.rollback()
+            for row_number, values in batch:
+                try:
+                    with db.session.begin_nested():
+                        db.session.execute(insert(Question), [values])
+                    report.inserted += 1
+                except SQLAlchemyError as e:
+                    report.add_error(row_number, f"Rejected by the database: {getattr(e, 'orig', None) or e}")
+            db.session.commit()
+        batch.clear()
+
+    for row_number, raw in rows:
+        values, error = _validate(raw, quiz_ids)
+        if error:
+            report.add_error(row_number, error)
+            continue
+        batch.append((row_number, values))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return report
+
+
+def detect_format(filename):
+    return 'csv' if filename.lower().endswith('.csv') else 'json'
+
+
+def import_upload(file_storage, batch_size=DEFAULT_BATCH_SIZE):
+    """Import from an uploaded werkzeug FileStorage; large uploads are already spooled to disk."""
+    stream = io.TextIOWrapper(file_storage.stream, encoding='utf-8-sig', newline='')
+    return import_questions(stream, detect_format(file_storage.filename or ''), batch_size)
+
+
+@click.command('import-questions')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True, help='Rows per INSERT transaction.')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'json']), help='Defaults to the file extension.')
+@with_appcontext
+def import_questions_command(path, batch_size, fmt):
+    """Bulk-import questions from a CSV or JSON (array or JSON Lines) file."""
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        report = import_questions(stream, fmt or detect_format(path), batch_size)
+
+    for row_number, message in report.errors:
+        click.echo(f"row {row_number}: {message}", err=True)
+    if report.failed > len(report.errors):
+        click.echo(f"... {report.failed - len(report.errors)} more errors not shown", err=True)
+    click.echo(f"Imported {report.inserted} questions, {report.failed} rows rejected.")
+
+
+def init_app(app):
+    app.cli.add_command(import_questions_command)
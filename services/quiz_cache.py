@@ -0,0 +1,98 @@
+from collections import OrderedDict, namedtuple
+import threading
+import time
+
+from models.models import Question, db
+
+# Read-only stand-in for Question with just what attempt_quiz, submit_quiz and
+# quiz_feedback use; templates read it exactly like the ORM object.
+QuestionRecord = namedtuple(
+    'QuestionRecord',
+    ['id', 'question_statement', 'optionA', 'optionB', 'optionC', 'optionD', 'correct_option']
+)
+
+DEFAULT_MAX_QUIZZES = 256
+DEFAULT_TTL = 60  # seconds; bounds staleness in other worker processes after an admin edit
+
+
+class QuizContentCache:
+    """Bounded LRU of each quiz's questions and answer key, keyed by quiz_id.
+
+    Admin edits invalidate the affected quiz in this process; the TTL bounds
+    how long any other process can keep serving the old content.
+    """
+
+    def __init__(self, max_quizzes=DEFAULT_MAX_QUIZZES, ttl=DEFAULT_TTL):
+        self.max_quizzes = max_quizzes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # quiz_id -> (questions, answer_key, expiry)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _load(self, quiz_id):
+        rows = (
+            db.session.query(*(getattr(Question, name) for name in QuestionRecord._fields))
+            .filter(Question.quiz_id == quiz_id)
+            .order_by(Question.id)
+            .all()
+        )
+        questions = tuple(QuestionRecord(*row) for row in rows)
+        answer_key = tuple((question.id, question.correct_option) for question in questions)
+        return questions, answer_key
+
+    def _get(self, quiz_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(quiz_id)
+            if entry and entry[2] > now:
+                self._entries.move_to_end(quiz_id)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        # Query outside the lock; two concurrent misses just load the same rows twice
+        questions, answer_key = self._load(quiz_id)
+        entry = (questions, answer_key, now + self.ttl)
+        with self._lock:
+            self._entries[quiz_id] = entry
+            self._entries.move_to_end(quiz_id)
+            while len(self._entries) > self.max_quizzes:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def questions(self, quiz_id):
+        """Tuple of QuestionRecord for the quiz, in question order."""
+        return self._get(int(quiz_id))[0]
+
+    def answer_key(self, quiz_id):
+        """Tuple of (question_id, correct_option) for the quiz, in question order."""
+        return self._get(int(quiz_id))[1]
+
+    def invalidate(self, quiz_id=None):
+        """Forget one quiz (or everything, when quiz_id is None)."""
+        with self._lock:
+            if quiz_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(int(quiz_id), None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_quizzes': self.max_quizzes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+quiz_cache = QuizContentCache()
+
+
+def init_app(app):
+    quiz_cache.max_quizzes = app.config.get('QUIZ_CACHE_SIZE', DEFAULT_MAX_QUIZZES)
+    quiz_cache.ttl = app.config.get('QUIZ_CACHE_TTL', DEFAULT_TTL)
@@ -0,0 +1,41 @@
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import text
+
+from models.models import HISTOGRAM_BUCKETS, QuizScore, QuizStats, db
+from services import archive
+
+
+# Day to day, quiz_stats is maintained by the quiz_score triggers created in
+# models/migrations.py; this module only backfills and reconciles it.
+
+def rebuild_quiz_stats():
+    """Recompute every quiz's aggregates from the quiz_score table and its archived rows."""
+    bucket = f"min(CAST(percentage / {100 / HISTOGRAM_BUCKETS} AS INTEGER), {HISTOGRAM_BUCKETS - 1})"
+    counts = ', '.join(f"sum({bucket} = {i})" for i in range(HISTOGRAM_BUCKETS))
+    scores = ' UNION ALL '.join(f"SELECT quiz_id, score, percentage FROM {source}" for source in archive.score_sources())
+    db.session.execute(text("DELETE FROM quiz_stats"))
+    db.session.execute(text(
+        "INSERT INTO quiz_stats (quiz_id, attempt_count, score_sum, max_score, histogram) "
+        f"SELECT quiz_id, count(*), sum(score), max(score), json_array({counts}) "
+        f"FROM ({scores}) AS scores GROUP BY quiz_id"
+    ))
+    db.session.commit()
+
+
+def ensure_quiz_stats():
+    """Backfill the aggregates the first time the table appears next to existing scores."""
+    if not QuizStats.query.first() and QuizScore.query.first():
+        rebuild_quiz_stats()
+
+
+@click.command('rebuild-quiz-stats')
+@with_appcontext
+def rebuild_quiz_stats_command():
+    """Backfill per-quiz score aggregates from existing QuizScore rows."""
+    rebuild_quiz_stats()
+    click.echo('Quiz score aggregates rebuilt.')
+
+
+def init_app(app):
+    app.cli.add_command(rebuild_quiz_stats_command)
@@ -0,0 +1,159 @@
+import re
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import Float, Integer, event, text
+
+from models.models import Chapter, Quiz, Subject, User, db
+
+# One FTS5 table indexes every searchable entity. The rowid encodes both the
+# entity kind and its primary key (rowid = id * STRIDE + kind), so keeping a
+# row in sync is a rowid lookup rather than a scan of the index.
+KINDS = {'user': 0, 'subject': 1, 'chapter': 2, 'quiz': 3}
+STRIDE = len(KINDS)
+
+# `title` holds the entity's own searchable text; `context` holds the parent's
+# name (a chapter's subject, a quiz's chapter) so admins can search by either.
+TITLE = ('title',)
+TITLE_AND_CONTEXT = ('title', 'context')
+
+CREATE_INDEX_SQL = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_index
+    USING fts5(title, context, tokenize='unicode61', prefix='2 3')
+"""
+
+
+def _rowid(kind, ref_id):
+    return ref_id * STRIDE + KINDS[kind]
+
+
+def _document(connection, target):
+    """(title, context) text for one model instance."""
+    # Parents are read through the flush's connection; lazy-loading them here
+    # would re-enter the Session while it is flushing.
+    if isinstance(target, User):
+        return ' '.join(filter(None, [target.username, target.full_name, target.qualification])), ''
+    if isinstance(target, Subject):
+        return target.name, ''
+    if isinstance(target, Chapter):
+        parent = connection.execute(text("SELECT name FROM subject WHERE id = :id"), {'id': target.subject_id}).scalar()
+        return target.name, parent or ''
+    parent = connection.execute(text("SELECT name FROM chapter WHERE id = :id"), {'id': target.chapter_id}).scalar()
+    return target.remarks, parent or ''
+
+
+def match_expression(term, columns=TITLE_AND_CONTEXT):
+    """Turn free text into an FTS5 query: every word must match as a prefix."""
+    words = re.findall(r'\w+', term)
+    if not words:
+        return None
+    expr = ' '.join(f'"{word}"*' for word in words)
+    if tuple(columns) != TITLE_AND_CONTEXT:
+        expr = '{%s} : (%s)' % (' '.join(columns), expr)
+    return expr
+
+
+def match_subquery(model, term, columns=TITLE_AND_CONTEXT):
+    """Subquery of (ref_id, rank) for `model` rows matching `term`, best match first by rank.
+
+    Join it against the model's query:
+
+        hits = match_subquery(Subject, 'alg')
+        Subject.query.join(hits, Subject.id == hits.c.ref_id).order_by(hits.c.rank)
+    """
+    expr = match_expression(term, columns)
+    if expr is None:
+        stmt = text("SELECT NULL AS ref_id, NULL AS rank WHERE 0")
+    else:
+        stmt = text(
+            "SELECT rowid / :stride AS ref_id, rank FROM search_index "
+            "WHERE search_index MATCH :expr AND rowid % :stride = :kind"
+        ).bindparams(stride=STRIDE, expr=expr, kind=KINDS[model.__tablename__])
+    return stmt.columns(ref_id=Integer, rank=Float).subquery()
+
+
+def _index(connection, target):
+    kind = target.__tablename__
+    title, context = _document(connection, target)
+    rowid = _rowid(kind, target.id)
+    connection.execute(text("DELETE FROM search_index WHERE rowid = :rowid"), {'rowid': rowid})
+    connection.execute(
+        text("INSERT INTO search_index (rowid, title, context) VALUES (:rowid, :title, :context)"),
+        {'rowid': rowid, 'title': title, 'context': context}
+    )
+
+
+def _after_insert_or_update(mapper, connection, target):
+    _index(connection, target)
+
+    # Children carry the parent's name as context
+    if isinstance(target, Subject):
+        connection.execute(text(
+            "UPDATE search_index SET context = :name WHERE rowid IN "
+            "(SELECT id * :stride + :kind FROM chapter WHERE subject_id = :id)"
+        ), {'name': target.name, 'stride': STRIDE, 'kind': KINDS['chapter'], 'id': target.id})
+    elif isinstance(target, Chapter):
+        connection.execute(text(
+            "UPDATE search_index SET context = :name WHERE rowid IN "
+            "(SELECT id * :stride + :kind FROM quiz WHERE chapter_id = :id)"
+        ), {'name': target.name, 'stride': STRIDE, 'kind': KINDS['quiz'], 'id': target.id})
+
+
+def _after_delete(mapper, connection, target):
+    connection.execute(
+        text("DELETE FROM search_index WHERE rowid = :rowid"),
+        {'rowid': _rowid(target.__tablename__, target.id)}
+    )
+
+
+def rebuild_search_index():
+    """Repopulate the index from the base tables in four set-based INSERTs."""
+    db.session.execute(text(CREATE_INDEX_SQL))
+    db.session.execute(text("DELETE FROM search_index"))
+    params = {'stride': STRIDE, **{f'k_{name}': code for name, code in KINDS.items()}}
+    db.session.execute(text(
+        "INSERT INTO search_index (rowid, title, context) "
+        "SELECT id * :stride + :k_user, username || ' ' || full_name || ' ' || coalesce(qualification, ''), '' FROM user"
+    ), params)
+    db.session.execute(text(
+        "INSERT INTO search_index (rowid, title, context) "
+        "SELECT id * :stride + :k_subject, name, '' FROM subject"
+    ), params)
+    db.session.execute(text(
+        "INSERT INTO search_index (rowid, title, context) "
+        "SELECT chapter.id * :stride + :k_chapter, chapter.name, coalesce(subject.name, '') "
+        "FROM chapter LEFT JOIN subject ON subject.id = chapter.subject_id"
+    ), params)
+    db.session.execute(text(
+        "INSERT INTO search_index (rowid, title, context) "
+        "SELECT quiz.id * :stride + :k_quiz, quiz.remarks, coalesce(chapter.name, '') "
+        "FROM quiz LEFT JOIN chapter ON chapter.id = quiz.chapter_id"
+    ), params)
+    db.session.execute(text("INSERT INTO search_index (search_index) VALUES ('optimize')"))
+    db.session.commit()
+
+
+def ensure_search_index():
+    """Create the index on first run and fill it from whatever is already in the database."""
+    exists = db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_index'")
+    ).first()
+    if not exists:
+        rebuild_search_index()
+
+
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index_command():
+    """Rebuild the full-text search index from the existing tables."""
+    rebuild_search_index()
+    click.echo('Search index rebuilt.')
+
+
+def init_app(app):
+    for model in (User, Subject, Chapter, Quiz):
+        if not event.contains(model, 'after_insert', _after_insert_or_update):
+            event.listen(model, 'after_insert', _after_insert_or_update)
+            event.listen(model, 'after_update', _after_insert_or_update)
+            event.listen(model, 'after_delete', _after_delete)
+    app.cli.add_command(rebuild_search_index_command)
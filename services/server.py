@@ -0,0 +1,329 @@
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler, load_ssl_context
+
+from models.models import db
+from services import autosave
+from services import database
+from services import metrics
+from services import submission_queue
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Pre-fork launcher: the master binds the HTTP and HTTPS sockets once, then
+# forks SERVER_WORKERS processes that each accept on both of them with a pool of
+# SERVER_THREADS request threads. Connections are spread across workers by the
+# kernel, so throughput scales with cores instead of sharing one GIL.
+#
+#   SIGTERM / SIGINT  stop accepting, let in-flight requests finish, exit
+#   SIGHUP            start a fresh set of workers, then drain the old ones
+#
+# A worker that dies unexpectedly is replaced. Every worker logs a health line
+# (requests served, in flight, busy threads, RSS) every SERVER_HEALTH_INTERVAL.
+SERVER_DEFAULTS = {
+    'SERVER_HOST': '0.0.0.0',
+    'SERVER_HTTP_PORT': 5000,
+    'SERVER_HTTPS_PORT': 5001,  # 0 disables the HTTPS listener
+    'SERVER_SSL_CERT': 'ssl/certificate.pem',
+    'SERVER_SSL_KEY': 'ssl/private_key.pem',
+    'SERVER_WORKERS': os.cpu_count() or 1,
+    'SERVER_THREADS': 8,
+    'SERVER_BACKLOG': 1024,
+    'SERVER_KEEPALIVE': 5,  # seconds an idle keep-alive connection may hold a thread
+    'SERVER_GRACEFUL_TIMEOUT': 30,  # seconds a draining worker gets before SIGKILL
+    'SERVER_HEALTH_INTERVAL': 60,
+}
+
+
+class _RequestHandler(WSGIRequestHandler):
+    def handle_one_request(self):
+        super().handle_one_request()
+        if self.server.draining.is_set():
+            self.close_connection = True  # Don't keep connections open on a worker that is leaving
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug server that hands connections to a fixed pool of threads.
+
+    The accept loop blocks while every thread is busy, so surplus connections
+    wait in the shared kernel backlog where another worker can pick them up.
+    """
+
+    multithread = True
+
+    def __init__(self, host, port, app, threads, fd, ssl_context=None, keepalive=5):
+        handler = type('RequestHandler', (_RequestHandler,), {'timeout': keepalive})
+        super().__init__(host, port, app, handler=handler, ssl_context=ssl_context, fd=fd)
+        self.pool = ThreadPoolExecutor(threads, thread_name_prefix=f'http-{port}')
+        self.slots = threading.BoundedSemaphore(threads)
+        self.threads = threads
+        self.busy = 0
+        self._busy_lock = threading.Lock()
+        self.draining = threading.Event()
+
+    def process_request(self, request, client_address):
+        self.slots.acquire()
+        with self._busy_lock:
+            self.busy += 1
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            with self._busy_lock:
+                self.busy -= 1
+            self.slots.release()
+
+    def drain(self):
+        """Stop accepting, then wait for in-flight connections to finish."""
+        self.draining.set()
+        self.shutdown()
+        self.server_close()
+        self.pool.shutdown(wait=True)
+
+
+class _RequestCounter:
+    """WSGI middleware counting served and in-flight requests for the health log."""
+
+    def __init__(self, app):
+        self.app = app
+        self.served = 0
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        with self._lock:
+            self.active += 1
+        try:
+            return self.app(environ, start_response)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.served += 1
+
+
+class Listener:
+    def __init__(self, host, port, backlog, ssl_context=None):
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl_context
+        self.socket = socket.create_server((host, port), backlog=backlog)
+
+    @property
+    def scheme(self):
+        return 'https' if self.ssl_context else 'http'
+
+
+def bind_listeners(config):
+    host, backlog = config['SERVER_HOST'], config['SERVER_BACKLOG']
+    listeners = [Listener(host, config['SERVER_HTTP_PORT'], backlog)]
+    if config['SERVER_HTTPS_PORT']:
+        context = load_ssl_context(config['SERVER_SSL_CERT'], config['SERVER_SSL_KEY'])
+        listeners.append(Listener(host, config['SERVER_HTTPS_PORT'], backlog, ssl_context=context))
+    return listeners
+
+
+def run_worker(app, listeners, config, index=0):
+    """Serve on every listener until SIGTERM, then drain. Runs inside a worker process."""
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C reaches the whole group; the master coordinates
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+    counter = _RequestCounter(app)
+    servers = [
+        PooledWSGIServer(listener.host, listener.port, counter, config['SERVER_THREADS'],
+                         fd=listener.socket.fileno(), ssl_context=listener.ssl_context,
+                         keepalive=config['SERVER_KEEPALIVE'])
+        for listener in listeners
+    ]
+    for server in servers:
+        threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.5}, daemon=True).start()
+
+    started = time.monotonic()
+
+    def log_health():
+        rss_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else 0  # KiB on Linux
+        logger.info(
+            "worker %d pid %d: served=%d in_flight=%d busy_threads=%d/%d rss=%.0fMiB uptime=%.0fs",
+            index, os.getpid(), counter.served, counter.active,
+            sum(server.busy for server in servers), sum(server.threads for server in servers),
+            rss_mib, time.monotonic() - started,
+        )
+
+    logger.info("worker %d pid %d: serving %s", index, os.getpid(),
+                ', '.join(f"{l.scheme}://{l.host}:{l.port}" for l in listeners))
+    while not stop.wait(config['SERVER_HEALTH_INTERVAL']):
+        log_health()
+
+    logger.info("worker %d pid %d: draining", index, os.getpid())
+    for server in servers:
+        server.drain()
+    submission_queue.shutdown(app)  # Write what the drained requests spooled
+    autosave.shutdown(app)
+    log_health()
+
+
+class Arbiter:
+    """Master process: forks workers, replaces dead ones, handles SIGHUP/SIGTERM."""
+
+    def __init__(self, app, listeners, config):
+        self.app = app
+        self.listeners = listeners
+        self.config = config
+        self.workers = {}  # pid -> slot index
+        self.retiring = {}  # pid -> SIGKILL deadline (monotonic)
+        self.stopping = False
+        self.reloading = False
+
+    def spawn(self, index):
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = index
+            return
+        status = 0
+        try:
+            run_worker(self.app, self.listeners, self.config, index)
+        except BaseException:
+            logger.exception("worker %d pid %d crashed", index, os.getpid())
+            status = 1
+        finally:
+            logging.shutdown()
+            os._exit(status)
+
+    def retire(self, pids):
+        deadline = time.monotonic() + self.config['SERVER_GRACEFUL_TIMEOUT']
+        for pid in pids:
+            self.workers.pop(pid, None)
+            self.retiring[pid] = deadline
+            self._kill(pid, signal.SIGTERM)
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            if pid in self.retiring:
+                del self.retiring[pid]
+                continue
+            index = self.workers.pop(pid, None)
+            if index is not None and not self.stopping:
+                logger.warning("worker %d pid %d exited with status %d; replacing it",
+                               index, pid, os.waitstatus_to_exitcode(status))
+                self.spawn(index)
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+
+        # Never hand a pooled SQLite connection from the master to a worker
+        with self.app.app_context():
+            db.engine.dispose()
+
+        logger.info("master pid %d: %d workers x %d threads on %s", os.getpid(),
+                    self.config['SERVER_WORKERS'], self.config['SERVER_THREADS'],
+                    ', '.join(f"{l.scheme}://{l.host}:{l.port}" for l in self.listeners))
+        for index in range(self.config['SERVER_WORKERS']):
+            self.spawn(index)
+
+        while not self.stopping:
+            time.sleep(0.5)
+            self.reap()
+            if self.reloading:
+                self.reloading = False
+                logger.info("master pid %d: SIGHUP, replacing %d workers", os.getpid(), len(self.workers))
+                old = dict(self.workers)
+                for index in sorted(old.values()):
+                    self.spawn(index)
+                self.retire(old)
+            self._kill_overdue()
+
+        logger.info("master pid %d: shutting down, draining %d workers", os.getpid(), len(self.workers))
+        self.retire(list(self.workers))
+        while self.retiring:
+            time.sleep(0.2)
+            self.reap()
+            self._kill_overdue()
+        for listener in self.listeners:
+            listener.socket.close()
+
+    def _kill_overdue(self):
+        now = time.monotonic()
+        for pid, deadline in list(self.retiring.items()):
+            if deadline < now:
+                logger.warning("worker pid %d did not drain in time; killing it", pid)
+                self._kill(pid, signal.SIGKILL)
+                self.retiring[pid] = float('inf')
+
+    @staticmethod
+    def _kill(pid, sig):
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def _on_stop(self, signum, frame):
+        self.stopping = True
+
+    def _on_reload(self, signum, frame):
+        self.reloading = True
+
+
+def serve(app, **overrides):
+    """Run the app with the pre-fork launcher. Keyword overrides win over app.config."""
+    config = {name: app.config.get(name, default) for name, default in SERVER_DEFAULTS.items()}
+    config.update({name: value for name, value in overrides.items() if value is not None})
+    if not logging.getLogger().handlers:
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    # Set up the schema once here, so forked workers don't race to do it on their first request
+    with app.app_context():
+        database.init_db()
+        submission_queue.recover(app)  # Attempts spooled but not written when the last run stopped
+    metrics.prepare(app)  # One metrics directory for every worker, emptied of the last run's files
+
+    listeners = bind_listeners(config)
+    if not hasattr(os, 'fork'):
+        # No fork() (Windows): one in-process worker with the same thread pool
+        logger.info("fork() unavailable; serving from a single process")
+        run_worker(app, listeners, config)
+        return
+    Arbiter(app, listeners, config).run()
+
+
+@click.command('serve')
+@click.option('--workers', type=int, help='Worker processes (default: SERVER_WORKERS).')
+@click.option('--threads', type=int, help='Request threads per worker (default: SERVER_THREADS).')
+@click.option('--http-port', type=int, help='HTTP port (default: SERVER_HTTP_PORT).')
+@click.option('--https-port', type=int, help='HTTPS port, 0 to disable (default: SERVER_HTTPS_PORT).')
+@with_appcontext
+def serve_command(workers, threads, http_port, https_port):
+    """Serve the app with pre-forked workers on the HTTP and HTTPS ports."""
+    serve(current_app._get_current_object(), SERVER_WORKERS=workers, SERVER_THREADS=threads,
+          SERVER_HTTP_PORT=http_port, SERVER_HTTPS_PORT=https_port)
+
+
+def init_app(app):
+    app.cli.add_command(serve_command)
@@ -0,0 +1,180 @@
+import heapq
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+slow_logger = logging.getLogger(__name__ + '.slow')
+
+# Per-request SQL instrumentation.
+#
+# Engine hooks time every statement run while a request is active and keep,
+# on `g`, the statement count, total DB time and the slowest few statements
+# (normalised: literals become ?, IN lists collapse). Statements slower than
+# SQL_SLOW_QUERY_MS go to the "services.sql_stats.slow" logger, which also
+# writes to SQL_SLOW_QUERY_LOG when that is set. Each finished request is
+# added to a rolling window per endpoint (SQL_STATS_WINDOW requests). The
+# windows belong to this process; /admin/perf shows them.
+# With SQL_STATS_HEADERS on, responses carry X-DB-Queries, X-DB-Time-Ms and
+# Server-Timing.
+SQL_STATS_DEFAULTS = {
+    'SQL_STATS': True,
+    'SQL_STATS_HEADERS': False,
+    'SQL_STATS_WINDOW': 200,  # recent requests kept per endpoint
+    'SQL_STATS_TOP': 5,  # slowest statements kept per request
+    'SQL_SLOW_QUERY_MS': 100,
+    'SQL_SLOW_QUERY_LOG': None,  # file path for the slow-query log
+}
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement):
+    """Statement shape without literals, so equal queries group together."""
+    statement = _STRING.sub('?', statement)
+    statement = _NUMBER.sub('?', statement)
+    statement = _IN_LIST.sub('(?, ...)', statement)
+    return _SPACE.sub(' ', statement).strip()
+
+
+class RequestSQL:
+    """The statements one request ran."""
+
+    __slots__ = ('count', 'seconds', 'slowest')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest = []  # min-heap of (seconds, statement)
+
+    def add(self, statement, seconds, keep):
+        self.count += 1
+        self.seconds += seconds
+        if len(self.slowest) < keep:
+            heapq.heappush(self.slowest, (seconds, statement))
+        elif seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (seconds, statement))
+
+
+class EndpointWindow:
+    def __init__(self, size):
+        self.requests = deque(maxlen=size)  # (request_ms, queries, db_ms, [(ms, normalised sql)])
+
+    def summary(self):
+        requests = list(self.requests)
+        durations = sorted(r[0] for r in requests)
+        statements = {}
+        for _, _, _, slowest in requests:
+            for ms, sql in slowest:
+                entry = statements.setdefault(sql, [0, 0.0, 0.0])
+                entry[0] += 1
+                entry[1] += ms
+                entry[2] = max(entry[2], ms)
+        top = sorted(statements.items(), key=lambda item: item[1][1], reverse=True)[:10]
+        n = len(requests)
+        return {
+            'requests': n,
+            'p50_ms': _percentile(durations, 0.50),
+            'p95_ms': _percentile(durations, 0.95),
+            'avg_queries': round(sum(r[1] for r in requests) / n, 1) if n else 0,
+            'max_queries': max((r[1] for r in requests), default=0),
+            'avg_db_ms': round(sum(r[2] for r in requests) / n, 2) if n else 0,
+            'db_share': round(sum(r[2] for r in requests) / sum(durations), 2) if durations and sum(durations) else 0,
+            'top_statements': [
+                {'sql': sql, 'seen': seen, 'total_ms': round(total, 2), 'max_ms': round(worst, 2)}
+                for sql, (seen, total, worst) in top
+            ],
+        }
+
+
+def _percentile(values, fraction):
+    return round(values[min(len(values) - 1, int(fraction * len(values)))], 2) if values else None
+
+
+_windows = {}
+_windows_lock = threading.Lock()
+
+
+def endpoint_summaries():
+    """{endpoint: summary} for this process, busiest endpoints first."""
+    with _windows_lock:
+        windows = dict(_windows)
+    summaries = {endpoint: window.summary() for endpoint, window in windows.items()}
+    return dict(sorted(summaries.items(), key=lambda item: item[1]['requests'], reverse=True))
+
+
+def reset():
+    with _windows_lock:
+        _windows.clear()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'sql_stats' in g:
+        conn.info.setdefault('sql_stats_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('sql_stats_started')
+    if not started or not has_request_context() or 'sql_stats' not in g:
+        return
+    seconds = time.perf_counter() - started.pop()
+    config = current_app.config
+    g.sql_stats.add(statement, seconds, config['SQL_STATS_TOP'])
+    if seconds * 1000 >= config['SQL_SLOW_QUERY_MS']:
+        slow_logger.warning("%.1f ms %s %s: %s", seconds * 1000, request.method, request.endpoint,
+                            normalize_sql(statement))
+
+
+def _start_request():
+    if current_app.config['SQL_STATS']:
+        g.sql_stats = RequestSQL()
+        g.sql_stats_started = time.perf_counter()
+
+
+def _finish_request(response):
+    stats = g.pop('sql_stats', None)
+    if stats is None:
+        return response
+    request_ms = (time.perf_counter() - g.sql_stats_started) * 1000
+    db_ms = stats.seconds * 1000
+
+    if request.endpoint:
+        slowest = [(round(seconds * 1000, 3), normalize_sql(sql)) for seconds, sql in stats.slowest]
+        with _windows_lock:
+            window = _windows.get(request.endpoint)
+            if window is None:
+                window = _windows[request.endpoint] = EndpointWindow(current_app.config['SQL_STATS_WINDOW'])
+        window.requests.append((request_ms, stats.count, db_ms, slowest))
+
+    if current_app.config['SQL_STATS_HEADERS']:
+        response.headers['X-DB-Queries'] = str(stats.count)
+        response.headers['X-DB-Time-Ms'] = f"{db_ms:.2f}"
+        response.headers.add('Server-Timing', f"db;dur={db_ms:.2f};desc=\"{stats.count} queries\"")
+        response.headers.add('Server-Timing', f"app;dur={request_ms:.2f}")
+    return response
+
+
+def init_app(app):
+    for name, default in SQL_STATS_DEFAULTS.items():
+        app.config.setdefault(name, default)
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+    path = app.config['SQL_SLOW_QUERY_LOG']
+    if path and not any(getattr(h, 'baseFilename', None) == os.path.abspath(path) for h in slow_logger.handlers):
+        handler = logging.FileHandler(path)
+        handler.setFormatter(logging.Formatter('%(asctime)s pid %(process)d %(message)s'))
+        slow_logger.addHandler(handler)
+        slow_logger.setLevel(logging.WARNING)
@@ -0,0 +1,385 @@
+import atexit
+from collections import namedtuple
+from datetime import datetime, timedelta
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from models.models import SpoolSegment, db
+from services import autosave
+from services.attempts import pack_attempt, save_attempts
+from services.grading import save_best_score
+from services.metrics import pid_alive
+
+logger = logging.getLogger(__name__)
+
+# Write-behind mode for submit_quiz (SUBMIT_WRITE_BEHIND, off by default).
+#
+# At the end of a timed quiz the whole class submits within a minute. If each
+# of those requests wrote and committed on its own, they would queue on
+# SQLite's single write lock. In this mode the view grades from the cached
+# answer key and hands the attempt to this queue instead:
+#
+#   1. The attempt is appended as one JSON line to this process's spool
+#      segment and fsynced. Threads that append together share one fsync
+#      (group commit), and each new segment's directory entry is fsynced when
+#      the file is created. Only then is the student told the answers were
+#      submitted.
+#   2. Every SUBMIT_FLUSH_INTERVAL seconds a writer thread rotates to a new
+#      segment. It then stores everything in the old one in a single
+#      transaction: one executemany for the packed attempts, plus one best-score
+#      UPSERT per (user, quiz). The same transaction records the segment's
+#      name in spool_segment, and the file is deleted afterwards.
+#   3. Segments left behind by a crashed or killed process are replayed by the
+#      next queue to start, by serve() before it forks, or by
+#      `flask recover-submissions`. A segment already listed in spool_segment
+#      is only deleted, so nothing is written twice.
+#
+# When more than SUBMIT_QUEUE_MAX attempts are waiting, enqueue() refuses and
+# the view writes synchronously as before.
+SUBMISSION_DEFAULTS = {
+    'SUBMIT_WRITE_BEHIND': False,
+    'SUBMIT_SPOOL_DIR': None,  # defaults to <instance path>/submission_spool
+    'SUBMIT_FLUSH_INTERVAL': 0.2,  # seconds between grouped writes
+    'SUBMIT_QUEUE_MAX': 5000,
+    'SUBMIT_SPOOL_FSYNC': True,
+    'SUBMIT_SPOOL_RETENTION_DAYS': 7,  # how long spool_segment remembers applied segments
+}
+
+SEGMENT_GLOB = 'segment-*.log*'
+CLAIM = '.recovering-'
+
+# Stands in for a stored response (attempts.Response) that has not been written yet
+PendingResponse = namedtuple('PendingResponse', ['question_id', 'selected_answer', 'is_correct'])
+PendingAttempt = namedtuple('PendingAttempt', ['submitted_at', 'responses'])
+
+
+def spool_dir(app):
+    return app.config['SUBMIT_SPOOL_DIR'] or os.path.join(app.instance_path, 'submission_spool')
+
+
+def fsync_dir(directory):
+    """Make created, renamed or removed entries in a directory durable."""
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def read_segment(path):
+    """Submissions in a spool segment. A torn last line (crash mid-append) was never acknowledged."""
+    submissions = []
+    with open(path, 'rb') as f:
+        for line in f:
+            try:
+                submissions.append(json.loads(line))
+            except ValueError:
+                break
+    return submissions
+
+
+def pending_attempt_from(submission):
+    return PendingAttempt(datetime.fromisoformat(submission['timestamp']),
+                          [PendingResponse(*response) for response in submission['responses']])
+
+
+def spooled_submission(directory, user_id, quiz_id, skip_pid=None):
+    """The latest submission of (user, quiz) in another process's spool segment, else None.
+
+    Segments are read newest first (by the creation time in their name) and
+    the search stops at the first one holding the attempt; segments of
+    `skip_pid` are left out. Lines are written by json.dumps in enqueue()'s key
+    order, so a line of this attempt starts with its user_id and quiz_id;
+    other lines are not parsed.
+    """
+    prefix = f'{{"user_id":{user_id},"quiz_id":{quiz_id},'.encode()
+    segments = []
+    for path in glob.glob(os.path.join(directory, SEGMENT_GLOB)):
+        _, pid, created = os.path.basename(path).partition(CLAIM)[0][:-len('.log')].split('-')
+        if int(pid) != skip_pid:
+            segments.append((int(created), path))
+    for _, path in sorted(segments, reverse=True):
+        try:
+            with open(path, 'rb') as f:
+                lines = [line for line in f if line.startswith(prefix)]
+        except FileNotFoundError:
+            continue  # Written and removed meanwhile; the database has it now
+        for line in reversed(lines):
+            try:
+                return json.loads(line)
+            except ValueError:
+                continue  # Torn last line
+    return None
+
+
+def apply_segment(name, submissions):
+    """Write one segment's submissions in a single transaction. Returns False if it was applied before."""
+    if db.session.get(SpoolSegment, name) is not None:
+        return False
+
+    save_attempts([
+        pack_attempt(s['user_id'], s['quiz_id'], s['responses'], submitted_at=datetime.fromisoformat(s['timestamp']))
+        for s in submissions
+    ])
+
+    # Only each (user, quiz)'s best attempt in the batch can change the stored best score
+    best = {}
+    for s in submissions:
+        key = (s['user_id'], s['quiz_id'])
+        if key not in best or s['score'] >= best[key]['score']:
+            best[key] = s
+    for s in best.values():
+        save_best_score(s['user_id'], s['quiz_id'], s['score'], s['total_questions'], s['percentage'],
+                        timestamp=datetime.fromisoformat(s['timestamp']))
+
+    autosave.discard(best)  # The attempts are submitted; their drafts go with them
+    db.session.add(SpoolSegment(name=name))
+    db.session.commit()
+    return True
+
+
+def recover(app, echo=None):
+    """Replay segments whose writing process is gone. Returns the number of submissions written."""
+    directory = spool_dir(app)
+    written = 0
+    for path in sorted(glob.glob(os.path.join(directory, SEGMENT_GLOB))):
+        filename = os.path.basename(path)
+        name, _, claimed_by = filename.partition(CLAIM)
+        owner = int(claimed_by or name.split('-')[1])
+        if owner == os.getpid() or pid_alive(owner):
+            continue  # Still being written (or replayed) by a live process
+
+        # Claim it first, so two workers starting together don't both replay it
+        claimed = os.path.join(directory, f"{name}{CLAIM}{os.getpid()}")
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            continue
+        submissions = read_segment(claimed)
+        try:
+            applied = apply_segment(name, submissions)
+        except Exception:
+            db.session.rollback()
+            raise
+        os.remove(claimed)
+        if applied:
+            written += len(submissions)
+            if echo:
+                echo(f"Recovered {len(submissions)} submissions from {name}")
+
+    cutoff = datetime.utcnow() - timedelta(days=app.config['SUBMIT_SPOOL_RETENTION_DAYS'])
+    SpoolSegment.query.filter(SpoolSegment.applied_at < cutoff).delete()
+    db.session.commit()
+    return written
+
+
+class SubmissionQueue:
+    """One process's spool and writer thread."""
+
+    def __init__(self, app):
+        self.app = app
+        self.pid = os.getpid()
+        self.directory = spool_dir(app)
+        self.interval = app.config['SUBMIT_FLUSH_INTERVAL']
+        self.max_pending = app.config['SUBMIT_QUEUE_MAX']
+        self.fsync = app.config['SUBMIT_SPOOL_FSYNC']
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._lock = threading.Lock()  # segment, items, pending, written
+        self._sync_lock = threading.Lock()  # one fsync at a time; whoever holds it syncs for everyone waiting
+        self._items = []
+        self._pending = {}  # (user_id, quiz_id) -> latest submission not yet written
+        self._written = 0  # lines appended, over all segments
+        self._synced = 0  # lines known to be on disk
+        self._failed = []  # (segment name, path, submissions) to retry
+        self._backlog = 0  # submissions in _failed; they count against SUBMIT_QUEUE_MAX
+        self._segment = None
+        self._fd = None
+        self._open_segment()
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='submission-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _open_segment(self):
+        self._segment = f"segment-{self.pid}-{time.time_ns()}.log"
+        self._fd = os.open(os.path.join(self.directory, self._segment), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        if self.fsync:
+            fsync_dir(self.directory)  # Or a crash could lose the new file's entry, and with it fsynced lines
+
+    def submit(self, submission):
+        """Spool one attempt. Returns False when the queue is full."""
+        line = (json.dumps(submission, separators=(',', ':')) + '\n').encode()
+        with self._lock:
+            if len(self._items) + self._backlog >= self.max_pending:
+                return False
+            os.write(self._fd, line)  # A single O_APPEND write per line
+            self._items.append(submission)
+            self._pending[(submission['user_id'], submission['quiz_id'])] = submission
+            self._written += 1
+            sequence = self._written
+        if self.fsync:
+            self._sync(sequence)
+        return True
+
+    def _sync(self, sequence):
+        with self._sync_lock:
+            if self._synced >= sequence:
+                return  # Another thread's fsync already covered this line
+            with self._lock:
+                fd, target = self._fd, self._written
+            os.fsync(fd)
+            self._synced = target
+
+    def pending_submission(self, user_id, quiz_id):
+        with self._lock:
+            return self._pending.get((user_id, quiz_id))
+
+    def flush(self):
+        """Write everything spooled so far. Returns the number of submissions written.
+
+        While an earlier segment still fails to apply, the current one is not
+        rotated: new submissions keep going to it until the queue is full, and
+        then submit_quiz writes synchronously.
+        """
+        written = self._retry()
+        if self._failed:
+            return written
+        with self._sync_lock:
+            with self._lock:
+                if not self._items:
+                    items = None
+                else:
+                    items, self._items = self._items, []
+                    name, fd = self._segment, self._fd
+                    self._failed.append((name, os.path.join(self.directory, name), items))
+                    self._backlog += len(items)
+                    self._open_segment()
+                    rotated_at = self._written
+            if items:
+                # Every line of the old segment is on disk before its fd goes away
+                if self.fsync:
+                    os.fsync(fd)
+                self._synced = max(self._synced, rotated_at)
+                os.close(fd)
+        return written + self._retry()
+
+    def _retry(self):
+        """Apply the segments in _failed, oldest first, until one fails. Returns the submissions written."""
+        written = 0
+        while self._failed:
+            name, path, items = self._failed[0]
+            with self.app.app_context():
+                try:
+                    apply_segment(name, items)
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("could not write spooled submissions from %s; retrying", name)
+                    return written
+            os.remove(path)
+            written += len(items)
+            with self._lock:
+                self._failed.pop(0)
+                self._backlog -= len(items)
+                for item in items:
+                    key = (item['user_id'], item['quiz_id'])
+                    if self._pending.get(key) is item:
+                        del self._pending[key]
+        return written
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("submission writer failed")
+        self.flush()
+
+    def close(self):
+        """Stop the writer after a last flush. Anything it could not write stays spooled for recovery."""
+        if self.pid != os.getpid() or self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+        with self._lock:
+            os.close(self._fd)
+            path = os.path.join(self.directory, self._segment)
+            if os.path.getsize(path) == 0:
+                os.remove(path)
+
+
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    """This process's queue, started (after replaying orphaned segments) on first use."""
+    queue = current_app.extensions.get('submission_queue')
+    if queue is None or queue.pid != os.getpid():
+        with _queue_lock:
+            queue = current_app.extensions.get('submission_queue')
+            if queue is None or queue.pid != os.getpid():
+                app = current_app._get_current_object()
+                os.makedirs(spool_dir(app), exist_ok=True)
+                recover(app)
+                queue = current_app.extensions['submission_queue'] = SubmissionQueue(app)
+    return queue
+
+
+def enqueue(user_id, quiz_id, responses, score, total_questions, percentage):
+    """Spool a graded attempt (responses as returned by grading.grade). False means write it synchronously."""
+    return get_queue().submit({
+        'user_id': user_id,
+        'quiz_id': quiz_id,
+        'score': score,
+        'total_questions': total_questions,
+        'percentage': percentage,
+        'timestamp': datetime.utcnow().isoformat(),
+        'responses': [[r['question_id'], r['selected_answer'], int(r['is_correct'])] for r in responses],
+    })
+
+
+def pending_attempt(user_id, quiz_id):
+    """PendingAttempt(submitted_at, responses) of the latest acknowledged attempt not written yet, else None.
+
+    This process's own pending attempts are looked up in its in-memory index.
+    The redirect after submit_quiz may reach another worker than the one that
+    spooled the attempt, so only when that index has nothing are the other
+    processes' segments searched.
+    """
+    queue = current_app.extensions.get('submission_queue')
+    submission = None
+    if queue is not None and queue.pid == os.getpid():
+        submission = queue.pending_submission(user_id, quiz_id)
+    if submission is None and current_app.config['SUBMIT_WRITE_BEHIND']:
+        submission = spooled_submission(spool_dir(current_app), user_id, quiz_id, skip_pid=os.getpid())
+    return pending_attempt_from(submission) if submission else None
+
+
+def shutdown(app):
+    """Flush and stop this process's queue, if it has one."""
+    queue = app.extensions.get('submission_queue')
+    if queue is not None:
+        queue.close()
+
+
+@click.command('recover-submissions')
+@with_appcontext
+def recover_submissions_command():
+    """Write submissions left in the spool by processes that have exited."""
+    written = recover(current_app._get_current_object(), echo=click.echo)
+    click.echo(f"{written} submissions recovered.")
+
+
+def init_app(app):
+    for name, default in SUBMISSION_DEFAULTS.items():
+        app.config.setdefault(name, default)
+    app.cli.add_command(recover_submissions_command)
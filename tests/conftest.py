@@ -0,0 +1,103 @@
+from datetime import date
+
+import pytest
+
+from app import create_app
+
+SUBJECTS = 2
+CHAPTERS_PER_SUBJECT = 2
+QUIZZES_PER_CHAPTER = 2
+QUESTIONS_PER_QUIZ = 3
+USERS = 3
+
+
+def make_app(path, **config):
+    return create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{path}",
+        'METRICS_DIR': str(path.parent / 'metrics'),
+        'AUTO_INIT_DB': False,
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+        'PASSWORD_HASH_WORKERS': 0,
+        **config,
+    })
+
+
+def seed(app):
+    """A few of every row a page lists, with each user having submitted every quiz."""
+    from models.models import Chapter, Question, Quiz, Subject, User, db
+    from services.database import init_db
+
+    with app.app_context():
+        init_db()
+        for s in range(SUBJECTS):
+            subject = Subject(name=f"Subject {s}", description=f"Subject {s}")
+            for c in range(CHAPTERS_PER_SUBJECT):
+                chapter = Chapter(name=f"Chapter {s}.{c}", subject=subject)
+                for q in range(QUIZZES_PER_CHAPTER):
+                    quiz = Quiz(chapter=chapter, date_of_quiz=date.today(), time_duration=10, remarks=f"Quiz {s}.{c}.{q}")
+                    quiz.questions = [
+                        Question(question_statement=f"Question {n}", optionA='a', optionB='b', optionC='c',
+                                 optionD='d', correct_option='ABCD'[n % 4])
+                        for n in range(QUESTIONS_PER_QUIZ)
+                    ]
+                    db.session.add(quiz)
+        for u in range(USERS):
+            db.session.add(User(username=f"user{u}@example.com", password='x', full_name=f"User {u}", dob=date(2000, 1, 1)))
+        db.session.commit()
+        users = [user.id for user in User.query.order_by(User.id)]
+        quizzes = [quiz.id for quiz in Quiz.query.order_by(Quiz.id)]
+
+    client = app.test_client()
+    for user_id in users:
+        with client.session_transaction() as session:
+            session['user_id'] = user_id
+        for quiz_id in quizzes:
+            response = client.post('/submit_quiz', data={'quiz_id': quiz_id, 'question_1': 'A'})
+            assert response.status_code == 302
+
+
+@pytest.fixture(scope='session')
+def database(tmp_path_factory):
+    path = tmp_path_factory.mktemp('db') / 'quiz_master.db'
+    seed(make_app(path))
+    return path
+
+
+def clear_caches():
+    """Empty the process-wide caches that seed() (or an earlier test) warmed."""
+    from models.models import Chapter, Question, Quiz, Subject, User
+    from services import catalog_cache, pagination, platform_stats
+    from services.quiz_cache import quiz_cache
+
+    quiz_cache.invalidate()
+    catalog_cache.invalidate()
+    platform_stats.invalidate_cache()
+    pagination.invalidate_count(User, Subject, Chapter, Quiz, Question)
+
+
+@pytest.fixture
+def app(database):
+    """A fresh app with cold caches on the seeded database."""
+    clear_caches()
+    return make_app(database)
+
+
+@pytest.fixture
+def user_client(app):
+    from models.models import User
+
+    with app.app_context():
+        user_id = User.query.order_by(User.id).first().id
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+    return client
+
+
+@pytest.fixture
+def admin_client(app):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['admin_logged_in'] = True
+    return client
@@ -0,0 +1,85 @@
+import os
+import shutil
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from services.attempts import (
+    pack_answers, pack_attempt, pack_bits, pack_ids, unpack_answers, unpack_attempt, unpack_bits, unpack_ids,
+)
+from tests.conftest import make_app
+
+BASELINE_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'quiz_master.db')
+
+
+@pytest.mark.parametrize('ids', [
+    [],
+    [1],
+    [1, 2, 3],
+    [5, 3, 9, 1],  # not increasing
+    [127, 128, 129, 300, 16384, 2 ** 40],  # deltas of several varint bytes
+    [1000, 1, 1000],  # large negative delta
+])
+def test_ids_round_trip(ids):
+    assert unpack_ids(pack_ids(ids)) == ids
+
+
+def test_consecutive_ids_take_one_byte_each():
+    assert len(pack_ids(range(1, 101))) == 100
+
+
+@pytest.mark.parametrize('letters', [[], ['A'], ['A', 'B', 'C'], ['X', 'D', 'X', 'A', 'B'], ['X'] * 7])
+def test_answers_round_trip(letters):
+    packed = pack_answers(letters)
+    assert len(packed) == (len(letters) + 1) // 2
+    assert unpack_answers(packed, len(letters)) == letters
+
+
+def test_unknown_answers_are_stored_as_unanswered():
+    assert unpack_answers(pack_answers(['A', None, 'E']), 3) == ['A', 'X', 'X']
+
+
+@pytest.mark.parametrize('flags', [[], [True], [False] * 8, [True] * 9, [i % 3 == 0 for i in range(17)]])
+def test_bits_round_trip(flags):
+    assert unpack_bits(pack_bits(flags), len(flags)) == flags
+
+
+def test_attempt_round_trip():
+    responses = [(130, 'B', True), (7, 'X', False), (131, 'D', False), (2, 'A', True), (500, 'C', True)]
+    row = pack_attempt(4, 9, responses)
+    assert (row['question_count'], row['score']) == (5, 3)
+    attempt = unpack_attempt(SimpleNamespace(id=1, **row))
+    assert [tuple(response) for response in attempt.responses] == responses
+    assert (attempt.user_id, attempt.quiz_id, attempt.score) == (4, 9, 3)
+
+
+def test_migration_packs_the_baseline_database(tmp_path):
+    path = tmp_path / 'quiz_master.db'
+    shutil.copyfile(BASELINE_DB, path)
+    with sqlite3.connect(path) as connection:
+        before = connection.execute(
+            "SELECT user_id, quiz_id, question_id, selected_answer, is_correct FROM user_response "
+            "ORDER BY user_id, quiz_id, id"
+        ).fetchall()
+    assert len(before) == 26
+
+    app = make_app(path)
+    with app.app_context():
+        from models.models import QuizAttempt
+        from services.database import init_db
+
+        init_db()
+        attempts = [unpack_attempt(row) for row in QuizAttempt.query.order_by(QuizAttempt.id)]
+
+    assert len(attempts) == 10
+    after = [
+        (attempt.user_id, attempt.quiz_id, response.question_id, response.selected_answer, int(response.is_correct))
+        for attempt in attempts
+        for response in attempt.responses
+    ]
+    assert after == [tuple(row) for row in before]
+    assert all(attempt.score == sum(r.is_correct for r in attempt.responses) for attempt in attempts)
+    with sqlite3.connect(path) as connection:
+        assert connection.execute(
+            "SELECT count(*) FROM sqlite_master WHERE name = 'user_response'").fetchone() == (0,)
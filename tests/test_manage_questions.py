@@ -0,0 +1,19 @@
+import re
+
+from tests.conftest import CHAPTERS_PER_SUBJECT, QUESTIONS_PER_QUIZ, QUIZZES_PER_CHAPTER, SUBJECTS
+
+TOTAL_QUESTIONS = SUBJECTS * CHAPTERS_PER_SUBJECT * QUIZZES_PER_CHAPTER * QUESTIONS_PER_QUIZ
+
+
+def question_ids(html):
+    return [int(value) for value in re.findall(r'name="question_id" value="(\d+)"', html)]
+
+
+def test_questions_are_paginated(admin_client):
+    first = admin_client.get('/manage_questions?questions_per_page=10').get_data(as_text=True)
+    assert question_ids(first) == list(range(1, 11))
+    assert f'Showing 10 questions of {TOTAL_QUESTIONS}' in first
+
+    second = admin_client.get('/manage_questions?questions_per_page=10&questions_after=10').get_data(as_text=True)
+    assert question_ids(second) == list(range(11, 21))
+    assert 'questions_before=11' in second
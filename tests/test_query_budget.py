@@ -0,0 +1,46 @@
+import pytest
+
+from services.query_budget import QueryBudgetExceeded, query_budget
+
+ADMIN_PAGES = ['/admin_dashboard', '/manage_questions', '/view_statistics']
+USER_PAGES = ['/user_dashboard', '/quiz_summary', '/attempt_quiz/1/answers']
+
+
+def test_app_fixture_starts_cold(app):
+    from services import catalog_cache
+    from services.quiz_cache import quiz_cache
+
+    assert quiz_cache.stats()['size'] == 0
+    assert catalog_cache._cache['key'] is None
+
+
+@pytest.mark.parametrize('path', ADMIN_PAGES)
+def test_admin_pages_stay_within_budget_cold(admin_client, path):
+    # A view over its budget raises QueryBudgetExceeded out of the test client
+    assert admin_client.get(path).status_code == 200
+
+
+@pytest.mark.parametrize('path', USER_PAGES)
+def test_user_pages_stay_within_budget_cold(user_client, path):
+    assert user_client.get(path).status_code == 200
+
+
+def test_budgets_hold_with_warm_caches(admin_client, user_client):
+    for path in ADMIN_PAGES * 2:
+        assert admin_client.get(path).status_code == 200
+    for path in USER_PAGES * 2:
+        assert user_client.get(path).status_code == 200
+
+
+def test_exceeding_the_budget_fails_the_request(app):
+    from models.models import Quiz
+
+    @query_budget(1)
+    def two_queries():
+        Quiz.query.count()
+        Quiz.query.first()
+        return 'ok'
+
+    app.add_url_rule('/two_queries', view_func=two_queries)
+    with pytest.raises(QueryBudgetExceeded, match='two_queries ran 2 queries, budget is 1'):
+        app.test_client().get('/two_queries')
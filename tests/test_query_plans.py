@@ -0,0 +1,15 @@
+from sqlalchemy import select
+
+from models.models import Question
+from services import query_plans
+
+
+def test_hot_queries_use_an_index(app):
+    with app.app_context():
+        assert query_plans.check_query_plans() == []
+
+
+def test_full_scan_is_reported(app):
+    with app.app_context():
+        plan = query_plans.explain(select(Question).where(Question.optionA == 'a'))
+    assert not query_plans.uses_index(plan)
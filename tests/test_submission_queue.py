@@ -0,0 +1,94 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from services import submission_queue
+from tests.conftest import make_app, seed
+
+
+@pytest.fixture
+def app(tmp_path):
+    """A write-behind app on its own seeded database; the writer thread only runs when a test flushes."""
+    path = tmp_path / 'quiz_master.db'
+    seed(make_app(path))
+    app = make_app(path, SUBMIT_WRITE_BEHIND=True, SUBMIT_SPOOL_DIR=str(tmp_path / 'spool'),
+                   SUBMIT_FLUSH_INTERVAL=3600, SUBMIT_QUEUE_MAX=2)
+    yield app
+    submission_queue.shutdown(app)
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+    return client
+
+
+def attempt_count(app):
+    from models.models import QuizAttempt
+
+    with app.app_context():
+        return QuizAttempt.query.count()
+
+
+def submission(quiz_id=1, answer='A'):
+    return {'user_id': 1, 'quiz_id': quiz_id, 'score': 1, 'total_questions': 1, 'percentage': 100.0,
+            'timestamp': '2026-01-01T10:00:00', 'responses': [[1, answer, 1]]}
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def test_an_applied_segment_is_not_applied_again(app):
+    before = attempt_count(app)
+    with app.app_context():
+        assert submission_queue.apply_segment('segment-1-1.log', [submission()])
+        assert not submission_queue.apply_segment('segment-1-1.log', [submission()])
+    assert attempt_count(app) == before + 1
+
+
+def test_leftover_segment_is_recovered_at_startup(app):
+    directory = submission_queue.spool_dir(app)
+    os.makedirs(directory)
+    path = os.path.join(directory, f"segment-{dead_pid()}-1.log")
+    with open(path, 'w') as f:
+        f.write(json.dumps(submission(answer='A')) + '\n')
+        f.write(json.dumps(submission(answer='B')) + '\n')
+        f.write('{"user_id": 1, "quiz_')  # Torn by the crash; never acknowledged
+    before = attempt_count(app)
+
+    with app.app_context():
+        submission_queue.get_queue()  # Replays orphaned segments before starting
+    assert attempt_count(app) == before + 2
+    assert not os.path.exists(path)
+
+    with app.app_context():
+        assert submission_queue.recover(app) == 0  # Nothing left to replay
+
+
+def test_full_queue_falls_back_to_synchronous_writes(app, client, monkeypatch):
+    def database_down(name, submissions):
+        raise RuntimeError('database is down')
+
+    before = attempt_count(app)
+    monkeypatch.setattr(submission_queue, 'apply_segment', database_down)
+    client.post('/submit_quiz', data={'quiz_id': 1, 'question_1': 'A'})
+    queue = app.extensions['submission_queue']
+    assert queue.flush() == 0  # The segment stays queued for a retry and counts toward SUBMIT_QUEUE_MAX
+
+    client.post('/submit_quiz', data={'quiz_id': 1, 'question_1': 'B'})
+    assert attempt_count(app) == before  # Still spooled
+    client.post('/submit_quiz', data={'quiz_id': 1, 'question_1': 'C'})
+    assert attempt_count(app) == before + 1  # Queue full: written synchronously
+
+    monkeypatch.undo()
+    assert queue.flush() == 2
+    assert attempt_count(app) == before + 3
+    assert os.listdir(queue.directory) == [queue._segment]